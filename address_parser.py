@@ -0,0 +1,366 @@
+"""
+US address parsing and normalization.
+
+Splits a free-form, single-line address into the street / city / state / zip
+components the Smarty lookup expects, using USPS state and street-suffix tables
+instead of comma positions, so formats such as
+"15031-15139 Marlboro Pike, Upper Marlboro MD 20772" and
+"123 Main Street Upper Marlboro, Maryland 20772" parse the same way.
+
+Run this module directly to time the parser.
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple
+
+# USPS state and territory codes keyed by full name
+STATE_NAMES = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA",
+    "COLORADO": "CO", "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC",
+    "FLORIDA": "FL", "GEORGIA": "GA", "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL",
+    "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS", "KENTUCKY": "KY", "LOUISIANA": "LA",
+    "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA", "MICHIGAN": "MI", "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT", "NEBRASKA": "NE", "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM", "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK", "OREGON": "OR",
+    "PENNSYLVANIA": "PA", "PUERTO RICO": "PR", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC",
+    "SOUTH DAKOTA": "SD", "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT",
+    "VIRGINIA": "VA", "WASHINGTON": "WA", "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY",
+    "GUAM": "GU", "VIRGIN ISLANDS": "VI"
+}
+STATE_CODES = frozenset(STATE_NAMES.values())
+
+# USPS Publication 28 street suffixes: every accepted spelling maps to the
+# standard abbreviation
+STREET_SUFFIXES = {
+    "ALLEY": "ALY", "ALLEE": "ALY", "ALY": "ALY",
+    "ANNEX": "ANX", "ANX": "ANX",
+    "ARCADE": "ARC", "ARC": "ARC",
+    "AVENUE": "AVE", "AVE": "AVE", "AV": "AVE", "AVEN": "AVE", "AVENU": "AVE", "AVN": "AVE", "AVNUE": "AVE",
+    "BAYOU": "BYU", "BYU": "BYU",
+    "BEND": "BND", "BND": "BND",
+    "BLUFF": "BLF", "BLF": "BLF",
+    "BOULEVARD": "BLVD", "BLVD": "BLVD", "BOUL": "BLVD", "BOULV": "BLVD",
+    "BRANCH": "BR", "BR": "BR",
+    "BRIDGE": "BRG", "BRG": "BRG",
+    "BROOK": "BRK", "BRK": "BRK",
+    "BYPASS": "BYP", "BYP": "BYP",
+    "CAUSEWAY": "CSWY", "CSWY": "CSWY",
+    "CENTER": "CTR", "CTR": "CTR", "CENTRE": "CTR", "CNTR": "CTR", "CENTR": "CTR",
+    "CIRCLE": "CIR", "CIR": "CIR", "CIRC": "CIR", "CRCL": "CIR",
+    "COMMON": "CMN", "CMN": "CMN", "COMMONS": "CMNS", "CMNS": "CMNS",
+    "CORNER": "COR", "COR": "COR", "CORNERS": "CORS", "CORS": "CORS",
+    "COURT": "CT", "CT": "CT", "COURTS": "CTS", "CTS": "CTS",
+    "COVE": "CV", "CV": "CV",
+    "CREEK": "CRK", "CRK": "CRK",
+    "CRESCENT": "CRES", "CRES": "CRES",
+    "CROSSING": "XING", "XING": "XING", "CRSSNG": "XING",
+    "DRIVE": "DR", "DR": "DR", "DRIV": "DR", "DRV": "DR",
+    "ESTATE": "EST", "EST": "EST", "ESTATES": "ESTS", "ESTS": "ESTS",
+    "EXPRESSWAY": "EXPY", "EXPY": "EXPY", "EXPRESS": "EXPY", "EXPW": "EXPY",
+    "EXTENSION": "EXT", "EXT": "EXT",
+    "FREEWAY": "FWY", "FWY": "FWY",
+    "GARDEN": "GDN", "GDN": "GDN", "GARDENS": "GDNS", "GDNS": "GDNS",
+    "GATEWAY": "GTWY", "GTWY": "GTWY",
+    "GLEN": "GLN", "GLN": "GLN",
+    "GREEN": "GRN", "GRN": "GRN",
+    "GROVE": "GRV", "GRV": "GRV",
+    "HARBOR": "HBR", "HBR": "HBR",
+    "HEIGHTS": "HTS", "HTS": "HTS",
+    "HIGHWAY": "HWY", "HWY": "HWY", "HIWAY": "HWY", "HIWY": "HWY",
+    "HILL": "HL", "HL": "HL", "HILLS": "HLS", "HLS": "HLS",
+    "HOLLOW": "HOLW", "HOLW": "HOLW",
+    "ISLAND": "IS", "IS": "IS",
+    "JUNCTION": "JCT", "JCT": "JCT",
+    "KNOLL": "KNL", "KNL": "KNL",
+    "LAKE": "LK", "LK": "LK", "LAKES": "LKS", "LKS": "LKS",
+    "LANDING": "LNDG", "LNDG": "LNDG",
+    "LANE": "LN", "LN": "LN",
+    "LOOP": "LOOP",
+    "MALL": "MALL",
+    "MANOR": "MNR", "MNR": "MNR",
+    "MEADOW": "MDW", "MDW": "MDW", "MEADOWS": "MDWS", "MDWS": "MDWS",
+    "MILL": "ML", "ML": "ML",
+    "MOTORWAY": "MTWY", "MTWY": "MTWY",
+    "MOUNT": "MT", "MT": "MT",
+    "MOUNTAIN": "MTN", "MTN": "MTN",
+    "OVAL": "OVAL",
+    "OVERPASS": "OPAS", "OPAS": "OPAS",
+    "PARK": "PARK", "PARKS": "PARK",
+    "PARKWAY": "PKWY", "PKWY": "PKWY", "PARKWY": "PKWY", "PKY": "PKWY",
+    "PASS": "PASS",
+    "PATH": "PATH",
+    "PIKE": "PIKE", "PIKES": "PIKE",
+    "PINE": "PNE", "PNE": "PNE", "PINES": "PNES", "PNES": "PNES",
+    "PLACE": "PL", "PL": "PL",
+    "PLAZA": "PLZ", "PLZ": "PLZ",
+    "POINT": "PT", "PT": "PT", "POINTS": "PTS", "PTS": "PTS",
+    "PORT": "PRT", "PRT": "PRT",
+    "PRAIRIE": "PR", "PR": "PR",
+    "RANCH": "RNCH", "RNCH": "RNCH",
+    "RIDGE": "RDG", "RDG": "RDG",
+    "RIVER": "RIV", "RIV": "RIV",
+    "ROAD": "RD", "RD": "RD", "ROADS": "RDS", "RDS": "RDS",
+    "ROUTE": "RTE", "RTE": "RTE",
+    "ROW": "ROW",
+    "RUN": "RUN",
+    "SHORE": "SHR", "SHR": "SHR",
+    "SKYWAY": "SKWY", "SKWY": "SKWY",
+    "SPRING": "SPG", "SPG": "SPG", "SPRINGS": "SPGS", "SPGS": "SPGS",
+    "SQUARE": "SQ", "SQ": "SQ", "SQR": "SQ",
+    "STATION": "STA", "STA": "STA",
+    "STREET": "ST", "ST": "ST", "STR": "ST", "STRT": "ST",
+    "STREETS": "STS", "STS": "STS",
+    "SUMMIT": "SMT", "SMT": "SMT",
+    "TERRACE": "TER", "TER": "TER", "TERR": "TER",
+    "TRACE": "TRCE", "TRCE": "TRCE",
+    "TRAIL": "TRL", "TRL": "TRL", "TRAILS": "TRL",
+    "TURNPIKE": "TPKE", "TPKE": "TPKE", "TURNPK": "TPKE",
+    "VALLEY": "VLY", "VLY": "VLY",
+    "VIEW": "VW", "VW": "VW",
+    "VILLAGE": "VLG", "VLG": "VLG",
+    "VISTA": "VIS", "VIS": "VIS",
+    "WALK": "WALK",
+    "WAY": "WAY", "WY": "WAY",
+    "WELLS": "WLS", "WLS": "WLS",
+}
+
+DIRECTIONALS = {
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+    "N": "N", "S": "S", "E": "E", "W": "W", "NE": "NE", "NW": "NW", "SE": "SE", "SW": "SW",
+}
+
+# Suffixes that end a street even when another suffix word follows: every
+# abbreviation ("DR", "AVE") and the common full words that are almost never part
+# of a street name, so "Main Street Spring Valley" splits after "Street" while
+# "Old Mill Road" and "Park Place Dr" run on. The first spelling of each suffix is the full word.
+_FULL_SUFFIXES = {}
+for _spelling, _standard in STREET_SUFFIXES.items():
+    _FULL_SUFFIXES.setdefault(_standard, _spelling)
+TERMINAL_SUFFIXES = frozenset(
+    spelling for spelling, standard in STREET_SUFFIXES.items()
+    if spelling != _FULL_SUFFIXES[standard] or standard in {"ST", "AVE", "RD", "DR", "BLVD", "LN", "PKWY", "HWY"}
+)
+
+# USPS secondary unit designators
+UNIT_DESIGNATORS = {
+    "APARTMENT": "APT", "APT": "APT", "BUILDING": "BLDG", "BLDG": "BLDG", "FLOOR": "FL",
+    "FL": "FL", "SUITE": "STE", "STE": "STE", "UNIT": "UNIT", "ROOM": "RM", "RM": "RM",
+    "DEPARTMENT": "DEPT", "DEPT": "DEPT", "#": "#",
+}
+
+_ZIP_RE = re.compile(r"(\d{5})(?:-?(\d{4}))?$")
+_RANGE_RE = re.compile(r"^(\d+)\s*-\s*(\d+)(?=\s)")
+_TOKEN_STRIP = ".,;"
+_DOTTED_RE = re.compile(r"^(?:[A-Z]\.)+[A-Z]?\.?$")
+_COUNTRY_RE = re.compile(r"[,\s]+(?:USA|U\.S\.A\.|US|UNITED STATES(?: OF AMERICA)?)\.?$")
+_MAX_STATE_WORDS = max(len(name.split()) for name in STATE_NAMES)
+
+
+class ParsedAddress(NamedTuple):
+    street: str
+    city: str
+    state: str
+    zipcode: str
+
+    def one_line(self) -> str:
+        """Format as 'STREET, CITY, ST ZIP', skipping empty parts."""
+        tail = " ".join(part for part in (self.state, self.zipcode) if part)
+        return ", ".join(part for part in (self.street, self.city, tail) if part)
+
+
+def _collapse_range(address: str) -> str:
+    """Use the first number of a street-number range such as '15031-15139'.
+
+    Hyphenated house numbers where the second part is smaller, as in Queens
+    ('123-45 Queens Blvd'), are kept as they are.
+    """
+    match = _RANGE_RE.match(address)
+    if match and int(match.group(2)) >= int(match.group(1)):
+        return match.group(1) + address[match.end():]
+    return address
+
+
+def _normalize_street(tokens: List[str]) -> str:
+    """Standardize suffix, directionals and unit designators in street tokens."""
+    normalized = []
+    last = len(tokens) - 1
+    suffix_index = _last_suffix_index(tokens)
+    for i, token in enumerate(tokens):
+        if i == suffix_index:
+            normalized.append(STREET_SUFFIXES[token])
+        elif token in DIRECTIONALS and (i == 1 or i == suffix_index + 1 or i == last) and i > 0:
+            normalized.append(DIRECTIONALS[token])
+        elif token in UNIT_DESIGNATORS and i > suffix_index >= 0:
+            normalized.append(UNIT_DESIGNATORS[token])
+        else:
+            normalized.append(token)
+    return " ".join(normalized)
+
+
+def _unit_index(tokens: List[str]) -> int:
+    """Index of the first unit designator after the street name, or len(tokens)."""
+    for i in range(2, len(tokens)):
+        if tokens[i] in UNIT_DESIGNATORS or tokens[i].startswith("#"):
+            return i
+    return len(tokens)
+
+
+def _last_suffix_index(tokens: List[str]) -> int:
+    """Index of the street suffix in a street on its own: the last suffix word before any unit designator."""
+    for i in range(_unit_index(tokens) - 1, 0, -1):
+        if tokens[i] in STREET_SUFFIXES:
+            return i
+    return -1
+
+
+def _split_suffix_index(tokens: List[str]) -> int:
+    """Index of the street suffix when the city follows the street with no comma.
+
+    City names often contain suffix words ("Park City", "Lake Forest", "Mount
+    Vernon") and so do street names ("Old Mill Road", "Lake View Drive"). This
+    takes the first suffix after the street number and name and runs on to the
+    last of the suffix words that follow it, stopping after a terminal suffix
+    ("Main St Park City") and never going so far that no city is left.
+    """
+    end = _unit_index(tokens)
+    start = 3 if len(tokens) > 1 and tokens[1] in DIRECTIONALS else 2
+    for i in range(start, end):
+        if tokens[i] in STREET_SUFFIXES:
+            while (
+                tokens[i] not in TERMINAL_SUFFIXES and i + 2 < len(tokens) and i + 1 < end
+                and tokens[i + 1] in STREET_SUFFIXES
+            ):
+                i += 1
+            return i
+    # "100 Park Springfield": the suffix is the whole street name
+    return _last_suffix_index(tokens)
+
+
+def _street_end(tokens: List[str]) -> int:
+    """Number of leading tokens that make up the street when there are no commas."""
+    suffix_index = _split_suffix_index(tokens)
+    if suffix_index < 0:
+        return len(tokens)
+    end = suffix_index + 1
+    # Trailing directional, e.g. "123 Main St NW"
+    if end < len(tokens) and tokens[end] in DIRECTIONALS and len(tokens[end]) <= 2:
+        end += 1
+    # Unit designator and its value, e.g. "Suite 200" or "#4"
+    if end < len(tokens) and tokens[end].startswith("#") and len(tokens[end]) > 1:
+        end += 1
+    elif end + 1 < len(tokens) and tokens[end] in UNIT_DESIGNATORS:
+        end += 2
+    return end
+
+
+@lru_cache(maxsize=4096)
+def parse_address(address: str) -> ParsedAddress:
+    """Parse a single-line US address into USPS-normalized components.
+
+    Components that cannot be identified are returned empty; whatever is left
+    is kept in the street so nothing is dropped.
+    """
+    text = " ".join((address or "").replace("\n", ", ").split()).upper()
+    text = _COUNTRY_RE.sub("", text).strip(" ,")
+    if not text:
+        return ParsedAddress("", "", "", "")
+    text = _collapse_range(text)
+
+    # Split into comma segments, then tokens, remembering segment boundaries
+    segments = [seg.split() for seg in text.split(",")]
+    # "N.W." -> "NW", "D.C." -> "DC"
+    segments = [[tok.replace(".", "") if _DOTTED_RE.match(tok) else tok.strip(_TOKEN_STRIP) for tok in seg] for seg in segments]
+    segments = [[tok for tok in seg if tok] for seg in segments]
+    segments = [seg for seg in segments if seg]
+
+    # ZIP code from the end
+    zipcode = ""
+    if segments:
+        match = _ZIP_RE.fullmatch(segments[-1][-1])
+        if match:
+            zipcode = match.group(1)
+            segments[-1].pop()
+            if not segments[-1]:
+                segments.pop()
+
+    # State: an abbreviation or full name just before the ZIP
+    state = ""
+    if segments:
+        tail = segments[-1]
+        for words in range(min(_MAX_STATE_WORDS, len(tail)), 0, -1):
+            candidate = " ".join(tail[-words:])
+            if candidate in STATE_NAMES:
+                state = STATE_NAMES[candidate]
+            elif words == 1 and candidate in STATE_CODES:
+                state = candidate
+            if state:
+                del tail[-words:]
+                if not tail:
+                    segments.pop()
+                break
+
+    # Street and city
+    if len(segments) >= 2:
+        city_tokens = segments[-1]
+        street_tokens = [tok for seg in segments[:-1] for tok in seg]
+        # "123 Main St, Suite 200, Springfield" - units stay with the street
+        if city_tokens and (city_tokens[0] in UNIT_DESIGNATORS or city_tokens[0].startswith("#")):
+            street_tokens += city_tokens
+            city_tokens = []
+    elif segments:
+        tokens = segments[0]
+        end = _street_end(tokens) if (state or zipcode) else len(tokens)
+        street_tokens, city_tokens = tokens[:end], tokens[end:]
+    else:
+        street_tokens, city_tokens = [], []
+
+    # "123 Main St Springfield, IL" - the city shares the street segment
+    if len(segments) >= 2 and not city_tokens:
+        end = _street_end(street_tokens)
+        street_tokens, city_tokens = street_tokens[:end], street_tokens[end:]
+
+    return ParsedAddress(_normalize_street(street_tokens), " ".join(city_tokens), state, zipcode)
+
+
+def parse_addresses(addresses: Iterable[str]) -> List[ParsedAddress]:
+    """Parse a batch of addresses."""
+    return [parse_address(address) for address in addresses]
+
+
+def normalize_address(address: str) -> str:
+    """Canonical one-line form, suitable as a lookup or de-duplication key."""
+    return parse_address(address).one_line()
+
+
+# A mix of the formats seen in offering memos and broker emails, for timing.
+# The regression cases live in tests/test_address_parser.py.
+BENCHMARK_ADDRESSES = [
+    "15031-15139 Marlboro Pike, Upper Marlboro, MD 20772",
+    "15031 Marlboro Pike Upper Marlboro MD 20772",
+    "123 Main Street, Springfield, Illinois 62701",
+    "456 Oak Avenue Suite 200, Springfield, IL 62701-1234",
+    "1600 Pennsylvania Ave. N.W. Washington D.C. 20500",
+    "350 5th Ave New York NY 10118",
+    "100 N. Main St., Salt Lake City, UT 84101",
+    "77 Harbor Point Blvd #4, Boston, MA 02110",
+    "9 Industrial Parkway\nEast Rutherford, NJ 07073",
+    "123 Main St Park City UT 84060",
+]
+
+
+def benchmark(addresses: Iterable[str] = BENCHMARK_ADDRESSES, rounds: int = 200) -> float:
+    """Return uncached addresses parsed per second."""
+    inputs = list(addresses) * rounds
+    parse_address.cache_clear()
+    start = time.perf_counter()
+    for raw in inputs:
+        parse_address.__wrapped__(raw)
+    return len(inputs) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print(f"Throughput: {benchmark():,.0f} addresses/second")
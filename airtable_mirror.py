@@ -0,0 +1,258 @@
+"""
+Local SQLite mirror of the Airtable Deals, Contacts and Team tables.
+
+The mirror is kept current by an incremental sync on LAST_MODIFIED_TIME()
+and by write-through from the code paths that create records, so lookups,
+duplicate checks and reporting can run against local indexes instead of
+paging through the Airtable API.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from address_parser import normalize_address
+
+AIRTABLE_API_URL = "https://api.airtable.com/v0"
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_airtable_mirror.sqlite3")
+
+# Re-read records modified slightly before the last sync to absorb clock skew
+SYNC_OVERLAP = timedelta(minutes=2)
+# Incremental sync cannot see deletions, so rebuild each table this often
+FULL_SYNC_INTERVAL = 24 * 3600
+
+
+class AirtableMirror:
+    """SQLite copy of a set of Airtable tables with indexed lookup columns."""
+
+    def __init__(self, base_id: str, api_key: str, tables: Iterable[str], path: str = DEFAULT_DB_PATH):
+        self.base_id = base_id
+        self.api_key = api_key
+        self.tables = list(tables)
+        self.path = path
+        self._lock = threading.RLock()
+        self._sync_thread = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                tbl TEXT NOT NULL,
+                id TEXT NOT NULL,
+                created_time TEXT NOT NULL DEFAULT '',
+                fields TEXT NOT NULL,
+                name_key TEXT NOT NULL DEFAULT '',
+                email_key TEXT NOT NULL DEFAULT '',
+                address_key TEXT NOT NULL DEFAULT '',
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (tbl, id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_email ON records (tbl, email_key);
+            CREATE INDEX IF NOT EXISTS idx_records_name ON records (tbl, name_key);
+            CREATE INDEX IF NOT EXISTS idx_records_address ON records (tbl, address_key);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                tbl TEXT PRIMARY KEY,
+                last_sync TEXT NOT NULL,
+                last_full_sync REAL NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self._conn.commit()
+
+    # --- Writes ---
+
+    def upsert(self, table: str, record: Dict) -> None:
+        """Insert or replace one Airtable record (as returned by the API)."""
+        self.upsert_many(table, [record])
+
+    def upsert_many(self, table: str, records: List[Dict]) -> None:
+        if not table:
+            return
+        rows = []
+        now = time.time()
+        for record in records:
+            if not record or not record.get("id"):
+                continue
+            fields = record.get("fields", {})
+            location = fields.get("Location") or fields.get("Address") or ""
+            rows.append((
+                table,
+                record["id"],
+                record.get("createdTime", ""),
+                json.dumps(fields),
+                str(fields.get("Name") or fields.get("Property Name") or "").strip().lower(),
+                str(fields.get("Email") or "").strip().lower(),
+                normalize_address(location) if isinstance(location, str) and location else "",
+                now
+            ))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (tbl, id, created_time, fields, name_key, email_key, "
+                "address_key, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def delete(self, table: str, record_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM records WHERE tbl = ? AND id = ?", (table, record_id))
+            self._conn.commit()
+
+    # --- Sync ---
+
+    def _fetch(self, table: str, formula: Optional[str] = None) -> List[Dict]:
+        """Page through an Airtable table, 100 records at a time."""
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        params = {"pageSize": 100}
+        if formula:
+            params["filterByFormula"] = formula
+        records = []
+        while True:
+            resp = requests.get(f"{AIRTABLE_API_URL}/{self.base_id}/{table}", headers=headers, params=params, timeout=30)
+            if resp.status_code == 429:
+                # Airtable asks clients to back off for 30 seconds when rate limited
+                time.sleep(30)
+                continue
+            resp.raise_for_status()
+            data = resp.json()
+            records.extend(data.get("records", []))
+            if not data.get("offset"):
+                return records
+            params["offset"] = data["offset"]
+            time.sleep(0.2)  # Stay under 5 requests per second per base
+
+    def sync_table(self, table: str, full: bool = False) -> int:
+        """Pull records changed since the last sync (or the whole table). Returns the record count."""
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            state = self._conn.execute(
+                "SELECT last_sync, last_full_sync FROM sync_state WHERE tbl = ?", (table,)
+            ).fetchone()
+        if state is None or time.time() - state[1] > FULL_SYNC_INTERVAL:
+            full = True
+
+        if full:
+            records = self._fetch(table)
+            with self._lock:
+                self._conn.execute("DELETE FROM records WHERE tbl = ?", (table,))
+                self.upsert_many(table, records)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (tbl, last_sync, last_full_sync) VALUES (?, ?, ?)",
+                    (table, started.isoformat(), time.time())
+                )
+                self._conn.commit()
+            return len(records)
+
+        since = datetime.fromisoformat(state[0]) - SYNC_OVERLAP
+        formula = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}'))"
+        records = self._fetch(table, formula)
+        with self._lock:
+            self.upsert_many(table, records)
+            self._conn.execute("UPDATE sync_state SET last_sync = ? WHERE tbl = ?", (started.isoformat(), table))
+            self._conn.commit()
+        return len(records)
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """Sync every mirrored table; a failing table does not stop the others."""
+        counts = {}
+        for table in self.tables:
+            try:
+                counts[table] = self.sync_table(table, full=full)
+            except Exception:
+                counts[table] = -1
+        return counts
+
+    def start_background_sync(self, interval: float = 300) -> None:
+        """Run sync() now and then every `interval` seconds on a daemon thread (once per process)."""
+        with self._lock:
+            if self._sync_thread and self._sync_thread.is_alive():
+                return
+
+            def loop():
+                while True:
+                    self.sync()
+                    time.sleep(interval)
+
+            self._sync_thread = threading.Thread(target=loop, name="airtable-mirror-sync", daemon=True)
+            self._sync_thread.start()
+
+    def is_synced(self, table: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sync_state WHERE tbl = ?", (table,)).fetchone() is not None
+
+    # --- Lookups ---
+
+    def _select(self, where: str, params: tuple, limit: Optional[int] = None) -> List[Dict]:
+        query = f"SELECT id, created_time, fields FROM records WHERE {where} ORDER BY created_time DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"id": rid, "createdTime": created, "fields": json.loads(fields)} for rid, created, fields in rows]
+
+    def get(self, table: str, record_id: str) -> Optional[Dict]:
+        rows = self._select("tbl = ? AND id = ?", (table, record_id), limit=1)
+        return rows[0] if rows else None
+
+    def all(self, table: str) -> List[Dict]:
+        return self._select("tbl = ?", (table,))
+
+    def find_by_email(self, table: str, email: str, max_age: Optional[float] = None) -> List[Dict]:
+        """Records with this email; max_age keeps only those fetched from Airtable within that many seconds."""
+        email_key = (email or "").strip().lower()
+        if max_age is None:
+            return self._select("tbl = ? AND email_key = ?", (table, email_key))
+        return self._select("tbl = ? AND email_key = ? AND synced_at >= ?", (table, email_key, time.time() - max_age))
+
+    def find_by_name(self, table: str, name: str) -> List[Dict]:
+        return self._select("tbl = ? AND name_key = ?", (table, (name or "").strip().lower()))
+
+    def find_by_address(self, table: str, address: str) -> List[Dict]:
+        key = normalize_address(address or "")
+        if not key:
+            return []
+        return self._select("tbl = ? AND address_key = ?", (table, key))
+
+    def count_by_field(self, table: str, field: str) -> Dict[str, int]:
+        """Count records per value of a field, e.g. deals per Status."""
+        counts = {}
+        for record in self.all(table):
+            value = record["fields"].get(field, "")
+            if isinstance(value, list):
+                value = ", ".join(map(str, value))
+            counts[str(value)] = counts.get(str(value), 0) + 1
+        return counts
+
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(base_id: str, api_key: str, tables: Iterable[str], path: str = DEFAULT_DB_PATH) -> AirtableMirror:
+    """Process-wide mirror per database file, shared across Streamlit reruns and sessions."""
+    with _mirrors_lock:
+        mirror = _mirrors.get(path)
+        if mirror is None:
+            mirror = AirtableMirror(base_id, api_key, tables, path)
+            _mirrors[path] = mirror
+        return mirror
+
+
+if __name__ == "__main__":
+    import sys
+
+    mirror = AirtableMirror(
+        os.environ["AIRTABLE_BASE_ID"],
+        os.environ.get("AIRTABLE_PAT") or os.environ["AIRTABLE_API_KEY"],
+        [os.environ.get("AIRTABLE_TABLE_NAME", "Deals"), "Contacts", "Team"],
+        os.environ.get("AIRTABLE_MIRROR_DB", DEFAULT_DB_PATH)
+    )
+    print(mirror.sync(full="--full" in sys.argv))
@@ -0,0 +1,156 @@
+"""
+Cached Airtable base schema and local pre-flight validation of write payloads.
+
+The schema from /v0/meta/bases/{id}/tables is cached with a TTL. Outgoing
+`fields` dicts are checked and coerced against it before they are POSTed, so
+field-name and type mismatches are fixed or reported locally instead of being
+rejected by Airtable.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from underwriting import parse_number, parse_percent
+
+AIRTABLE_META_URL = "https://api.airtable.com/v0/meta/bases/{base_id}/tables"
+
+# Field types Airtable computes itself and rejects in writes
+READ_ONLY_TYPES = {
+    "formula", "rollup", "count", "lookup", "multipleLookupValues", "createdTime",
+    "lastModifiedTime", "autoNumber", "button", "createdBy", "lastModifiedBy",
+    "externalSyncSource", "aiText"
+}
+NUMERIC_TYPES = {"number", "currency", "percent", "rating", "duration"}
+TEXT_TYPES = {"singleLineText", "multilineText", "richText", "email", "url", "phoneNumber"}
+
+
+class AirtableSchema:
+    """TTL cache of a base's table and field definitions."""
+
+    def __init__(self, base_id: str, api_key: str, ttl_seconds: float = 3600):
+        self.base_id = base_id
+        self.api_key = api_key
+        self.ttl = ttl_seconds
+        self._tables = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def tables(self, refresh: bool = False) -> List[Dict]:
+        """Table definitions, fetched from the meta API at most once per TTL."""
+        with self._lock:
+            if refresh or self._tables is None or time.monotonic() - self._fetched_at > self.ttl:
+                resp = requests.get(
+                    AIRTABLE_META_URL.format(base_id=self.base_id),
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    timeout=15
+                )
+                resp.raise_for_status()
+                self._tables = resp.json().get("tables", [])
+                self._fetched_at = time.monotonic()
+            return self._tables
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._tables = None
+
+    def table_fields(self, table: str) -> Optional[Dict[str, Dict]]:
+        """Field definitions keyed by name for a table name or ID; None if unknown."""
+        for t in self.tables():
+            if table in (t.get("name"), t.get("id")):
+                return {f["name"]: f for f in t.get("fields", [])}
+        return None
+
+    def prepare_fields(self, table: str, fields: Dict) -> Tuple[Dict, List[str], bool]:
+        """
+        Validate and coerce a write payload against the cached schema.
+        Returns (fields to send, list of problems found, whether typecast is needed).
+        If the schema cannot be loaded the payload is returned unchanged.
+        """
+        try:
+            schema = self.table_fields(table)
+        except Exception:
+            schema = None
+        if schema is None:
+            return fields, [], False
+
+        prepared = {}
+        problems = []
+        typecast = False
+        for name, value in fields.items():
+            field = schema.get(name)
+            if field is None:
+                problems.append(f"'{name}' is not a field in {table}; skipped")
+                continue
+            field_type = field.get("type", "")
+            if field_type in READ_ONLY_TYPES:
+                problems.append(f"'{name}' is a computed {field_type} field; skipped")
+                continue
+            if value is None or value == "" or value == []:
+                continue
+
+            if field_type in NUMERIC_TYPES:
+                number = parse_percent(value) if field_type == "percent" else parse_number(value)
+                if number is None:
+                    problems.append(f"'{name}' expects a number, got '{value}'; skipped")
+                    continue
+                precision = (field.get("options") or {}).get("precision")
+                prepared[name] = int(number) if precision == 0 or field_type == "rating" else number
+            elif field_type in TEXT_TYPES:
+                text = value if isinstance(value, str) else ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+                if field_type == "singleLineText":
+                    text = " ".join(text.split())
+                prepared[name] = text
+            elif field_type == "singleSelect":
+                choice = str(value).strip()
+                choices = {c.get("name") for c in (field.get("options") or {}).get("choices", [])}
+                if choices and choice not in choices:
+                    problems.append(f"'{choice}' is a new option for '{name}'")
+                    typecast = True
+                prepared[name] = choice
+            elif field_type == "multipleSelects":
+                values = value if isinstance(value, list) else [v.strip() for v in str(value).split(",")]
+                choices = {c.get("name") for c in (field.get("options") or {}).get("choices", [])}
+                if choices and any(v not in choices for v in values):
+                    typecast = True
+                prepared[name] = [v for v in values if v]
+            elif field_type == "multipleRecordLinks":
+                ids = value if isinstance(value, list) else [value]
+                valid = [i for i in ids if isinstance(i, str) and i.startswith("rec")]
+                if len(valid) != len(ids):
+                    problems.append(f"'{name}' had {len(ids) - len(valid)} invalid record ID(s); skipped those")
+                if valid:
+                    prepared[name] = valid
+            elif field_type == "multipleAttachments":
+                items = value if isinstance(value, list) else [value]
+                attachments = []
+                for item in items:
+                    if isinstance(item, str) and item:
+                        attachments.append({"url": item})
+                    elif isinstance(item, dict) and item.get("url"):
+                        attachments.append({k: v for k, v in item.items() if k in ("url", "filename")})
+                    else:
+                        problems.append(f"'{name}' had an attachment without a URL; skipped it")
+                if attachments:
+                    prepared[name] = attachments
+            elif field_type == "checkbox":
+                prepared[name] = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "y", "x")
+            else:
+                prepared[name] = value
+        return prepared, problems, typecast
+
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def get_schema(base_id: str, api_key: str, ttl_seconds: float = 3600) -> AirtableSchema:
+    """Process-wide schema cache per base, shared across Streamlit reruns and sessions."""
+    with _schemas_lock:
+        schema = _schemas.get(base_id)
+        if schema is None:
+            schema = AirtableSchema(base_id, api_key, ttl_seconds)
+            _schemas[base_id] = schema
+        return schema
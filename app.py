@@ -1,21 +1,49 @@
 import streamlit as st
-import fitz
-import docx
-from openai import OpenAI
+import streamlit.components.v1 as components
+from openai import AsyncOpenAI, OpenAI
 import requests
-import json
-import re
 import boto3
-from typing import Dict, List
+from boto3.s3.transfer import TransferConfig
+from typing import Callable, Dict, List
 from datetime import datetime
 import random
 import time
 import urllib.parse
-import hashlib
 import hmac
 import base64
-import tempfile
 import os
+import uuid
+import threading
+from concurrent.futures import Future
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from json_stream import IncrementalJSONObjectParser
+from property_lookup import (
+    bulk_lookup, format_mortgage_lender_info, format_ownership_sale_info, format_parcel_tax_info,
+    format_physical_property, format_public_records, generate_maps_link, lookup_property,
+    read_address_csv, read_address_list, rows_to_csv
+)
+from local_extract import extract_local_details
+from airtable_mirror import DEFAULT_DB_PATH as AIRTABLE_MIRROR_DEFAULT_DB, get_mirror
+from airtable_schema import get_schema
+from oauth_state import get_state_store
+from auth_session import SESSION_COOKIE_NAME, cookie_script, load_session, sign_session, user_info_from_claims, verify_id_token
+from deal_fingerprints import DEFAULT_DB_PATH as DEAL_FINGERPRINT_DEFAULT_DB, get_index as get_deal_index, minhash
+from docx_text import extract_docx_text
+from doc_converter import ConverterUnavailable, DEFAULT_DB_PATH as DOC_CACHE_DEFAULT_DB, get_converter
+from ocr import DEFAULT_DB_PATH as OCR_DEFAULT_DB, IMAGE_EXTENSIONS, get_engine as get_ocr_engine
+from spreadsheets import format_digest, summarize_workbook
+from underwriting import compute_metrics, evaluate_deals, format_metrics, format_unit_pricing
+from session_data import get_store as get_session_data_store
+from uploads import SpooledUpload, UploadSpool
+from prompt_budget import PromptBudgeter
+from openai_gateway import BATCH, INTERACTIVE, get_gateway
+from deal_prompts import TEXT_TOKENS as PROMPT_TEXT_TOKENS, parse_summary_json, summary_prompt
+from llm_async import AsyncExtractor, CallContext, get_loop as get_llm_loop
+from enrichment import (
+    BACKGROUND, INLINE, PROFILES, DEFAULT_DB_PATH as ENRICHMENT_DEFAULT_DB, PermanentJobError, get_queue as get_enrichment_queue,
+    parse_profile
+)
+from llm_usage import DEFAULT_DB_PATH as LLM_USAGE_DEFAULT_DB, get_usage_store
 
 # --- Custom CSS for Apple-like styling ---
 st.set_page_config(
@@ -415,11 +443,207 @@ GOOGLE_CLIENT_ID = get_config("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = get_config("GOOGLE_CLIENT_SECRET")
 REDIRECT_URI = get_config("REDIRECT_URI", "http://localhost:8501")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Pending OAuth states, shared across sessions (SQLite when OAUTH_STATE_DB is set for multiple replicas)
+oauth_states = get_state_store(get_config("OAUTH_STATE_DB"), float(get_config("OAUTH_STATE_TTL", "600")))
+
+# Signed session cookie so a refresh does not repeat the OAuth flow; off unless SESSION_SECRET is set
+SESSION_SECRET = get_config("SESSION_SECRET")
+SESSION_COOKIE_MAX_AGE = int(float(get_config("SESSION_COOKIE_HOURS", "12")) * 3600)
+# Seconds a Team membership confirmed with the API is trusted from the mirror
+TEAM_CHECK_TTL = float(get_config("TEAM_CHECK_TTL", "300"))
+
+# Initialize OpenAI clients; retries are handled by the gateway
+client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+# One gateway per process paces every session's OpenAI calls against the account's limits
+openai_gateway = get_gateway(
+    client,
+    async_client,
+    rpm=int(get_config("OPENAI_RPM", "500")),
+    tpm=int(get_config("OPENAI_TPM", "200000")),
+    batch_share=float(get_config("OPENAI_BATCH_SHARE", "0.5")),
+    max_retries=int(get_config("OPENAI_MAX_RETRIES", "5"))
+)
+
+# Local store for OpenAI token and cost accounting
+usage_store = get_usage_store(get_config("LLM_USAGE_DB", LLM_USAGE_DEFAULT_DB))
+
+def record_usage(caller: str, model: str, usage) -> None:
+    """Record the token usage of a completion against the current deal and user."""
+    if not usage:
+        return
+    try:
+        usage_store.record(
+            caller,
+            model,
+            usage.prompt_tokens,
+            usage.completion_tokens,
+            run_id=st.session_state.get("deal_run_id", ""),
+            user=st.session_state.get("selected_user_name", "")
+        )
+    except Exception:
+        pass  # Accounting must never break extraction
+
+# Document text in prompts is trimmed by tokens to a per-prompt budget (PROMPT_<NAME>_TOKENS, 0 = the
+# full context window), and the whole prompt to PROMPT_MAX_INPUT_TOKENS when set
+prompt_budgeter = PromptBudgeter(
+    int(get_config("PROMPT_MAX_INPUT_TOKENS", "0")),
+    text_tokens={
+        name: int(get_config(f"PROMPT_{name.upper()}_TOKENS", str(default)))
+        for name, default in PROMPT_TEXT_TOKENS.items()
+    }
+)
+
+def report_truncation(caller: str, fitted) -> None:
+    """Note when a prompt's document text was trimmed to fit the model's token budget."""
+    if fitted.truncated:
+        try:
+            st.caption(
+                f"✂️ {caller}: used the first {fitted.kept_chars:,} of {fitted.total_chars:,} characters "
+                f"to fit the {fitted.budget_tokens:,}-token input budget"
+            )
+        except Exception:
+            pass  # No Streamlit context (background thread)
+
+# Local mirror of the Deals, Contacts and Team tables, kept current in the background
+AIRTABLE_MIRROR_SYNC_SECONDS = float(get_config("AIRTABLE_MIRROR_SYNC_SECONDS", "300"))
+airtable_mirror = get_mirror(
+    AIRTABLE_BASE_ID,
+    AIRTABLE_PAT,
+    [t for t in (AIRTABLE_TABLE_NAME, "Contacts", "Team") if t],
+    get_config("AIRTABLE_MIRROR_DB", AIRTABLE_MIRROR_DEFAULT_DB)
+)
+if AIRTABLE_PAT and AIRTABLE_BASE_ID:
+    airtable_mirror.start_background_sync(AIRTABLE_MIRROR_SYNC_SECONDS)
+
+# Cached base schema, used to validate and coerce fields before every write
+AIRTABLE_SCHEMA_TTL = float(get_config("AIRTABLE_SCHEMA_TTL", "3600"))
+airtable_schema = get_schema(AIRTABLE_BASE_ID, AIRTABLE_PAT, AIRTABLE_SCHEMA_TTL)
+
+def prepare_airtable_payload(table: str, fields: Dict, show_problems: bool = True) -> Dict:
+    """Validate fields against the cached schema and build the JSON body for a create or update."""
+    fields, problems, typecast = airtable_schema.prepare_fields(table, fields)
+    if problems and show_problems:
+        st.warning("Adjusted before saving to Airtable:\n" + "\n".join(f"- {p}" for p in problems))
+    payload = {"fields": fields}
+    if typecast:
+        payload["typecast"] = True
+    return payload
+
+# Large per-session values (notes, contacts, property data) live outside st.session_state,
+# under a per-session memory budget with spill to compressed local blobs
+session_data = get_session_data_store(
+    budget_bytes=int(float(get_config("SESSION_MEMORY_BUDGET_MB", "8")) * 1024 * 1024),
+    spill_bytes=int(float(get_config("SESSION_SPILL_KB", "256")) * 1024),
+    idle_seconds=float(get_config("SESSION_IDLE_SECONDS", "7200"))
+)
+
+def current_session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+def put_session_value(key: str, value, on_discard=None) -> None:
+    session_data.set(current_session_id(), key, value, on_discard)
+
+def take_session_value(key: str, default=None):
+    """Remove a value without running its on_discard, for callers that take over what it refers to."""
+    return session_data.take(current_session_id(), key, default)
+
+def get_session_value(key: str, default=None):
+    return session_data.get(current_session_id(), key, default)
+
+def drop_session_values(keys) -> None:
+    session_data.delete(current_session_id(), keys)
+
+# Duplicate deal detection by document fingerprint before any paid calls, and by property address
+deal_index = get_deal_index(get_config("DEAL_FINGERPRINT_DB", DEAL_FINGERPRINT_DEFAULT_DB))
+DEAL_DUPLICATE_THRESHOLD = float(get_config("DEAL_DUPLICATE_THRESHOLD", "0.8"))
+AIRTABLE_DEALS_RECORD_URL = get_config("AIRTABLE_DEALS_RECORD_URL", "https://airtable.com/appvfD3RKkfDQ6f8j/tblS3TYknfDGYArnc")
+
+def find_duplicate_deals(signature=None, location: str = "") -> List[Dict]:
+    """
+    Saved deals with near-duplicate text or the same property location. Only the
+    property's own Location is matched: other addresses in a memo (the broker's
+    office in a signature) are shared by unrelated deals.
+    """
+    locations = [location] if location else []
+    duplicates = deal_index.find_duplicates(signature, locations, DEAL_DUPLICATE_THRESHOLD)
+    # Deals saved before the index existed are matched by address via the mirror
+    known_ids = {d["record_id"] for d in duplicates}
+    for address in locations:
+        for record in airtable_mirror.find_by_address(AIRTABLE_TABLE_NAME, address):
+            if record["id"] not in known_ids:
+                known_ids.add(record["id"])
+                duplicates.append({
+                    "record_id": record["id"],
+                    "property_name": record["fields"].get("Property Name", ""),
+                    "reason": f"Same address: {address}"
+                })
+    return duplicates
+
+def show_duplicate_deals(duplicates: List[Dict], message: str) -> None:
+    st.warning(message)
+    for duplicate in duplicates:
+        name = duplicate.get("property_name") or duplicate["record_id"]
+        st.markdown(f"• [{name}]({AIRTABLE_DEALS_RECORD_URL}/{duplicate['record_id']}) — {duplicate['reason']}")
+    st.info("Check 'Analyze even if this looks like a duplicate' and analyze again to continue.")
+
+# Stream the deal summary so fields render as they arrive
+STREAMING_SUMMARY = str(get_config("STREAMING_SUMMARY", "true")).lower() in ("1", "true", "yes")
+
+# Bulk property lookups: concurrent workers sharing a Smarty rate limit
+SMARTY_BULK_WORKERS = int(get_config("SMARTY_BULK_WORKERS", "8"))
+SMARTY_RATE_LIMIT = float(get_config("SMARTY_RATE_LIMIT", "10"))
+BULK_LOOKUP_MAX_ADDRESSES = 500
+
+# Contact extraction runs on the fast model and escalates to the large model
+# when the confidence score falls below the threshold
+CONTACT_FAST_MODEL = get_config("CONTACT_FAST_MODEL", "gpt-3.5-turbo")
+CONTACT_LARGE_MODEL = get_config("CONTACT_LARGE_MODEL", "gpt-4")
+CONTACT_ESCALATION_THRESHOLD = float(get_config("CONTACT_ESCALATION_THRESHOLD", "0.7"))
+
+# Async extraction on one shared event loop; the helpers below run its coroutines from the script thread
+llm_loop = get_llm_loop()
+llm = AsyncExtractor(
+    openai_gateway,
+    prompt_budgeter,
+    usage_store,
+    (CONTACT_FAST_MODEL, CONTACT_LARGE_MODEL),
+    CONTACT_ESCALATION_THRESHOLD
+)
+
+def llm_context() -> CallContext:
+    """Usage attribution for calls made on behalf of this session."""
+    return CallContext(st.session_state.get("deal_run_id", ""), st.session_state.get("selected_user_name", ""))
+
+def run_llm(coro, ctx: CallContext):
+    """Run an extraction coroutine on the shared loop, then report what it trimmed or failed to parse."""
+    result = llm_loop.run(coro)
+    for caller, fitted in ctx.truncated:
+        report_truncation(caller, fitted)
+    for error in ctx.errors:
+        st.error(error)
+    return result
 
 # Check Smarty configuration
 SMARTY_ENABLED = bool(SMARTY_AUTH_ID and SMARTY_AUTH_TOKEN)
+
+# Local Tesseract OCR for scanned PDF pages and image uploads (skipped if tesseract is not installed)
+ocr_engine = get_ocr_engine(
+    int(get_config("OCR_WORKERS", "0")) or None,
+    get_config("OCR_LANG", "eng"),
+    get_config("OCR_CACHE_DB", OCR_DEFAULT_DB)
+)
+OCR_ENABLED = str(get_config("OCR_ENABLED", "true")).lower() in ("1", "true", "yes") and ocr_engine.available
+
+# Legacy .doc conversion through antiword or a warm headless LibreOffice
+doc_converter = get_converter(
+    int(get_config("DOC_CONVERTER_WORKERS", "2")),
+    int(get_config("DOC_CONVERTER_QUEUE", "8")),
+    float(get_config("DOC_CONVERTER_TIMEOUT", "60")),
+    get_config("DOC_CACHE_DB", DOC_CACHE_DEFAULT_DB)
+)
 if not SMARTY_ENABLED:
     try:
         st.warning("Smarty API credentials not found. Address validation will be disabled.")
@@ -434,10 +658,17 @@ s3 = boto3.client(
     region_name=S3_REGION
 )
 
+# Multipart S3 uploads read the spooled file in parts instead of buffering it
+s3_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4
+)
+
 # --- Helper Functions ---
-def upload_to_s3(file_data, filename) -> str:
+def upload_to_s3(path: str, filename) -> str:
     key = f"deal-uploads/{datetime.now().strftime('%Y%m%d-%H%M%S')}-{filename}"
-    s3.upload_fileobj(file_data, S3_BUCKET, key)
+    s3.upload_file(path, S3_BUCKET, key, Config=s3_transfer_config)
     
     # Generate a pre-signed URL that's valid for 1 hour
     try:
@@ -463,128 +694,87 @@ def delete_from_s3(s3_url: str):
     except Exception as e:
         st.warning(f"Failed to delete file from S3: {str(e)}")
 
-def extract_text_from_pdf(f) -> str:
-    doc = fitz.open(stream=f.read(), filetype="pdf")
-    return "\n".join(page.get_text() for page in doc)
+def extract_text_from_pdf(upload: SpooledUpload) -> str:
+    return ocr_engine.extract_documents([("document.pdf", upload.path)], ocr=OCR_ENABLED)[0]
 
-def extract_text_from_docx(f) -> str:
-    doc = docx.Document(f)
-    return "\n".join(p.text for p in doc.paragraphs)
+def extract_text_from_docx(upload: SpooledUpload) -> str:
+    return extract_docx_text(upload.path)
 
-def extract_text_from_doc(f) -> str:
+def extract_text_from_doc(upload: SpooledUpload) -> str:
     """
     Extract text from .doc files.
-    Note: .doc is an older Microsoft Word format. python-docx only supports .docx.
-    For .doc files, users should convert to .docx format for best results.
+    Note: .doc is an older Microsoft Word format that python-docx cannot read,
+    so it goes through the local converter (antiword or LibreOffice).
     """
-    # python-docx only works with .docx files, not .doc
-    # Return a helpful message suggesting conversion
-    return "[Error: .doc file format is not fully supported. Please convert your file to .docx format and upload again. You can do this by opening the file in Microsoft Word and saving as .docx.]"
+    try:
+        return doc_converter.convert(upload.data)
+    except ConverterUnavailable:
+        return "[Error: .doc file format is not fully supported. Please convert your file to .docx format and upload again. You can do this by opening the file in Microsoft Word and saving as .docx.]"
+    except Exception as e:
+        return f"[Error converting .doc file: {str(e)}]"
 
 def summarize_notes(notes: str) -> str:
-    if not notes.strip():
-        return ""
-    prompt = (
-        "Summarize the following deal notes or email thread in 2-4 concise, neutral bullet points:\n\n"
-        f"{notes}"
-    )
-    res = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    return res.choices[0].message.content.strip()
+    ctx = llm_context()
+    return run_llm(llm.summarize_notes(notes, ctx), ctx)
 
-def extract_address_fallback(text: str) -> str:
+def extract_address_fallback(text: str, local_details: Dict = None) -> str:
     """Extract address using a more focused approach when main extraction fails."""
-    prompt = (
-        "Extract the complete property address from the following text. "
-        "Look for addresses that include street number, street name, city, state, and zip code. "
-        "Common formats include:\n"
-        "- '123 Main St, City, State 12345'\n"
-        "- '15031-15139 Marlboro Pike, Upper Marlboro, MD 20772'\n"
-        "- '456 Oak Avenue, Springfield, IL 62701'\n\n"
-        "Return ONLY the complete address, or 'NOT_FOUND' if no complete address is found.\n\n"
-        f"Text:\n{text[:2000]}"
-    )
-    
-    res = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.1
-    )
-    
-    result = res.choices[0].message.content.strip()
-    
-    if result and result != "NOT_FOUND" and len(result) > 10:
-        return result
-    
-    return ""
+    ctx = llm_context()
+    return run_llm(llm.extract_address_fallback(text, ctx, local_details), ctx)
 
-def extract_contact_info(text: str) -> str:
-    prompt = (
-        "Extract the contact information (name, company, phone, and email) of any brokers, "
-        "sponsors, or agents from the following text. Be thorough and include details even if they "
-        "are buried in an email signature or footnote. Return in plain text format.\n\nText:\n"
-        + text[:3500]
-    )
-    res = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    result = res.choices[0].message.content.strip()
-    
-    # Return blank if no meaningful contact info found
-    if not result or "no contact information" in result.lower() or "no brokers" in result.lower():
-        return ""
-    
-    return result
+def extract_contact_info(text: str, local_details: Dict = None) -> str:
+    """
+    Extract broker/sponsor contact details with the fast model first,
+    escalating to the large model only when the fast result looks unreliable.
+    """
+    ctx = llm_context()
+    return run_llm(llm.extract_contact_info(text, ctx, local_details), ctx)
+
+def build_summary_prompt(text: str, deal_type: str, model: str = "gpt-3.5-turbo") -> str:
+    fitted = summary_prompt(prompt_budgeter, text, deal_type, model)
+    report_truncation("gpt_extract_summary", fitted)
+    return fitted.prompt
 
 def gpt_extract_summary(text: str, deal_type: str) -> Dict:
-    prompt = (
-        f"You are an AI real estate analyst reviewing a {deal_type.lower()} opportunity.\n\n"
-        f"Text:\n{text[:4000]}\n\n"
-        "Return JSON with:\n"
-        "- Property Name\n"
-        "- Location (extract the COMPLETE property address including street number, street name, city, state, and zip code if available. Look for addresses in formats like '123 Main St, City, State 12345' or '15031-15139 Marlboro Pike, Upper Marlboro, MD 20772')\n"
-        "- Asset Class\n"
-        "- Sponsor\n"
-        "- Broker\n"
-        "- Purchase Price\n"
-        "- Loan Amount\n"
-        "- In-Place Cap Rate\n"
-        "- Interest Rate\n"
-        "- Square Footage or Unit Count\n"
-        "- Key Highlights (bullet points)\n"
-        "- Risks or Red Flags (bullet points)\n"
-        "- Summary (2-3 sentences)\n"
-    )
-    res = client.chat.completions.create(
+    ctx = llm_context()
+    return run_llm(llm.extract_summary(text, deal_type, ctx), ctx)
+
+def gpt_extract_summary_stream(text: str, deal_type: str, on_field: Callable[[str, object], None] = None) -> Dict:
+    """
+    Streaming variant of gpt_extract_summary.
+    Calls on_field(name, value) as soon as each top-level JSON field is complete.
+    """
+    stream = openai_gateway.create(
+        INTERACTIVE,
         model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
+        messages=[{"role": "user", "content": build_summary_prompt(text, deal_type)}],
+        temperature=0.3,
+        stream=True,
+        stream_options={"include_usage": True}
     )
-    raw = res.choices[0].message.content
-    cleaned = re.sub(r"```(?:json)?", "", raw).strip()
-    cleaned = re.sub(r"^[^\{]*", "", cleaned, flags=re.DOTALL)
-    return json.loads(cleaned)
-
-def generate_maps_link(address: str) -> str:
-    """Generate a Google Maps link from an address."""
-    if not address:
-        return ""
-    
-    # Clean and format the address for better Google Maps results
-    import urllib.parse
-    
-    # Remove extra whitespace and normalize
-    cleaned_address = ' '.join(address.split())
-    
-    # URL encode the address properly
-    encoded_address = urllib.parse.quote(cleaned_address)
-    
-    return f"https://www.google.com/maps/search/?api=1&query={encoded_address}"
+    parser = IncrementalJSONObjectParser()
+    raw_parts = []
+    model = "gpt-3.5-turbo"
+    usage = None
+    for chunk in stream:
+        model = getattr(chunk, "model", None) or model
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        raw_parts.append(delta)
+        for key, value in parser.feed(delta):
+            if on_field:
+                on_field(key, value)
+    record_usage("gpt_extract_summary", model, usage)
+    
+    if parser.done:
+        return parser.result
+    # Fall back to parsing the full response if the stream was not a clean object
+    return parse_summary_json("".join(raw_parts))
 
 def validate_address(address: str) -> Dict:
     """
@@ -595,109 +785,7 @@ def validate_address(address: str) -> Dict:
         return None
         
     try:
-        # Enhanced address parsing to handle various formats
-        def parse_address(addr):
-            """Parse address into components, handling various formats."""
-            addr = addr.strip()
-            
-            # Handle range addresses like "15031-15139 Marlboro Pike"
-            if '-' in addr and any(char.isdigit() for char in addr.split('-')[0]):
-                # Extract the first number for the range
-                parts = addr.split('-', 1)
-                if len(parts) == 2:
-                    first_num = parts[0].strip()
-                    rest = parts[1].strip()
-                    # Use the first number as the street number
-                    street = f"{first_num} {rest}"
-                else:
-                    street = addr
-            else:
-                street = addr
-            
-            # Split by comma to get components
-            parts = [part.strip() for part in street.split(',')]
-            
-            if len(parts) >= 3:
-                street = parts[0]
-                city = parts[1]
-                state_zip = parts[2].split()
-                state = state_zip[0] if state_zip else ""
-                zipcode = state_zip[1] if len(state_zip) > 1 else ""
-            elif len(parts) == 2:
-                street = parts[0]
-                city_state_zip = parts[1].split()
-                if len(city_state_zip) >= 3:
-                    city = city_state_zip[0]
-                    state = city_state_zip[1]
-                    zipcode = city_state_zip[2]
-                else:
-                    city = parts[1]
-                    state = ""
-                    zipcode = ""
-            else:
-                # Try to parse single line address
-                words = street.split()
-                if len(words) >= 4:
-                    # Look for state abbreviation (2 letters) and zip (5 digits)
-                    for i, word in enumerate(words):
-                        if len(word) == 2 and word.isalpha() and i < len(words) - 1:
-                            if words[i + 1].isdigit() and len(words[i + 1]) == 5:
-                                street = ' '.join(words[:i])
-                                city = ' '.join(words[i-1:i]) if i > 0 else ""
-                                state = word
-                                zipcode = words[i + 1]
-                                break
-                    else:
-                        # Fallback - use first part as street
-                        street = words[0] if words else ""
-                        city = ' '.join(words[1:]) if len(words) > 1 else ""
-                        state = ""
-                        zipcode = ""
-                else:
-                    street = street
-                    city = ""
-                    state = ""
-                    zipcode = ""
-            
-            return street, city, state, zipcode
-        
-        street, city, state, zipcode = parse_address(address)
-
-        # Construct API URL with proper encoding
-        base_url = "https://us-enrichment.api.smarty.com/lookup/search/property/principal"
-        params = {
-            "auth-id": SMARTY_AUTH_ID,
-            "auth-token": SMARTY_AUTH_TOKEN,
-            "street": street,
-            "city": city,
-            "state": state,
-            "zipcode": zipcode
-        }
-        
-        # Make the API request
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data and len(data) > 0:
-            result = data[0]
-            
-            # Format the address and extract property data
-            property_data = {
-                "formatted_address": f"{result['matched_address']['street']}, {result['matched_address']['city']}, {result['matched_address']['state']} {result['matched_address']['zipcode']}",
-                "property_type": result.get('attributes', {}).get('land_use_standard', ''),
-                "raw_data": result
-            }
-            return property_data
-        else:
-            # If Smarty doesn't find a match, return the original address for Google Maps
-            return {
-                "formatted_address": address,
-                "property_type": "",
-                "raw_data": None
-            }
-            
+        return lookup_property(address, SMARTY_AUTH_ID, SMARTY_AUTH_TOKEN)
     except requests.exceptions.RequestException as e:
         st.error("Smarty API Error")
         return None
@@ -706,239 +794,25 @@ def validate_address(address: str) -> Dict:
         return {
             "formatted_address": address,
             "property_type": "",
-            "raw_data": None
+            "record": None
         }
     
     return None
 
-def format_tax_info(address_data):
-    """Format tax information from Smarty API response into a readable string."""
-    if not address_data or 'raw_data' not in address_data:
-        return ""
-        
-    tax_info = address_data['raw_data']['tax_info']
+def prefetch_address_validation(address: str) -> Future:
+    """Run validate_address on a background thread so it overlaps with the rest of the analysis."""
+    future = Future()
     
-    # Format currency values
-    def format_currency(value):
-        try:
-            if not value:
-                return "N/A"
-            return f"${float(value):,.2f}"
-        except:
-            return str(value)
-    
-    sections = []
-    
-    # Current Tax Information
-    current_tax = tax_info['current_tax']
-    if any(current_tax.values()):
-        sections.append(f"Current Tax Information:\n" +
-                      f"• Tax Year: {current_tax['tax_year']}\n" +
-                      f"• Tax Amount: {format_currency(current_tax['tax_amount'])}\n" +
-                      f"• Tax Rate Area: {current_tax['tax_rate_area']}\n" +
-                      f"• Tax Jurisdiction: {current_tax['tax_jurisdiction']}")
-
-    # Assessment Values
-    assessment = tax_info['assessment']
-    if any(assessment.values()):
-        sections.append(f"Assessment Values:\n" +
-                      f"• Total Value: {format_currency(assessment['total_value'])}\n" +
-                      f"• Assessed Value: {format_currency(assessment['assessed_value'])}\n" +
-                      f"• Land Value: {format_currency(assessment['land_value'])}\n" +
-                      f"• Improvement Value: {format_currency(assessment['improvement_value'])}\n" +
-                      f"• Improvement %: {assessment['improvement_percent']}%\n" +
-                      f"• Assessment Year: {assessment['assessment_year']}\n" +
-                      f"• Last Update: {assessment['last_update']}")
-
-    # Market Values
-    market = tax_info['market_values']
-    if any(market.values()):
-        sections.append(f"Market Values:\n" +
-                      f"• Total Value: {format_currency(market['total_value'])}\n" +
-                      f"• Land Value: {format_currency(market['land_value'])}\n" +
-                      f"• Improvement Value: {format_currency(market['improvement_value'])}\n" +
-                      f"• Improvement %: {market['improvement_percent']}%\n" +
-                      f"• Value Year: {market['value_year']}")
-
-    return "\n\n".join(sections)
-
-def format_ownership_info(address_data):
-    """Format ownership information from Smarty API response into a readable string."""
-    if not address_data or 'raw_data' not in address_data:
-        return ""
-        
-    ownership = address_data['raw_data']['ownership']
-    
-    # Format date values
-    def format_date(date_str):
-        if not date_str:
-            return "N/A"
+    def run():
         try:
-            # Try to parse and reformat the date
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return date_str
-    
-    lines = []
-    
-    # Owner Information
-    if ownership['owner_name']:
-        lines.append(f"• Owner Name: {ownership['owner_name']}")
-    
-    # Occupancy Status
-    if ownership['owner_occupied']:
-        lines.append(f"• Owner Occupied: {ownership['owner_occupied']}")
-    
-    # Sale History
-    if ownership['last_sale_date']:
-        lines.append(f"• Last Sale Date: {format_date(ownership['last_sale_date'])}")
-    
-    if ownership['prior_sale_date']:
-        lines.append(f"• Prior Sale Date: {format_date(ownership['prior_sale_date'])}")
-    
-    return "\n".join(lines) if lines else "No ownership information available"
-
-def format_physical_property(result):
-    """Format physical property information from Smarty API response."""
-    if result is None:
-        return ""
-    attrs = result.get('attributes', {})
-    
-    def format_number(value, decimals=2):
-        try:
-            if not value:
-                return "N/A"
-            return f"{float(value):,.{decimals}f}"
-        except:
-            return str(value)
-    
-    fields = {
-        "Acres": format_number(attrs.get('acres')),
-        "Building Sqft": format_number(attrs.get('building_sqft')),
-        "Stories Number": attrs.get('stories_number', 'N/A'),
-        "Year Built": attrs.get('year_built', 'N/A')
-    }
-    
-    return "\n".join(f"• {k}: {v}" for k, v in fields.items() if v != "N/A")
-
-def format_parcel_tax_info(result):
-    """Format parcel and tax information from Smarty API response."""
-    if result is None:
-        return ""
-    attrs = result.get('attributes', {})
-    
-    def format_currency(value):
-        try:
-            if not value:
-                return "N/A"
-            return f"${float(value):,.2f}"
-        except:
-            return str(value)
-    
-    fields = {
-        "Parcel Account Number": attrs.get('parcel_account_number', 'N/A'),
-        "Parcel Raw Number": attrs.get('parcel_raw_number', 'N/A'),
-        "Parcel Number Previous": attrs.get('parcel_number_previous', 'N/A'),
-        "Parcel Number Year Added": attrs.get('parcel_number_year_added', 'N/A'),
-        "Parcel Number Year Change": attrs.get('parcel_number_year_change', 'N/A'),
-        "Previous Assessed Value": format_currency(attrs.get('previous_assessed_value')),
-        "Total Market Value": format_currency(attrs.get('total_market_value')),
-        "Tax Billed Amount": format_currency(attrs.get('tax_billed_amount')),
-        "Tax Assess Year": attrs.get('tax_assess_year', 'N/A'),
-        "Tax Fiscal Year": attrs.get('tax_fiscal_year', 'N/A'),
-        "Tax Jurisdiction": attrs.get('tax_jurisdiction', 'N/A'),
-        "Zoning": attrs.get('zoning', 'N/A'),
-        "Land Use": attrs.get('land_use_standard', 'N/A')
-    }
-    
-    return "\n".join(f"• {k}: {v}" for k, v in fields.items() if v != "N/A")
-
-def format_ownership_sale_info(result):
-    """Format ownership and sale information from Smarty API response."""
-    if result is None:
-        return ""
-    attrs = result.get('attributes', {})
-    
-    def format_date(date_str):
-        if not date_str:
-            return "N/A"
-        try:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return str(date_str)
-    
-    def format_currency(value):
-        try:
-            if not value:
-                return "N/A"
-            return f"${float(value):,.2f}"
-        except:
-            return str(value)
-    
-    fields = {
-        "Owner Full Name": attrs.get('owner_full_name', 'N/A'),
-        "Owner Occupancy Status": attrs.get('owner_occupancy_status', 'N/A'),
-        "Deed Owner Full Name": attrs.get('deed_owner_full_name', 'N/A'),
-        "Deed Owner Last Name": attrs.get('deed_owner_last_name', 'N/A'),
-        "Deed Sale Date": format_date(attrs.get('deed_sale_date')),
-        "Deed Sale Price": format_currency(attrs.get('deed_sale_price')),
-        "Deed Transaction ID": attrs.get('deed_transaction_id', 'N/A'),
-        "Ownership Transfer Date": format_date(attrs.get('ownership_transfer_date')),
-        "Prior Sale Date": format_date(attrs.get('prior_sale_date')),
-        "Sale Date": format_date(attrs.get('sale_date'))
-    }
-    
-    return "\n".join(f"• {k}: {v}" for k, v in fields.items() if v != "N/A")
-
-def format_mortgage_lender_info(result):
-    """Format mortgage and lender information from Smarty API response."""
-    if result is None:
-        return ""
-    attrs = result.get('attributes', {})
-    
-    def format_currency(value):
-        try:
-            if not value:
-                return "N/A"
-            return f"${float(value):,.2f}"
-        except:
-            return str(value)
-    
-    def format_date(date_str):
-        if not date_str:
-            return "N/A"
-        try:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            return date_obj.strftime('%B %d, %Y')
-        except:
-            return str(date_str)
-    
-    def format_percentage(value):
-        try:
-            if not value:
-                return "N/A"
-            return f"{float(value):.2f}%"
-        except:
-            return str(value) if value else "N/A"
-    
-    fields = {
-        "Mortgage Amount": format_currency(attrs.get('mortgage_amount')),
-        "Mortgage Recording Date": format_date(attrs.get('mortgage_recording_date')),
-        "Mortgage Type": attrs.get('mortgage_type', 'N/A'),
-        "Mortgage Interest Type": attrs.get('mortgage_interest_type', 'N/A'),
-        "Interest Rate": format_percentage(attrs.get('interest_rate')),
-        "Lender Name": attrs.get('lender_name', 'N/A'),
-        "Lender Last Name": attrs.get('lender_last_name', 'N/A'),
-        "Lender Code 2": attrs.get('lender_code_2', 'N/A'),
-        "Lender Address": attrs.get('lender_address', 'N/A'),
-        "Lender City": attrs.get('lender_city', 'N/A'),
-        "Lender State": attrs.get('lender_state', 'N/A'),
-        "Lender Zip": attrs.get('lender_zip', 'N/A')
-    }
+            future.set_result(validate_address(address))
+        except Exception as e:
+            future.set_exception(e)
     
-    return "\n".join(f"• {k}: {v}" for k, v in fields.items() if v != "N/A")
+    thread = threading.Thread(target=run, daemon=True)
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return future
 
 def create_airtable_record(
     data: Dict,
@@ -947,8 +821,16 @@ def create_airtable_record(
     deal_type: str,
     contact_info: str,
     contact_id: str = None,
-    is_cold_call: bool = False
+    is_cold_call: bool = False,
+    background_jobs: Dict[str, Dict] = None,
+    lookup_public_records: bool = True
 ):
+    """
+    Create the deal record. background_jobs maps an enrichment kind to its job
+    payload; those steps are queued against the new record instead of run here.
+    With SAVE_FIRST_ENRICHMENT the Smarty lookup is always one of them.
+    """
+    background_jobs = dict(background_jobs or {})
     # Set status based on Cold Call toggle
     if is_cold_call:
         status = "Cold Call"
@@ -977,7 +859,10 @@ def create_airtable_record(
         
         # Get location and validate address
         location = data.get("Location", "")
-        if location and SMARTY_ENABLED:
+        if location and SMARTY_ENABLED and lookup_public_records and SAVE_FIRST_ENRICHMENT:
+            # Save the core fields now; Location, Map and Public Records are PATCHed in when the lookup finishes
+            background_jobs.setdefault("public_records", {"location": location})
+        if location and SMARTY_ENABLED and lookup_public_records and "public_records" not in background_jobs:
             address_data = validate_address(location)
             if address_data:
                 # Address validation successful
@@ -985,7 +870,7 @@ def create_airtable_record(
                 maps_link = generate_maps_link(validated_location)
                 
                 # Format property information using new functions
-                result = address_data.get('raw_data', {})
+                result = address_data.get('record')
                 
                 physical_property = format_physical_property(result)
                 parcel_tax = format_parcel_tax_info(result)
@@ -1027,6 +912,9 @@ def create_airtable_record(
             "Unit Pricing": data.get("Unit Pricing") if data else "",
             "Status Detail": data.get("Status Detail") if data else "",
         }
+        if "public_records" in background_jobs or not lookup_public_records:
+            # Filled in by the background lookup, or skipped
+            fields.pop("Public Records")
         
         # Add Owners field if user is selected
         if st.session_state.get('selected_user'):
@@ -1058,15 +946,44 @@ def create_airtable_record(
         resp = requests.post(
             f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}",
             headers=headers,
-            json={"fields": fields}
+            json=prepare_airtable_payload(AIRTABLE_TABLE_NAME, fields)
         )
         
         if resp.status_code not in (200, 201):
+            if resp.status_code == 422:
+                airtable_schema.invalidate()  # The base may have changed since the schema was cached
             st.error(f"Airtable error: {resp.text}")
             return False
         else:
             st.success("✅ Deal saved to Airtable!")
             
+            record = resp.json()
+            airtable_mirror.upsert(AIRTABLE_TABLE_NAME, record)
+            
+            # Attribute the OpenAI usage of this analysis to the saved deal
+            record_id = record.get('id', '')
+            deal_label = f"{fields.get('Property Name') or 'Untitled'} ({record_id})"
+            usage_store.assign_deal(st.session_state.get('deal_run_id', ''), deal_label)
+            
+            # Index the deal so later copies from other brokers are flagged before analysis
+            try:
+                fingerprint = st.session_state.get('deal_fingerprint') or {}
+                deal_index.add(
+                    record_id,
+                    fingerprint.get('signature'),
+                    [location, validated_location],
+                    fields.get('Property Name', '')
+                )
+            except Exception:
+                pass
+            
+            # Queue the deferred enrichment steps against the new record
+            if background_jobs:
+                for kind, payload in background_jobs.items():
+                    enrichment_queue.enqueue(AIRTABLE_TABLE_NAME, record_id, kind, payload)
+                labels = {"contacts": "contacts", "public_records": "public records", "attachments": "attachments"}
+                st.info(f"🕒 {', '.join(labels.get(k, k) for k in background_jobs).capitalize()} will be added to the record in the background.")
+            
             # Add link to view in Airtable - use custom URL if available
             # Special case: If AJ Greenberg user and Cold Call status, use Cold Call view
             selected_user_name = st.session_state.get('selected_user_name', '')
@@ -1097,82 +1014,38 @@ def create_airtable_record(
         st.error(f"Error creating Airtable record: {str(e)}")
         return False
 
-def parse_contact_info(text: str) -> Dict:
+def parse_contact_info(text: str, local_details: Dict = None) -> Dict:
     """Parse contact information from text using GPT."""
-    prompt = (
-        "Extract contact information from the following text block. "
-        "Return a JSON object with these fields (leave empty if not found):\n"
-        "- Name (full name)\n"
-        "- Email\n"
-        "- Phone (primary phone number)\n"
-        "- Address (full address)\n"
-        "- Website\n"
-        "- Organization (company or organization name)\n"
-        "- Notes (any additional relevant information)\n\n"
-        f"Text:\n{text}"
-    )
-    
-    res = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    
-    try:
-        # Clean the response and parse JSON
-        content = res.choices[0].message.content
-        # Remove any markdown code block syntax
-        content = re.sub(r"```(?:json)?", "", content).strip()
-        # Remove any text before the first {
-        content = re.sub(r"^[^\{]*", "", content, flags=re.DOTALL)
-        return json.loads(content)
-    except Exception as e:
-        st.error(f"Error parsing contact info: {str(e)}")
-        return {}
+    ctx = llm_context()
+    return run_llm(llm.parse_contact_info(text, ctx, local_details), ctx)
 
-def parse_multiple_contacts(text: str) -> List[Dict]:
+def parse_multiple_contacts(text: str, local_details: Dict = None) -> List[Dict]:
     """Parse multiple contacts from text using GPT."""
-    prompt = (
-        "Extract multiple contacts from the following text block. "
-        "The text may contain multiple people's contact information separated by sections, paragraphs, or other delimiters. "
-        "Return a JSON array where each element is a contact object with these fields (leave empty if not found):\n"
-        "- Name (full name)\n"
-        "- Email\n"
-        "- Phone (primary phone number)\n"
-        "- Address (full address)\n"
-        "- Website\n"
-        "- Organization (company or organization name)\n"
-        "- Notes (any additional relevant information)\n\n"
-        "If there's only one contact, return an array with one element. "
-        "If no contacts are found, return an empty array.\n\n"
-        f"Text:\n{text}"
-    )
+    ctx = llm_context()
+    return run_llm(llm.parse_multiple_contacts(text, ctx, local_details), ctx)
+
+def build_contact_fields(contact_data: Dict, attachments: List[str], owner: str = None) -> Dict:
+    """Contacts table fields for a parsed contact."""
+    # Format website as URL if it exists and doesn't start with http
+    website = contact_data.get("Website", "")
+    if website and not website.startswith(('http://', 'https://')):
+        website = f"https://{website}"
     
-    res = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
+    fields = {
+        "Name": contact_data.get("Name", ""),
+        "Email": contact_data.get("Email", ""),
+        "Phone": contact_data.get("Phone", ""),
+        "Address": contact_data.get("Address", ""),
+        "Website": website,
+        "Org": contact_data.get("Organization", ""),
+        "Notes": contact_data.get("Notes", ""),
+        "Attachments": [{"url": u} for u in attachments] if attachments else []
+    }
     
-    try:
-        # Clean the response and parse JSON
-        content = res.choices[0].message.content
-        # Remove any markdown code block syntax
-        content = re.sub(r"```(?:json)?", "", content).strip()
-        # Remove any text before the first [
-        content = re.sub(r"^[^\[]*", "", content, flags=re.DOTALL)
-        parsed_contacts = json.loads(content)
-        
-        # Ensure it's a list
-        if isinstance(parsed_contacts, dict):
-            parsed_contacts = [parsed_contacts]
-        elif not isinstance(parsed_contacts, list):
-            parsed_contacts = []
-            
-        return parsed_contacts
-    except Exception as e:
-        st.error(f"Error parsing multiple contacts: {str(e)}")
-        return []
+    # Add Owners field if user is selected
+    if owner:
+        fields["Owners"] = [owner]
+    return fields
 
 def create_contact_record(
     contact_data: Dict,
@@ -1185,38 +1058,31 @@ def create_contact_record(
             "Content-Type": "application/json"
         }
         
-        # Format website as URL if it exists and doesn't start with http
-        website = contact_data.get("Website", "")
-        if website and not website.startswith(('http://', 'https://')):
-            website = f"https://{website}"
+        # Link the existing contact instead of creating a duplicate
+        email = contact_data.get("Email", "").strip()
+        if email:
+            existing = airtable_mirror.find_by_email("Contacts", email)
+            if existing:
+                st.info(f"Contact with email {email} already exists in Airtable - using the existing record.")
+                return existing[0]['id']
         
-        fields = {
-            "Name": contact_data.get("Name", ""),
-            "Email": contact_data.get("Email", ""),
-            "Phone": contact_data.get("Phone", ""),
-            "Address": contact_data.get("Address", ""),
-            "Website": website,
-            "Org": contact_data.get("Organization", ""),
-            "Notes": contact_data.get("Notes", ""),
-            "Attachments": [{"url": u} for u in attachments] if attachments else []
-        }
-        
-        # Add Owners field if user is selected
-        if st.session_state.get('selected_user'):
-            fields["Owners"] = [st.session_state['selected_user']]
+        fields = build_contact_fields(contact_data, attachments, st.session_state.get('selected_user'))
         
         resp = requests.post(
             f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Contacts",
             headers=headers,
-            json={"fields": fields}
+            json=prepare_airtable_payload("Contacts", fields)
         )
         
         if resp.status_code not in (200, 201):
+            if resp.status_code == 422:
+                airtable_schema.invalidate()
             st.error(f"Airtable error: {resp.text}")
             return None
         
         # Return the record ID
         response_data = resp.json()
+        airtable_mirror.upsert("Contacts", response_data)
         return response_data.get('id')
     except Exception as e:
         st.error(f"Error creating contact: {str(e)}")
@@ -1240,28 +1106,131 @@ def create_multiple_contact_records(contacts: List[Dict], attachments: List[str]
     
     return {"success": success_count, "failure": failure_count}
 
+# --- Background enrichment of saved deals (no Streamlit calls: these run on worker threads) ---
+
+def airtable_headers() -> Dict:
+    return {"Authorization": f"Bearer {AIRTABLE_PAT}", "Content-Type": "application/json"}
+
+def patch_airtable_record(table: str, record_id: str, fields: Dict) -> None:
+    """Update fields on an existing record. Raises on failure so the job is retried."""
+    resp = requests.patch(
+        f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{table}/{record_id}",
+        headers=airtable_headers(),
+        json=prepare_airtable_payload(table, fields, show_problems=False),
+        timeout=30
+    )
+    if resp.status_code == 422:
+        airtable_schema.invalidate()
+    resp.raise_for_status()
+    airtable_mirror.upsert(table, resp.json())
+
+def create_contact_quietly(contact_data: Dict, owner: str = None) -> str:
+    """create_contact_record without UI messages; returns the record ID or raises."""
+    email = contact_data.get("Email", "").strip()
+    if email:
+        existing = airtable_mirror.find_by_email("Contacts", email)
+        if existing:
+            return existing[0]['id']
+    resp = requests.post(
+        f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Contacts",
+        headers=airtable_headers(),
+        json=prepare_airtable_payload("Contacts", build_contact_fields(contact_data, [], owner), show_problems=False),
+        timeout=30
+    )
+    if resp.status_code == 422:
+        airtable_schema.invalidate()
+    resp.raise_for_status()
+    record = resp.json()
+    airtable_mirror.upsert("Contacts", record)
+    return record['id']
+
+def enrich_public_records(payload: Dict) -> Dict:
+    """Validated Location, Map and Public Records for a saved deal."""
+    location = payload.get("location", "")
+    if not location:
+        return None
+    if not SMARTY_ENABLED:
+        return {"Map": generate_maps_link(location)}
+    # API errors propagate so the job is retried
+    address_data = lookup_property(location, SMARTY_AUTH_ID, SMARTY_AUTH_TOKEN)
+    validated_location = address_data.get("formatted_address") or location
+    fields = {"Location": validated_location, "Map": generate_maps_link(validated_location)}
+    if address_data.get("record"):
+        fields["Public Records"] = format_public_records(address_data["record"])
+    return fields
+
+def enrich_contacts(payload: Dict) -> Dict:
+    """
+    Contact Info and linked Contacts for a saved deal, extracted on the batch lane.
+    The extraction and the IDs of contacts already created are kept in the payload,
+    so a retry after a failed PATCH does not create the contacts again.
+    """
+    if "extracted_contacts" not in payload:
+        ctx = CallContext(payload.get("run_id", ""), payload.get("user", ""), BATCH)
+        contact_info, contacts = llm_loop.run(llm.contact_details(payload.get("text", ""), ctx))
+        payload["contact_info"] = contact_info
+        payload["extracted_contacts"] = [c for c in contacts if c.get("Name", "").strip()]
+    created = payload.setdefault("contact_ids", {})
+    for i, contact in enumerate(payload["extracted_contacts"]):
+        if str(i) not in created:
+            created[str(i)] = create_contact_quietly(contact, payload.get("owner"))
+    fields = {"Contact Info": payload["contact_info"]}
+    if created:
+        fields["Contacts"] = list(dict.fromkeys(created.values()))
+    return fields
+
+def enrich_attachments(payload: Dict) -> Dict:
+    """Upload a saved deal's spooled documents to S3 and attach them."""
+    files = payload.get("files", [])
+    present = [(path, name) for path, name in files if os.path.exists(path)]
+    if files and not present:
+        # Cleanup already ran for this job (e.g. a manual retry after it failed); re-upload the files instead
+        raise PermanentJobError("The spooled upload files are gone; attach the documents again")
+    attachments = [{"url": upload_to_s3(path, name), "filename": name} for path, name in present]
+    return {"Attachments": attachments} if attachments else None
+
+def remove_upload_files(files) -> None:
+    """Delete spooled upload copies given as [path, name] pairs."""
+    for path, _ in files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def remove_spooled_files(payload: Dict) -> None:
+    remove_upload_files(payload.get("files", []))
+
+# Saved deals are enriched by background workers, with retries, for steps deferred by the pipeline profile
+enrichment_queue = get_enrichment_queue(
+    get_config("ENRICHMENT_DB", ENRICHMENT_DEFAULT_DB),
+    workers=int(get_config("ENRICHMENT_WORKERS", "2")),
+    max_attempts=int(get_config("ENRICHMENT_MAX_ATTEMPTS", "6"))
+)
+enrichment_queue.set_patch(patch_airtable_record)
+enrichment_queue.register("public_records", enrich_public_records)
+enrichment_queue.register("contacts", enrich_contacts)
+enrichment_queue.register("attachments", enrich_attachments, cleanup=remove_spooled_files)
+if AIRTABLE_PAT and AIRTABLE_BASE_ID:
+    enrichment_queue.start()
+
+# Save deals before the Smarty lookup instead of waiting on it; the lookup is PATCHed in by the queue
+SAVE_FIRST_ENRICHMENT = str(get_config("SAVE_FIRST_ENRICHMENT", "true")).lower() in ("1", "true", "yes")
+
+# Cold Call deals run a lighter analysis: "fast" summarizes only and enriches after saving.
+# Per-step overrides such as "fast,attachments=inline" are allowed; "full" turns it off.
+COLD_CALL_PROFILE = parse_profile(get_config("COLD_CALL_PROFILE", "fast"))
+
 
 def generate_oauth_url():
     """Generate Google OAuth URL."""
     if not GOOGLE_CLIENT_ID:
         return None
     
-    # Generate state parameter for security - use a more stable approach
-    import secrets
-    state = secrets.token_urlsafe(32)
-    
-    # Store state in session state
-    st.session_state.oauth_state = state
-    
-    # Also store in a simple file-based cache as backup
-    try:
-        import tempfile
-        import os
-        cache_file = os.path.join(tempfile.gettempdir(), f"oauth_state_{hash(state) % 10000}.txt")
-        with open(cache_file, 'w') as f:
-            f.write(state)
-    except Exception as e:
-        st.write(f"Warning: Could not create state cache: {e}")
+    # Reuse this session's pending state across reruns of the login page
+    state = st.session_state.get('oauth_state')
+    if not oauth_states.is_pending(state):
+        state = oauth_states.issue()
+        st.session_state.oauth_state = state
     
     params = {
         'client_id': GOOGLE_CLIENT_ID,
@@ -1305,56 +1274,125 @@ def get_user_info(access_token):
         return response.json()
     return None
 
+def user_info_from_tokens(token_data):
+    """Read the user from the verified id_token, falling back to the userinfo endpoint."""
+    if token_data.get('id_token'):
+        try:
+            return user_info_from_claims(verify_id_token(token_data['id_token'], GOOGLE_CLIENT_ID))
+        except Exception:
+            pass
+    return get_user_info(token_data['access_token'])
+
+def team_member_from_record(record, user_info):
+    return {
+        'id': record['id'],
+        'name': record['fields'].get('Name', user_info.get('name', '')),
+        'email': record['fields'].get('Email', user_info.get('email', '')),
+        'deals_pipeline_url': record['fields'].get('Deals Pipeline', ''),
+        'contacts_list_url': record['fields'].get('Contacts List', '')
+    }
+
+def fetch_team_member(email: str):
+    """
+    Team record for this email from the Airtable API, or None if there is none.
+    Raises requests.HTTPError if the Team table cannot be read.
+    """
+    headers = {
+        "Authorization": f"Bearer {AIRTABLE_PAT}",
+        "Content-Type": "application/json"
+    }
+    
+    # Search for existing user by email
+    search_url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Team"
+    params = {
+        'filterByFormula': f"{{Email}} = '{email}'"
+    }
+    
+    response = requests.get(search_url, headers=headers, params=params, timeout=15)
+    response.raise_for_status()
+    records = response.json().get('records')
+    if records:
+        airtable_mirror.upsert("Team", records[0])
+        return records[0]
+    # Removed from the Team table; drop the mirrored copy so it cannot authorize anyone
+    for record in airtable_mirror.find_by_email("Team", email):
+        airtable_mirror.delete("Team", record['id'])
+    return None
+
+def confirm_team_member(email: str):
+    """
+    Team record confirming this email is still a member. The mirror only answers
+    for records it fetched within TEAM_CHECK_TTL seconds, since syncs cannot see
+    deletions; anything else is checked with the API.
+    """
+    recent = airtable_mirror.find_by_email("Team", email, max_age=TEAM_CHECK_TTL)
+    if recent:
+        return recent[0]
+    return fetch_team_member(email)
+
 def find_user_in_airtable(user_info):
     """Find existing user in Airtable. Only existing users are allowed to login."""
     try:
-        headers = {
-            "Authorization": f"Bearer {AIRTABLE_PAT}",
-            "Content-Type": "application/json"
-        }
-        
-        # First, check if Team table is accessible
-        test_url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Team"
-        test_response = requests.get(test_url, headers=headers, params={'maxRecords': 1})
-        if test_response.status_code != 200:
-            st.error(f"Cannot access Team table. Please check if the 'Team' table exists in your Airtable base. Error: {test_response.text}")
-            return None
-        
-        # Search for existing user by email
-        search_url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/Team"
-        params = {
-            'filterByFormula': f"{{Email}} = '{user_info.get('email', '')}'"
-        }
-        
-        response = requests.get(search_url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('records'):
-                # User exists, return their info
-                record = data['records'][0]
-                return {
-                    'id': record['id'],
-                    'name': record['fields'].get('Name', user_info.get('name', '')),
-                    'email': record['fields'].get('Email', user_info.get('email', '')),
-                    'deals_pipeline_url': record['fields'].get('Deals Pipeline', ''),
-                    'contacts_list_url': record['fields'].get('Contacts List', '')
-                }
-            else:
-                # User not found in Team table
-                return None
-        else:
-            return None
-        
+        record = confirm_team_member(user_info.get('email', ''))
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Cannot access Team table. Please check if the 'Team' table exists in your Airtable base. Error: {e.response.text}")
+        return None
     except Exception as e:
         st.error(f"Error searching for user in Airtable: {str(e)}")
         return None
+    # None means the user is not in the Team table
+    return team_member_from_record(record, user_info) if record else None
+
+def start_session(airtable_user, user_info):
+    """Mark the session as logged in and queue the signed session cookie."""
+    st.session_state.authenticated = True
+    st.session_state.user_info = user_info
+    st.session_state.selected_user = airtable_user['id']
+    st.session_state.selected_user_name = airtable_user['name']
+    st.session_state.deals_pipeline_url = airtable_user.get('deals_pipeline_url', '')
+    st.session_state.contacts_list_url = airtable_user.get('contacts_list_url', '')
+    if SESSION_SECRET:
+        st.session_state.pending_session_cookie = sign_session(
+            {
+                'user': airtable_user,
+                'user_info': {k: user_info.get(k, '') for k in ('id', 'email', 'name', 'picture')}
+            },
+            SESSION_SECRET,
+            SESSION_COOKIE_MAX_AGE
+        )
+
+def restore_session_from_cookie():
+    """Log the session in from a valid session cookie. Returns True on success."""
+    try:
+        session = load_session(st.context.cookies.get(SESSION_COOKIE_NAME), SESSION_SECRET)
+    except Exception:
+        return False
+    if not session:
+        return False
+    airtable_user = session.get('user') or {}
+    user_info = session.get('user_info') or {}
+    # Drop sessions of people removed from the Team table; if that can't be confirmed, log in again
+    try:
+        if not confirm_team_member(user_info.get('email', '')):
+            return False
+    except Exception:
+        return False
+    st.session_state.authenticated = True
+    st.session_state.user_info = user_info
+    st.session_state.selected_user = airtable_user.get('id')
+    st.session_state.selected_user_name = airtable_user.get('name', '')
+    st.session_state.deals_pipeline_url = airtable_user.get('deals_pipeline_url', '')
+    st.session_state.contacts_list_url = airtable_user.get('contacts_list_url', '')
+    return True
 
 def logout_user():
     """Logout the current user and clear session state."""
     # Set logout flag to prevent OAuth processing
     st.session_state.logout_requested = True
     
+    # Drop only this session's pending OAuth state
+    oauth_states.discard(st.session_state.get('oauth_state'))
+    
     # Clear session state
     for key in ['authenticated', 'user_info', 'selected_user', 'selected_user_name', 'oauth_state']:
         if key in st.session_state:
@@ -1363,20 +1401,9 @@ def logout_user():
     # Clear OAuth-related URL parameters completely
     st.query_params.clear()
     
-    # Clean up any cache files
-    try:
-        import tempfile
-        import os
-        import glob
-        temp_dir = tempfile.gettempdir()
-        state_files = glob.glob(os.path.join(temp_dir, "oauth_state_*.txt"))
-        for state_file in state_files:
-            try:
-                os.remove(state_file)
-            except:
-                pass
-    except:
-        pass
+    # The browser still sends the old cookie for this session, so ignore it and clear it on the next render
+    st.session_state.skip_session_cookie = True
+    st.session_state.clear_session_cookie = True
     
     # Clear the logout flag after cleanup
     if 'logout_requested' in st.session_state:
@@ -1386,6 +1413,12 @@ def logout_user():
 
 def fetch_users():
     """Fetch list of users from the Team table."""
+    if airtable_mirror.is_synced("Team"):
+        return [
+            {'id': record['id'], 'name': record['fields']['Name']}
+            for record in airtable_mirror.all("Team")
+            if record['fields'].get('Name')
+        ]
     try:
         headers = {
             "Authorization": f"Bearer {AIRTABLE_PAT}",
@@ -1421,29 +1454,15 @@ def fetch_users():
 def list_airtable_fields():
     """List all available fields in the Airtable base to help identify field names."""
     try:
-        headers = {
-            "Authorization": f"Bearer {AIRTABLE_PAT}",
-            "Content-Type": "application/json"
-        }
-        
-        # Get table schema
-        resp = requests.get(
-            f"https://api.airtable.com/v0/meta/bases/{AIRTABLE_BASE_ID}/tables",
-            headers=headers
-        )
-        
-        if resp.status_code == 200:
-            tables = resp.json().get('tables', [])
-            for table in tables:
-                if table.get('name') == AIRTABLE_TABLE_NAME:
-                    st.info(f"Available fields in '{AIRTABLE_TABLE_NAME}' table:")
-                    for field in table.get('fields', []):
-                        field_name = field.get('name', '')
-                        field_type = field.get('type', '')
-                        st.write(f"• {field_name} ({field_type})")
-                    return
-        else:
-            st.error(f"Could not fetch table schema: {resp.text}")
+        fields = airtable_schema.table_fields(AIRTABLE_TABLE_NAME)
+        if fields is None:
+            st.error(f"Table '{AIRTABLE_TABLE_NAME}' not found in the base schema")
+            return
+        st.info(f"Available fields in '{AIRTABLE_TABLE_NAME}' table:")
+        for field_name, field in fields.items():
+            st.write(f"• {field_name} ({field.get('type', '')})")
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Could not fetch table schema: {e.response.text}")
     except Exception as e:
         st.error(f"Error fetching table schema: {str(e)}")
 
@@ -1464,8 +1483,6 @@ if 's3_urls' not in st.session_state:
     st.session_state.s3_urls = []
 if 'attachments' not in st.session_state:
     st.session_state.attachments = []
-if 'raw_notes' not in st.session_state:
-    st.session_state.raw_notes = ""
 if 'selected_user' not in st.session_state:
     st.session_state.selected_user = None
 if 'authenticated' not in st.session_state:
@@ -1480,7 +1497,13 @@ if 'oauth_state' not in st.session_state:
 if 'logout_requested' in st.session_state:
     del st.session_state['logout_requested']
 
+if not st.session_state.authenticated and SESSION_SECRET and not st.session_state.get('skip_session_cookie'):
+    restore_session_from_cookie()
+
 if not st.session_state.authenticated:
+    if st.session_state.pop('clear_session_cookie', False):
+        components.html(cookie_script("", 0, REDIRECT_URI.startswith("https")), height=0)
+    
     # Check if we have OAuth credentials
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
         st.error("OAuth not configured. Please add GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET to your secrets.")
@@ -1489,41 +1512,12 @@ if not st.session_state.authenticated:
     # Check for OAuth callback
     query_params = st.query_params
     if 'code' in query_params and 'state' in query_params and not st.session_state.get('logout_requested', False):
-        # Verify state parameter with better error handling
+        # Verify and consume the state; each state is accepted once, before it expires
         received_state = query_params['state']
-        
-        # Try to get stored state from multiple sources
-        stored_state = st.session_state.get('oauth_state')
-        
-        # If session state is lost, try to recover from file cache
-        if not stored_state:
-            try:
-                import tempfile
-                import os
-                import glob
-                # Look for any oauth state files
-                temp_dir = tempfile.gettempdir()
-                state_files = glob.glob(os.path.join(temp_dir, "oauth_state_*.txt"))
-                
-                for state_file in state_files:
-                    try:
-                        with open(state_file, 'r') as f:
-                            cached_state = f.read().strip()
-                            if cached_state == received_state:
-                                stored_state = cached_state
-                                st.session_state.oauth_state = stored_state
-                                # Clean up the cache file
-                                os.remove(state_file)
-                                break
-                    except:
-                        continue
-            except Exception as e:
-                pass
-        
-        if not stored_state:
-            st.error("OAuth session expired. Please try signing in again.")
+        code = query_params['code']
+        if not oauth_states.consume(received_state):
+            st.error("OAuth session expired or invalid. Please try signing in again.")
             
-            # Add clear cache button
             col1, col2 = st.columns([2, 1])
             with col1:
                 if st.button("🔄 Clear Cache & Try Again", type="primary"):
@@ -1534,22 +1528,6 @@ if not st.session_state.authenticated:
                     
                     # Clear URL parameters
                     st.query_params.clear()
-                    
-                    # Clean up cache files
-                    try:
-                        import tempfile
-                        import os
-                        import glob
-                        temp_dir = tempfile.gettempdir()
-                        state_files = glob.glob(os.path.join(temp_dir, "oauth_state_*.txt"))
-                        for state_file in state_files:
-                            try:
-                                os.remove(state_file)
-                            except:
-                                pass
-                    except:
-                        pass
-                    
                     st.rerun()
             with col2:
                 if st.button("🏠 Back to Login", type="secondary"):
@@ -1557,60 +1535,22 @@ if not st.session_state.authenticated:
                     st.rerun()
             
             st.stop()
-        elif received_state != stored_state:
-            st.error("Invalid OAuth state. This may be due to a security issue or session timeout. Please try signing in again.")
-            
-            # Add clear cache button
-            col1, col2 = st.columns([2, 1])
-            with col1:
-                if st.button("🔄 Clear Cache & Try Again", type="primary", key="clear_cache_invalid"):
-                    # Clear all OAuth-related session state
-                    for key in ['oauth_state', 'authenticated', 'user_info', 'selected_user', 'selected_user_name']:
-                        if key in st.session_state:
-                            del st.session_state[key]
-                    
-                    # Clear URL parameters
-                    st.query_params.clear()
-                    
-                    # Clean up cache files
-                    try:
-                        import tempfile
-                        import os
-                        import glob
-                        temp_dir = tempfile.gettempdir()
-                        state_files = glob.glob(os.path.join(temp_dir, "oauth_state_*.txt"))
-                        for state_file in state_files:
-                            try:
-                                os.remove(state_file)
-                            except:
-                                pass
-                    except:
-                        pass
-                    
-                    st.rerun()
-            with col2:
-                if st.button("🏠 Back to Login", type="secondary", key="back_to_login_invalid"):
-                    st.query_params.clear()
-                    st.rerun()
-            
-            st.stop()
+        
+        # The state is used up, so drop the callback parameters before anything can rerun
+        st.session_state.oauth_state = None
+        st.query_params.clear()
         
         # Exchange code for token
         with st.spinner("Authenticating..."):
-            token_data = exchange_code_for_token(query_params['code'])
+            token_data = exchange_code_for_token(code)
             if token_data:
-                # Get user info
-                user_info = get_user_info(token_data['access_token'])
+                # Get user info from the id_token (no extra request when it verifies locally)
+                user_info = user_info_from_tokens(token_data)
                 if user_info:
                     # Find existing user in Airtable
                     airtable_user = find_user_in_airtable(user_info)
                     if airtable_user:
-                        st.session_state.authenticated = True
-                        st.session_state.user_info = user_info
-                        st.session_state.selected_user = airtable_user['id']
-                        st.session_state.selected_user_name = airtable_user['name']
-                        st.session_state.deals_pipeline_url = airtable_user.get('deals_pipeline_url', '')
-                        st.session_state.contacts_list_url = airtable_user.get('contacts_list_url', '')
+                        start_session(airtable_user, user_info)
                         st.success(f"✅ Welcome, {airtable_user['name']}!")
                         st.rerun()
                     else:
@@ -1651,21 +1591,6 @@ if not st.session_state.authenticated:
                     del current_params[param]
             st.query_params.update(**current_params)
             
-            # Clean up any cache files
-            try:
-                import tempfile
-                import os
-                import glob
-                temp_dir = tempfile.gettempdir()
-                state_files = glob.glob(os.path.join(temp_dir, "oauth_state_*.txt"))
-                for state_file in state_files:
-                    try:
-                        os.remove(state_file)
-                    except:
-                        pass
-            except:
-                pass
-            
             st.rerun()
     
     oauth_url = generate_oauth_url()
@@ -1684,6 +1609,13 @@ if not st.session_state.authenticated:
     
     st.stop()
 
+# Persist the login in a signed cookie once the page after sign-in renders
+if st.session_state.get('pending_session_cookie'):
+    components.html(
+        cookie_script(st.session_state.pop('pending_session_cookie'), SESSION_COOKIE_MAX_AGE, REDIRECT_URI.startswith("https")),
+        height=0
+    )
+
 # Home page with big buttons (only shown if authenticated)
 if st.session_state.current_page == 'home':
     st.markdown("<h1 style='text-align: center;'>DealFlow AI</h1>", unsafe_allow_html=True)
@@ -1731,6 +1663,71 @@ if st.session_state.current_page == 'home':
         #### Property Research
         Get detailed property information and market data for any address.
     """)
+    
+    # OpenAI usage report
+    st.markdown("---")
+    # Reports query the usage store, job queue and deals mirror, so only build them on request
+    if st.checkbox("Show usage, enrichment and pipeline reports", value=False, key="show_home_reports"):
+        with st.expander("📊 OpenAI Usage"):
+            usage_dimension = st.radio(
+                "Group by",
+                ["Function", "Deal", "User", "Model"],
+                horizontal=True,
+                key="usage_group_by"
+            )
+            usage_rows = usage_store.report(usage_dimension.lower())
+            if usage_rows:
+                total_cost = sum(row["Cost (USD)"] for row in usage_rows)
+                total_tokens = sum(row["Total Tokens"] for row in usage_rows)
+                st.write(f"**Total: {total_tokens:,} tokens, ${total_cost:,.2f}**")
+                st.dataframe(usage_rows, use_container_width=True)
+            else:
+                st.info("No OpenAI usage recorded yet.")
+        
+            escalation_rows = usage_store.escalation_report()
+            if escalation_rows:
+                st.markdown("**Model tier escalations**")
+                st.dataframe(escalation_rows, use_container_width=True)
+    
+        with st.expander("🕒 Background Enrichment"):
+            enrichment_stats = enrichment_queue.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Pending", enrichment_stats.get("pending", 0) + enrichment_stats.get("running", 0))
+            col2.metric("Done", enrichment_stats.get("done", 0))
+            col3.metric("Failed", enrichment_stats.get("failed", 0))
+            failed_jobs = enrichment_queue.jobs(status="failed", limit=20)
+            if failed_jobs:
+                st.markdown("**Failed jobs**")
+                for job in failed_jobs:
+                    col1, col2 = st.columns([5, 1])
+                    with col1:
+                        # Only the error class is shown; the stored message stays server-side
+                        error_class = (job["last_error"] or "").split("\n", 1)[0].split(":", 1)[0]
+                        st.write(f"{job['kind']} after {job['attempts']} attempt(s)")
+                        st.caption(error_class)
+                    with col2:
+                        if st.button("Retry", key=f"retry_enrichment_{job['id']}"):
+                            enrichment_queue.retry(job["id"])
+                            st.rerun()
+            else:
+                st.info("No failed enrichment jobs.")
+    
+        with st.expander("📈 Pipeline Metrics"):
+            if not airtable_mirror.is_synced(AIRTABLE_TABLE_NAME):
+                st.info("The deals mirror has not synced yet.")
+            else:
+                pipeline = evaluate_deals(airtable_mirror.all(AIRTABLE_TABLE_NAME))
+                col1, col2 = st.columns(2)
+                with col1:
+                    max_ltv = st.number_input("Max LTV %", min_value=0.0, max_value=100.0, value=100.0, step=5.0)
+                with col2:
+                    min_cap = st.number_input("Min cap rate %", min_value=0.0, max_value=20.0, value=0.0, step=0.25)
+                screened = pipeline[
+                    (pipeline["ltv"].isna() | (pipeline["ltv"] <= max_ltv / 100))
+                    & (pipeline["stated_cap_rate"].isna() | (pipeline["stated_cap_rate"] >= min_cap / 100))
+                ]
+                st.write(f"**{len(screened)} of {len(pipeline)} deals**")
+                st.dataframe(screened, use_container_width=True, hide_index=True)
 
 elif st.session_state.current_page == 'dealflow':
     st.markdown("<h1>DealFlow AI</h1>", unsafe_allow_html=True)
@@ -1765,7 +1762,7 @@ elif st.session_state.current_page == 'dealflow':
 
     uploaded_files = st.file_uploader(
         "Supporting Documents",
-        type=["pdf","doc","docx","xls","xlsx","jpg","png"],
+        type=["pdf","doc","docx","xls","xlsx","jpg","jpeg","png"],
         accept_multiple_files=True,
         label_visibility="visible"
     )
@@ -1776,11 +1773,30 @@ elif st.session_state.current_page == 'dealflow':
         label_visibility="visible"
     )
 
+    skip_duplicate_check = st.checkbox(
+        "Analyze even if this looks like a duplicate",
+        value=False,
+        help="Deals matching a previously saved deal by address or document text are normally stopped before analysis."
+    )
+
     analyze_button = st.button("🚀 Analyze Deal")
 
     if analyze_button:
+        # New analysis run - OpenAI usage is tracked against it until the deal is saved
+        st.session_state.deal_run_id = uuid.uuid4().hex[:12]
+        # Also removes spooled files kept for an earlier run's background upload
+        drop_session_values(["address_data", "enrichment_text", "pending_uploads"])
+        # Which enrichment steps run now, after saving, or not at all
+        profile = COLD_CALL_PROFILE if is_cold_call else PROFILES["full"]
+        st.session_state.pipeline_profile = profile
         status_container = st.empty()
+        live_summary = st.empty()
+        address_prefetch = {}
+        # Every upload is written to disk once; extraction, hashing and S3 all read that copy
+        spooled = None
+        analysis_complete = False
         try:
+            spooled = UploadSpool([uploaded_main] + list(uploaded_files or []))
             for i in range(5):
                 # Update message first
                 status_container.markdown(
@@ -1794,87 +1810,184 @@ elif st.session_state.current_page == 'dealflow':
                 if i == 0:
                     # Initial document processing - extract text from ALL documents
                     source_text = ""
-                    supporting_text = ""
+                    st.session_state.deal_noi = None
+                    supporting_texts = []
+                    
+                    # PDFs and images from both uploaders are read in one batch so their
+                    # scanned pages are OCR'd in parallel
+                    ocr_uploads = [u for u in spooled if u.ext in {"pdf"} | IMAGE_EXTENSIONS]
+                    ocr_texts = {}
+                    try:
+                        texts = ocr_engine.extract_documents(
+                            [(u.name, u.path if u.ext == "pdf" else u.data) for u in ocr_uploads], ocr=OCR_ENABLED
+                        )
+                        ocr_texts = {id(u): text for u, text in zip(ocr_uploads, texts)}
+                    except Exception:
+                        pass  # Fall back to reading each file below
                     
                     # Extract text from main uploaded document
                     if uploaded_main:
-                        ext = uploaded_main.name.lower().rsplit(".",1)[-1]
-                        if ext == "pdf":
-                            source_text = extract_text_from_pdf(uploaded_main)
-                        elif ext == "docx":
-                            source_text = extract_text_from_docx(uploaded_main)
+                        main_upload = spooled[uploaded_main]
+                        if id(main_upload) in ocr_texts:
+                            source_text = ocr_texts[id(main_upload)]
+                        elif main_upload.ext == "pdf":
+                            source_text = extract_text_from_pdf(main_upload)
+                        elif main_upload.ext == "docx":
+                            source_text = extract_text_from_docx(main_upload)
                         else:
-                            uploaded_main.seek(0)
-                            source_text = extract_text_from_doc(uploaded_main)
+                            source_text = extract_text_from_doc(main_upload)
                     
                     # Extract text from all supporting documents
-                    if uploaded_files:
-                        supporting_texts = []
-                        for f in uploaded_files:
-                            try:
-                                f.seek(0)  # Reset file pointer
-                                ext = f.name.lower().rsplit(".",1)[-1]
-                                if ext == "pdf":
-                                    doc_text = extract_text_from_pdf(f)
-                                elif ext == "docx":
-                                    doc_text = extract_text_from_docx(f)
-                                elif ext in ["doc", "txt"]:
-                                    doc_text = extract_text_from_doc(f)
-                                else:
-                                    doc_text = f"Document: {f.name} (unsupported format)"
-                                
-                                if doc_text.strip():
-                                    supporting_texts.append(f"--- {f.name} ---\n{doc_text}")
-                            except Exception as e:
-                                supporting_texts.append(f"--- {f.name} ---\nError reading file: {str(e)}")
-                        
-                        if supporting_texts:
-                            supporting_text = "\n\n".join(supporting_texts)
+                    for f in uploaded_files or []:
+                        upload = spooled[f]
+                        try:
+                            ext = upload.ext
+                            if id(upload) in ocr_texts:
+                                doc_text = ocr_texts[id(upload)]
+                            elif ext == "pdf":
+                                doc_text = extract_text_from_pdf(upload)
+                            elif ext == "docx":
+                                doc_text = extract_text_from_docx(upload)
+                            elif ext == "doc":
+                                doc_text = extract_text_from_doc(upload)
+                            elif ext == "txt":
+                                doc_text = str(upload.data, "utf-8", errors="replace")
+                            elif ext in ["xls", "xlsx"]:
+                                # Rent rolls and T-12s are summarized locally; only the digest reaches the LLM
+                                sheet_summaries = summarize_workbook(upload.path, upload.name)
+                                doc_text = format_digest(sheet_summaries)
+                                # Keep the T-12 NOI for the cap rate in the review form
+                                for sheet_summary in sheet_summaries:
+                                    if sheet_summary["type"] == "t12" and sheet_summary.get("noi"):
+                                        st.session_state.deal_noi = sheet_summary["noi"]
+                            else:
+                                doc_text = f"Document: {f.name} (unsupported format)"
+                            
+                            if doc_text.strip():
+                                supporting_texts.append(f"--- {f.name} ---\n{doc_text}")
+                        except Exception as e:
+                            supporting_texts.append(f"--- {f.name} ---\nError reading file: {str(e)}")
                     
                     # Combine ALL information: main document + supporting documents + deal notes
                     combined = ""
-                    all_texts = []
+                    local_details = extract_local_details("")
+                    sections = []
                     
                     if source_text.strip():
-                        all_texts.append(f"--- Main Document ---\n{source_text}")
-                    if supporting_text.strip():
-                        all_texts.append(f"--- Supporting Documents ---\n{supporting_text}")
+                        sections.append(("Main Document", [source_text]))
+                    if supporting_texts:
+                        sections.append(("Supporting Documents", supporting_texts))
                     if extra_notes.strip():
-                        all_texts.append(f"--- Deal Notes/Email Thread ---\n{extra_notes}")
+                        sections.append(("Deal Notes/Email Thread", [extra_notes]))
                     
-                    if all_texts:
-                        combined = "\n\n".join(all_texts)
+                    if sections:
+                        # Headers and document texts are joined in one pass, so large documents
+                        # are not copied into intermediate strings on the way
+                        pieces = []
+                        for label, texts in sections:
+                            if pieces:
+                                pieces.append("\n\n")
+                            pieces.append(f"--- {label} ---\n")
+                            for j, text in enumerate(texts):
+                                if j:
+                                    pieces.append("\n\n")
+                                pieces.append(text)
+                        combined = "".join(pieces)
+                        del pieces
+                        
+                        # Local pass over the full text for emails, phones, websites and addresses
+                        local_details = extract_local_details(combined)
                         
                         # Show what was processed
-                        st.info(f"📚 **Processing {len(all_texts)} information source(s):**")
+                        st.info(f"📚 **Processing {len(sections)} information source(s):**")
                         if source_text.strip():
                             st.write(f"• Main Document ({len(source_text)} characters)")
-                        if supporting_text.strip():
-                            st.write(f"• Supporting Documents ({len(supporting_text)} characters)")
+                        if supporting_texts:
+                            supporting_chars = sum(map(len, supporting_texts)) + 2 * (len(supporting_texts) - 1)
+                            st.write(f"• Supporting Documents ({supporting_chars} characters)")
                         if extra_notes.strip():
                             st.write(f"• Deal Notes/Email Thread ({len(extra_notes)} characters)")
                         st.write(f"**Total combined text: {len(combined)} characters**")
+                        # Only the combined text is needed from here on
+                        source_text = ""
+                        supporting_texts = sections = None
+                        
+                        # Check for a previously analyzed copy of this deal before any paid calls
+                        deal_signature = minhash(combined)
+                        st.session_state.deal_fingerprint = {"signature": deal_signature}
+                        if not skip_duplicate_check:
+                            duplicates = find_duplicate_deals(deal_signature)
+                            if duplicates:
+                                show_duplicate_deals(
+                                    duplicates,
+                                    "⚠️ This deal looks like one that was already analyzed. Analysis was stopped before any OpenAI, Smarty or S3 calls."
+                                )
+                                break
                 
                 elif i == 1 and combined.strip():
                     # Process text and generate summary
-                    summary = gpt_extract_summary(combined, DEAL_TYPE_MAP[deal_type])
+                    if STREAMING_SUMMARY:
+                        live_fields = live_summary.container()
+                        field_slots = {}
+                        
+                        def show_field(key, value):
+                            """Render each summary field as soon as it has streamed in."""
+                            if isinstance(value, list):
+                                rendered = "\n".join(f"- {item}" for item in value if str(item).strip())
+                                field_slots.setdefault(key, live_fields.empty()).markdown(f"**{key}:**\n{rendered}")
+                            else:
+                                field_slots.setdefault(key, live_fields.empty()).markdown(f"**{key}:** {value}")
+                            # Start address validation as soon as the location is known
+                            if key == "Location" and value and SMARTY_ENABLED and profile.public_records == INLINE:
+                                address_prefetch[value] = prefetch_address_validation(value)
+                        
+                        summary = gpt_extract_summary_stream(combined, DEAL_TYPE_MAP[deal_type], on_field=show_field)
+                    else:
+                        summary = gpt_extract_summary(combined, DEAL_TYPE_MAP[deal_type])
+                    
+                    # The property's own address is known now; check it against saved deals
+                    summary_location = summary.get("Location", "") if isinstance(summary, dict) else ""
+                    if not skip_duplicate_check and summary_location:
+                        duplicates = find_duplicate_deals(location=summary_location)
+                        if duplicates:
+                            show_duplicate_deals(
+                                duplicates,
+                                "⚠️ This property matches a deal that was already analyzed. Analysis was stopped before contact extraction and uploads."
+                            )
+                            break
                 
                 elif i == 2 and combined.strip():
-                    # Process notes and contact info
-                    notes_summary = summarize_notes(extra_notes)
-                    contact_info = extract_contact_info(combined)
-                    # Also parse contacts for linking to deal
-                    parsed_contacts = parse_multiple_contacts(combined)
+                    if profile.contacts == INLINE:
+                        # Notes summary, contact info and contacts for linking are requested concurrently
+                        llm_ctx = llm_context()
+                        notes_summary, contact_info, parsed_contacts = run_llm(
+                            llm.analyze_contacts(combined, extra_notes, llm_ctx, local_details), llm_ctx
+                        )
+                    else:
+                        notes_summary, contact_info, parsed_contacts = "", "", []
+                        if profile.contacts == BACKGROUND:
+                            # Contacts are extracted from the same text once the deal is saved
+                            put_session_value("enrichment_text", combined)
                 
                 elif i == 3:
                     # Handle attachments
                     s3_urls = []
-                    if uploaded_main:
-                        uploaded_main.seek(0)
-                        s3_urls.append(upload_to_s3(uploaded_main, uploaded_main.name))
-                    for f in uploaded_files:
-                        f.seek(0)
-                        s3_urls.append(upload_to_s3(f, f.name))
+                    pending_uploads = []
+                    if profile.attachments == INLINE:
+                        if uploaded_main:
+                            s3_urls.append(upload_to_s3(spooled[uploaded_main].path, uploaded_main.name))
+                        for f in uploaded_files:
+                            s3_urls.append(upload_to_s3(spooled[f].path, f.name))
+                    elif profile.attachments == BACKGROUND:
+                        # Keep the spooled copies for the upload job queued when the deal is saved
+                        for f in ([uploaded_main] if uploaded_main else []) + list(uploaded_files or []):
+                            pending_uploads.append([spooled.detach(f).path, f.name])
+                    if pending_uploads:
+                        # Removed with the session value unless a saved deal's upload job takes them over
+                        put_session_value(
+                            "pending_uploads", pending_uploads,
+                            on_discard=lambda files=pending_uploads: remove_upload_files(files)
+                        )
                 
                 elif i == 4:
                     # Update session state
@@ -1882,12 +1995,12 @@ elif st.session_state.current_page == 'dealflow':
                     # Initialize contacts_to_link with all valid contacts from new parsing
                     valid_contacts = [c for c in parsed_contacts_list if c.get("Name", "").strip()]
                     
+                    put_session_value("raw_notes", extra_notes)
+                    put_session_value("parsed_contacts", parsed_contacts_list)
                     st.session_state.update({
                         "summary": summary,
-                        "raw_notes": extra_notes,
                         "notes_summary": notes_summary,
                         "contacts": contact_info,
-                        "parsed_contacts": parsed_contacts_list,
                         "contacts_to_link": valid_contacts.copy(),  # Reset with new contacts
                         "attachments": s3_urls,
                         "deal_type": DEAL_TYPE_MAP[deal_type] if deal_type else ""  # Map to Airtable value
@@ -1895,40 +2008,45 @@ elif st.session_state.current_page == 'dealflow':
 
                     # Try to validate address from extracted location
                     location = summary.get("Location", "")
+                    if profile.public_records != INLINE:
+                        # Address validation is left to the lookup after saving, or skipped
+                        st.session_state.update({
+                            "address_validated": None,
+                            "extracted_location": location
+                        })
+                    else:
                     
-                    # If location is incomplete or missing, try fallback extraction
-                    if not location or len(location.split()) < 3:
-                        st.info("🔍 Trying enhanced address extraction...")
-                        fallback_address = extract_address_fallback(combined)
-                        if fallback_address:
-                            location = fallback_address
-                            st.success(f"✅ Found address: {location}")
+                        # If location is incomplete or missing, try fallback extraction
+                        if not location or len(location.split()) < 3:
+                            st.info("🔍 Trying enhanced address extraction...")
+                            fallback_address = extract_address_fallback(combined, local_details)
+                            if fallback_address:
+                                location = fallback_address
+                                st.success(f"✅ Found address: {location}")
                     
-                    if location:
-                        address_data = validate_address(location)
-                        if address_data:
-                            # Address validation successful
-                            result = address_data.get('raw_data', {})
-                            st.session_state.update({
-                                "Physical Property": format_physical_property(result),
-                                "Parcel & Tax": format_parcel_tax_info(result),
-                                "Ownership & Sale": format_ownership_sale_info(result),
-                                "Mortgage & Lender": format_mortgage_lender_info(result),
-                                "address_validated": True,
-                                "address_data": address_data
-                            })
+                        if location:
+                            if location in address_prefetch:
+                                # Validation already started while the summary was streaming
+                                address_data = address_prefetch[location].result()
+                            else:
+                                address_data = validate_address(location)
+                            if address_data:
+                                # Address validation successful
+                                # Public records are rendered from the stored record when the form is shown
+                                put_session_value("address_data", address_data)
+                                st.session_state.address_validated = True
+                            else:
+                                # Address validation failed - will prompt user for manual input
+                                st.session_state.update({
+                                    "address_validated": False,
+                                    "extracted_location": location
+                                })
                         else:
-                            # Address validation failed - will prompt user for manual input
+                            # No location extracted - will prompt user for manual input
                             st.session_state.update({
                                 "address_validated": False,
-                                "extracted_location": location
+                                "extracted_location": ""
                             })
-                    else:
-                        # No location extracted - will prompt user for manual input
-                        st.session_state.update({
-                            "address_validated": False,
-                            "extracted_location": ""
-                        })
 
                     # Add another message update right after processing
                     if i < 4:  # Don't update after the last step
@@ -1936,11 +2054,18 @@ elif st.session_state.current_page == 'dealflow':
                             f'<div class="status-message"><div class="spinner"></div>{get_loading_message(i + 1)}</div>',
                             unsafe_allow_html=True
                         )
+                    analysis_complete = True
         
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
         finally:
+            if spooled:
+                spooled.close()
+            if not analysis_complete:
+                # A stopped or failed run leaves no form to save, so nothing will upload these
+                drop_session_values(["pending_uploads"])
             status_container.empty()
+            live_summary.empty()
 
     # Check if we should show the form or the initial upload interface
     # If "summary" is in session state, show the form. Otherwise, show upload interface.
@@ -1971,15 +2096,9 @@ elif st.session_state.current_page == 'dealflow':
                     with st.spinner("Validating address..."):
                         address_data = validate_address(manual_address.strip())
                         if address_data:
-                            result = address_data.get('raw_data', {})
-                            st.session_state.update({
-                                "Physical Property": format_physical_property(result),
-                                "Parcel & Tax": format_parcel_tax_info(result),
-                                "Ownership & Sale": format_ownership_sale_info(result),
-                                "Mortgage & Lender": format_mortgage_lender_info(result),
-                                "address_validated": True,
-                                "address_data": address_data
-                            })
+                            # Public records are rendered from the stored record when the form is shown
+                            put_session_value("address_data", address_data)
+                            st.session_state.address_validated = True
                             st.success("Address validated successfully! Property information has been updated.")
                             st.rerun()
                         else:
@@ -1990,7 +2109,7 @@ elif st.session_state.current_page == 'dealflow':
         # Contact Selection Section (outside form so we can use buttons)
         st.markdown("---")
         st.markdown("### 📇 Link Contacts to Deal")
-        parsed_contacts = st.session_state.get("parsed_contacts", [])
+        parsed_contacts = get_session_value("parsed_contacts", [])
         
         # Initialize contacts to link list if not exists (fallback, should be set during analysis)
         if "contacts_to_link" not in st.session_state:
@@ -1998,7 +2117,10 @@ elif st.session_state.current_page == 'dealflow':
             valid_contacts = [c for c in parsed_contacts if c.get("Name", "").strip()]
             st.session_state.contacts_to_link = valid_contacts.copy()
         
-        if parsed_contacts:
+        pipeline_profile = st.session_state.get("pipeline_profile") or PROFILES["full"]
+        if pipeline_profile.contacts == BACKGROUND:
+            st.info("📇 Contacts will be extracted and linked to this deal in the background after it is saved.")
+        elif parsed_contacts:
             # Filter out contacts without names
             valid_contacts = [c for c in parsed_contacts if c.get("Name", "").strip()]
             
@@ -2079,7 +2201,7 @@ elif st.session_state.current_page == 'dealflow':
             # Use validated address if available, otherwise use extracted location
             if st.session_state.get("address_validated") == True:
                 # Use the validated address from Smarty
-                address_data = st.session_state.get("address_data", {})
+                address_data = get_session_value("address_data") or {}
                 default_location = address_data.get("formatted_address", s.get("Location",""))
             else:
                 # Use extracted location or manual address
@@ -2098,37 +2220,15 @@ elif st.session_state.current_page == 'dealflow':
             in_cap_rate = st.text_input("In-Place Cap Rate", value=s.get("In-Place Cap Rate",""))
             interest_rate = st.text_input("Interest Rate", value=s.get("Interest Rate",""))
             
-            # Unit Pricing Calculation
-            def calculate_unit_pricing(purchase_price, loan_amount, size):
-                """Calculate unit pricing based on purchase price or loan amount and size."""
-                try:
-                    # Extract numeric values from strings
-                    def extract_number(text):
-                        if not text:
-                            return None
-                        # Remove common currency symbols and commas
-                        cleaned = re.sub(r'[$,]', '', str(text))
-                        # Extract first number found
-                        numbers = re.findall(r'[\d,]+\.?\d*', cleaned)
-                        if numbers:
-                            return float(numbers[0].replace(',', ''))
-                        return None
-                    
-                    price_num = extract_number(purchase_price)
-                    loan_num = extract_number(loan_amount)
-                    size_num = extract_number(size)
-                    
-                    if size_num and size_num > 0:
-                        if price_num and price_num > 0:
-                            return f"${price_num/size_num:.2f} PSF"
-                        elif loan_num and loan_num > 0:
-                            return f"${loan_num/size_num:.2f} PSF Loan Basis"
-                    return "N/A"
-                except:
-                    return "N/A"
-            
-            unit_pricing = calculate_unit_pricing(purchase_price, loan_amount, size)
-            unit_pricing = st.text_input("Unit Pricing", value=unit_pricing, help="Automatically calculated as Purchase Price ÷ Square Footage (or Loan Amount ÷ Square Footage for loan basis). You can edit this value if needed.")
+            # Unit pricing, cap rate and LTV are computed locally from the fields above
+            metrics = compute_metrics(
+                purchase_price, loan_amount, size, in_cap_rate, st.session_state.get("deal_noi")
+            )
+            unit_pricing = format_unit_pricing(metrics)
+            metrics_summary = format_metrics(metrics)
+            if metrics_summary:
+                st.caption(metrics_summary)
+            unit_pricing = st.text_input("Unit Pricing", value=unit_pricing, help="Automatically calculated as Purchase Price ÷ units or square footage (or Loan Amount for loan basis). You can edit this value if needed.")
             
             # Status Detail
             status_detail = st.text_input("Status Detail", value="", placeholder="Enter additional status details...")
@@ -2147,15 +2247,16 @@ elif st.session_state.current_page == 'dealflow':
             notes = st.text_area("Notes", value=consolidated_notes, height=300)
             
             # Create combined Public Records field
-            physical_property_text = st.session_state.get("Physical Property", "")
-            parcel_tax_text = st.session_state.get("Parcel & Tax", "")
-            ownership_sale_text = st.session_state.get("Ownership & Sale", "")
-            mortgage_lender_text = st.session_state.get("Mortgage & Lender", "")
+            property_record = (get_session_value("address_data") or {}).get("record")
+            physical_property_text = format_physical_property(property_record)
+            parcel_tax_text = format_parcel_tax_info(property_record)
+            ownership_sale_text = format_ownership_sale_info(property_record)
+            mortgage_lender_text = format_mortgage_lender_info(property_record)
             
             combined_public_records = f"𝗣𝗵𝘆𝘀𝗶𝗰𝗮𝗹 𝗣𝗿𝗼𝗽𝗲𝗿𝘁𝘆: \n{physical_property_text}\n\n𝗢𝘄𝗻𝗲𝗿𝘀𝗵𝗶𝗽 & 𝗦𝗮𝗹𝗲: \n{ownership_sale_text}\n\n𝗣𝗮𝗿𝗰𝗲𝗹 & 𝗧𝗮𝘅: \n{parcel_tax_text}\n\n𝗠𝗼𝗿𝘁𝗴𝗮𝗴𝗲 & 𝗟𝗲𝗻𝗱𝗲𝗿: \n{mortgage_lender_text}"
             
             public_records = st.text_area("Public Records", value=combined_public_records, height=400)
-            raw_notes = st.text_area("Raw Notes", value=st.session_state.get("raw_notes",""), height=120)
+            raw_notes = st.text_area("Raw Notes", value=get_session_value("raw_notes", ""), height=120)
             
             submitted = st.form_submit_button("Save to Airtable")
 
@@ -2206,10 +2307,26 @@ elif st.session_state.current_page == 'dealflow':
                 }
                 
                 # Ensure all parameters are not None
-                raw_notes = st.session_state.get("raw_notes", "")
+                raw_notes = get_session_value("raw_notes", "")
                 attachments = st.session_state.get("attachments", [])
                 contacts = st.session_state.get("contacts", "")
                 
+                # Steps this analysis deferred are queued against the saved record
+                background_jobs = {}
+                if pipeline_profile.public_records == BACKGROUND and location:
+                    background_jobs["public_records"] = {"location": location}
+                enrichment_text = get_session_value("enrichment_text", "")
+                if pipeline_profile.contacts == BACKGROUND and enrichment_text.strip():
+                    background_jobs["contacts"] = {
+                        "text": enrichment_text,
+                        "run_id": st.session_state.get("deal_run_id", ""),
+                        "user": st.session_state.get("selected_user_name", ""),
+                        "owner": st.session_state.get("selected_user")
+                    }
+                pending_uploads = get_session_value("pending_uploads")
+                if pipeline_profile.attachments == BACKGROUND and pending_uploads:
+                    background_jobs["attachments"] = {"files": pending_uploads}
+                
                 deal_saved = create_airtable_record(
                     updated,
                     raw_notes,
@@ -2217,11 +2334,15 @@ elif st.session_state.current_page == 'dealflow':
                     DEAL_TYPE_MAP[deal_type],
                     contacts,
                     contact_ids if contact_ids else None,  # Pass list of contact IDs to link the deal
-                    is_cold_call  # Pass Cold Call toggle status
+                    is_cold_call,  # Pass Cold Call toggle status
+                    background_jobs=background_jobs,
+                    lookup_public_records=pipeline_profile.public_records == INLINE
                 )
                 
                 # Show "Submit Another Deal" button after successful save
                 if deal_saved:
+                    # The upload job owns the spooled files now
+                    take_session_value("pending_uploads")
                     st.markdown("<br>", unsafe_allow_html=True)
                     col1, col2, col3 = st.columns([1, 2, 1])
                     with col2:
@@ -2233,11 +2354,12 @@ elif st.session_state.current_page == 'dealflow':
                                 "deal_type", "Physical Property", "Parcel & Tax",
                                 "Ownership & Sale", "Mortgage & Lender", "address_validated",
                                 "address_data", "extracted_location", "selected_contact_index",
-                                "deal_saved"
+                                "deal_saved", "pipeline_profile"
                             ]
                             # Clear all keys
                             for key in keys_to_clear:
                                 st.session_state.pop(key, None)
+                            drop_session_values(["raw_notes", "parsed_contacts", "address_data", "enrichment_text", "pending_uploads"])
                             
                             # Also clear any contact form fields
                             for key in list(st.session_state.keys()):
@@ -2321,12 +2443,15 @@ elif st.session_state.current_page == 'contact':
                 
                 if has_file:
                     try:
-                        if file.name.lower().endswith('.pdf'):
-                            file_text = extract_text_from_pdf(file)
-                        elif file.name.lower().endswith('.docx'):
-                            file_text = extract_text_from_docx(file)
-                        elif file.name.lower().endswith('.doc'):
-                            file_text = extract_text_from_doc(file)
+                        if file.name.lower().endswith(('.pdf', '.docx', '.doc')):
+                            with UploadSpool([file]) as spooled_contact:
+                                upload = spooled_contact[file]
+                                if upload.ext == 'pdf':
+                                    file_text = extract_text_from_pdf(upload)
+                                elif upload.ext == 'docx':
+                                    file_text = extract_text_from_docx(upload)
+                                else:
+                                    file_text = extract_text_from_doc(upload)
                         elif file.name.lower().endswith('.txt'):
                             file_text = file.read().decode('utf-8')
                         else:
@@ -2534,42 +2659,105 @@ elif st.session_state.current_page == 'property':
         st.rerun()
     st.markdown("<br>", unsafe_allow_html=True)
     
-    st.markdown("Enter a property address to get detailed information and market data.")
+    lookup_mode = st.radio("Lookup Mode", ["Single Address", "Bulk Lookup"], horizontal=True, key="property_lookup_mode")
     
-    property_address = st.text_input(
-        "Property Address",
-        placeholder="e.g., 123 Main St, City, State 12345",
-        help="Enter the property address to get detailed property information"
-    )
+    if lookup_mode == "Single Address":
+        st.markdown("Enter a property address to get detailed information and market data.")
     
-    if st.button("🔍 Get Property Info", use_container_width=True):
-        if property_address.strip():
-            with st.spinner("Fetching property information..."):
-                address_data = validate_address(property_address.strip())
-                if address_data:
-                    result = address_data.get('raw_data', {})
+        property_address = st.text_input(
+            "Property Address",
+            placeholder="e.g., 123 Main St, City, State 12345",
+            help="Enter the property address to get detailed property information"
+        )
+    
+        if st.button("🔍 Get Property Info", use_container_width=True):
+            if property_address.strip():
+                with st.spinner("Fetching property information..."):
+                    address_data = validate_address(property_address.strip())
+                    if address_data:
+                        result = address_data.get('record')
                     
-                    # Add Google Maps link
-                    maps_link = generate_maps_link(address_data.get('formatted_address', property_address))
-                    if maps_link:
-                        st.markdown(f"📍 [View on Google Maps]({maps_link})")
+                        # Add Google Maps link
+                        maps_link = generate_maps_link(address_data.get('formatted_address', property_address))
+                        if maps_link:
+                            st.markdown(f"📍 [View on Google Maps]({maps_link})")
                     
-                    st.markdown("---")
+                        st.markdown("---")
                     
-                    # Format all property information using the same functions as DealFlow AI
-                    physical_property = format_physical_property(result)
-                    parcel_tax = format_parcel_tax_info(result)
-                    ownership_sale = format_ownership_sale_info(result)
-                    mortgage_lender = format_mortgage_lender_info(result)
+                        # Consolidated Public Records with the same formatting as DealFlow AI
+                        combined_public_records = format_public_records(result)
                     
-                    # Create consolidated Public Records field with same formatting
-                    combined_public_records = f"𝗣𝗵𝘆𝘀𝗶𝗰𝗮𝗹 𝗣𝗿𝗼𝗽𝗲𝗿𝘁𝘆: \n{physical_property}\n\n𝗢𝘄𝗻𝗲𝗿𝘀𝗵𝗶𝗽 & 𝗦𝗮𝗹𝗲: \n{ownership_sale}\n\n𝗣𝗮𝗿𝗰𝗲𝗹 & 𝗧𝗮𝘅: \n{parcel_tax}\n\n𝗠𝗼𝗿𝘁𝗴𝗮𝗴𝗲 & 𝗟𝗲𝗻𝗱𝗲𝗿: \n{mortgage_lender}"
+                        # Display consolidated information
+                        st.markdown("### Property Information")
+                        st.text_area("Public Records", value=combined_public_records, height=1200)
                     
-                    # Display consolidated information
-                    st.markdown("### Property Information")
-                    st.text_area("Public Records", value=combined_public_records, height=1200)
-                    
-                else:
-                    st.error("Could not validate this address. Please check the format and try again.")
-        else:
-            st.error("Please enter a property address.")
+                    else:
+                        st.error("Could not validate this address. Please check the format and try again.")
+            else:
+                st.error("Please enter a property address.")
+    
+    else:
+        st.markdown("Paste a list of addresses (one per line) or upload a CSV to look up public records in bulk.")
+        
+        bulk_text = st.text_area(
+            "Addresses",
+            height=200,
+            placeholder="123 Main St, City, State 12345\n456 Oak Ave, City, State 67890",
+            key="bulk_address_text"
+        )
+        bulk_file = st.file_uploader(
+            "Or upload a CSV",
+            type=["csv", "txt"],
+            help="Uses a column named 'Address' if present, otherwise each row's cells are joined into one address.",
+            key="bulk_address_file"
+        )
+        
+        if st.button("🔍 Run Bulk Lookup", use_container_width=True):
+            addresses = read_address_list(bulk_text)
+            if bulk_file:
+                addresses += [a for a in read_address_csv(bulk_file.getvalue().decode("utf-8-sig", errors="ignore")) if a not in addresses]
+            
+            if not addresses:
+                st.error("Please enter or upload at least one address.")
+            elif not SMARTY_ENABLED:
+                st.error("Smarty API credentials are not configured.")
+            else:
+                if len(addresses) > BULK_LOOKUP_MAX_ADDRESSES:
+                    st.warning(f"Only the first {BULK_LOOKUP_MAX_ADDRESSES} of {len(addresses)} addresses will be looked up.")
+                    addresses = addresses[:BULK_LOOKUP_MAX_ADDRESSES]
+                
+                progress = st.progress(0.0, text=f"Looking up 0 of {len(addresses)} addresses...")
+                results_table = st.empty()
+                rows = [None] * len(addresses)
+                done = 0
+                for index, row in bulk_lookup(
+                    addresses,
+                    SMARTY_AUTH_ID,
+                    SMARTY_AUTH_TOKEN,
+                    max_workers=SMARTY_BULK_WORKERS,
+                    rate_per_second=SMARTY_RATE_LIMIT
+                ):
+                    rows[index] = row
+                    done += 1
+                    progress.progress(done / len(addresses), text=f"Looked up {done} of {len(addresses)} addresses...")
+                    results_table.dataframe(
+                        [
+                            {k: r[k] for k in ("Input Address", "Formatted Address", "Property Type", "Status")}
+                            for r in rows if r
+                        ],
+                        use_container_width=True
+                    )
+                progress.empty()
+                put_session_value("bulk_property_results", rows)
+        
+        bulk_rows = get_session_value("bulk_property_results")
+        if bulk_rows:
+            matched = sum(1 for r in bulk_rows if r["Status"] == "Matched")
+            st.success(f"✅ {matched} of {len(bulk_rows)} addresses matched.")
+            st.download_button(
+                "⬇️ Download Results (CSV)",
+                data=rows_to_csv(bulk_rows),
+                file_name=f"property-lookup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
@@ -0,0 +1,141 @@
+"""
+Google sign-in helpers: local ID-token verification and signed session cookies.
+
+The token endpoint already returns an `id_token` with the user's email and
+name, so verifying its RS256 signature against Google's cached JWKS replaces
+the round trip to the userinfo endpoint. After login the session is kept in
+an HMAC-signed cookie so a browser refresh does not start the OAuth flow over.
+The cookie is written from the page's JavaScript, so it can't be HttpOnly;
+keep its lifetime short.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+try:
+    import jwt
+except ImportError:  # PyJWT[crypto] is needed for local verification; callers fall back to userinfo
+    jwt = None
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+SESSION_COOKIE_NAME = "dealflow_session"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class JWKSCache:
+    """Google's signing keys, cached for as long as their Cache-Control header allows."""
+
+    def __init__(self, url: str = GOOGLE_CERTS_URL, default_ttl: float = 3600, min_refresh_interval: float = 60):
+        self.url = url
+        self.default_ttl = default_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._expires = 0.0
+        self._fetched = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        resp = requests.get(self.url, timeout=10)
+        resp.raise_for_status()
+        match = _MAX_AGE_RE.search(resp.headers.get("Cache-Control", ""))
+        ttl = int(match.group(1)) if match else self.default_ttl
+        self._keys = {
+            key["kid"]: jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+            for key in resp.json().get("keys", [])
+        }
+        self._fetched = time.time()
+        self._expires = self._fetched + ttl
+
+    def get(self, kid: str):
+        with self._lock:
+            # Refetch on expiry, or when Google has rotated in a key we have not seen;
+            # unknown kids refetch at most once a minute so junk tokens can't hammer Google
+            now = time.time()
+            if now >= self._expires or (kid not in self._keys and now - self._fetched >= self.min_refresh_interval):
+                self._refresh()
+            return self._keys.get(kid)
+
+
+_jwks = JWKSCache()
+
+
+def verify_id_token(id_token: str, client_id: str, jwks: JWKSCache = None) -> Dict:
+    """Verify a Google ID token's signature, audience, issuer and expiry; return its claims."""
+    if jwt is None:
+        raise RuntimeError("PyJWT is not installed")
+    header = jwt.get_unverified_header(id_token)
+    key = (jwks or _jwks).get(header.get("kid", ""))
+    if key is None:
+        raise ValueError("ID token signed with an unknown key")
+    claims = jwt.decode(
+        id_token,
+        key,
+        algorithms=["RS256"],
+        audience=client_id,
+        leeway=60,
+        options={"verify_iss": False}
+    )
+    if claims.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Unexpected ID token issuer: {claims.get('iss')}")
+    return claims
+
+
+def user_info_from_claims(claims: Dict) -> Dict:
+    """Shape ID-token claims like the userinfo v2 response the rest of the app expects."""
+    return {
+        "id": claims.get("sub", ""),
+        "email": claims.get("email", ""),
+        "verified_email": bool(claims.get("email_verified")),
+        "name": claims.get("name", ""),
+        "given_name": claims.get("given_name", ""),
+        "family_name": claims.get("family_name", ""),
+        "picture": claims.get("picture", "")
+    }
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign_session(payload: Dict, secret: str, max_age: int) -> str:
+    """Serialize a session as `<payload>.<signature>` with an expiry inside the signed part."""
+    body = _b64encode(json.dumps({**payload, "exp": int(time.time()) + max_age}, separators=(",", ":")).encode())
+    signature = hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64encode(signature)}"
+
+
+def load_session(token: Optional[str], secret: str) -> Optional[Dict]:
+    """Return the session payload if the signature is valid and it has not expired."""
+    if not token or "." not in token or not secret:
+        return None
+    body, signature = token.rsplit(".", 1)
+    expected = hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()
+    try:
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError):
+        return None
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+def cookie_script(value: str, max_age: int, secure: bool, name: str = SESSION_COOKIE_NAME) -> str:
+    """HTML snippet that sets (or, with max_age=0, clears) the session cookie on the app's page."""
+    attributes = f"; Path=/; Max-Age={int(max_age)}; SameSite=Lax" + ("; Secure" if secure else "")
+    return f"<script>window.parent.document.cookie = {json.dumps(name + '=' + value + attributes)};</script>"
@@ -5,7 +5,14 @@ from pydantic import BaseModel
 from fastapi.responses import JSONResponse
 import uvicorn
 from threading import Thread
+from typing import List
+import asyncio
+import logging
 import os
+from address_parser import normalize_address
+from property_lookup import RateLimiter, TTLCache, lookup_error_status, lookup_property, property_to_json, redact_urls
+
+logger = logging.getLogger(__name__)
 
 # Helper function to get config from environment variables (Railway) or Streamlit secrets (local)
 def get_config(key: str, default: str = None):
@@ -26,6 +33,24 @@ AIRTABLE_API_KEY = get_config("AIRTABLE_API_KEY") or get_config("AIRTABLE_PAT")
 AIRTABLE_TABLE_NAME = "Contacts"
 AIRTABLE_URL = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
 
+# Smarty credentials for the property enrichment endpoints
+SMARTY_AUTH_ID = get_config("SMARTY_AUTH_ID")
+SMARTY_AUTH_TOKEN = get_config("SMARTY_AUTH_TOKEN")
+SMARTY_ENABLED = bool(SMARTY_AUTH_ID and SMARTY_AUTH_TOKEN)
+
+# Property lookups are cached by normalized address and limited in concurrency
+# and rate so bursts from machine clients stay within the Smarty plan
+PROPERTY_CACHE_TTL = float(get_config("PROPERTY_CACHE_TTL", "86400"))
+PROPERTY_API_CONCURRENCY = int(get_config("PROPERTY_API_CONCURRENCY", "8"))
+PROPERTY_BATCH_MAX = 500
+property_cache = TTLCache(PROPERTY_CACHE_TTL)
+smarty_limiter = RateLimiter(float(get_config("SMARTY_RATE_LIMIT", "10")))
+smarty_session = requests.Session()
+smarty_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=PROPERTY_API_CONCURRENCY))
+_lookup_slots = None
+# Lookups in progress by cache key, as (task, keeps raw JSON), so concurrent misses share one Smarty call
+_inflight = {}
+
 # FastAPI app to handle the POST request to save contacts
 app = FastAPI()
 
@@ -56,6 +81,84 @@ async def save_contact(contact: Contact):
     else:
         return JSONResponse(content={"status": "error", "message": "Failed to save contact"}, status_code=400)
 
+# Define Pydantic model for batch property lookups
+class PropertyBatch(BaseModel):
+    addresses: List[str]
+    include_raw: bool = False
+
+def _smarty_lookup(address: str, keep_raw: bool):
+    smarty_limiter.wait()
+    return lookup_property(address, SMARTY_AUTH_ID, SMARTY_AUTH_TOKEN, session=smarty_session, keep_raw=keep_raw)
+
+async def _fetch_property(key: str, address: str, keep_raw: bool):
+    async with _lookup_slots:
+        address_data = await asyncio.to_thread(_smarty_lookup, address, keep_raw)
+    property_cache.set(key, address_data)
+    return address_data
+
+async def _lookup_once(key: str, address: str, keep_raw: bool):
+    """Join a lookup already running for this key if it keeps what we need, else start one."""
+    running = _inflight.get(key)
+    if running and (running[1] or not keep_raw):
+        return await asyncio.shield(running[0])
+    task = asyncio.ensure_future(_fetch_property(key, address, keep_raw))
+    _inflight[key] = (task, keep_raw)
+    task.add_done_callback(lambda t: _inflight.pop(key) if _inflight.get(key, (None,))[0] is t else None)
+    return await asyncio.shield(task)
+
+async def enrich_property(address: str, include_raw: bool = False):
+    """Look up one address through the cache, at most PROPERTY_API_CONCURRENCY at a time."""
+    global _lookup_slots
+    if _lookup_slots is None:
+        _lookup_slots = asyncio.Semaphore(PROPERTY_API_CONCURRENCY)
+    
+    key = normalize_address(address)
+    address_data = property_cache.get(key)
+    # Raw JSON is only kept for entries looked up by a client that asked for it
+    cached = address_data is not None and (not include_raw or "raw_data" in address_data)
+    if not cached:
+        address_data = await _lookup_once(key, address, include_raw)
+    
+    payload = property_to_json(address, address_data, include_raw=include_raw)
+    payload["cached"] = cached
+    return payload
+
+def smarty_error_message(error: Exception) -> str:
+    """Client-facing error for a failed lookup; the details, minus credentials, go to the server log."""
+    logger.warning("Smarty lookup failed: %s", redact_urls(str(error)))
+    return f"Smarty API error ({lookup_error_status(error)})"
+
+@app.get("/property")
+async def get_property(address: str, include_raw: bool = False):
+    if not SMARTY_ENABLED:
+        return JSONResponse(content={"status": "error", "message": "Smarty API credentials are not configured"}, status_code=503)
+    if not address.strip():
+        return JSONResponse(content={"status": "error", "message": "address is required"}, status_code=400)
+    try:
+        return await enrich_property(address.strip(), include_raw)
+    except Exception as e:
+        return JSONResponse(content={"status": "error", "message": smarty_error_message(e)}, status_code=502)
+
+@app.post("/property/batch")
+async def get_property_batch(batch: PropertyBatch):
+    if not SMARTY_ENABLED:
+        return JSONResponse(content={"status": "error", "message": "Smarty API credentials are not configured"}, status_code=503)
+    addresses = [a.strip() for a in batch.addresses if a.strip()]
+    if not addresses:
+        return JSONResponse(content={"status": "error", "message": "addresses is required"}, status_code=400)
+    if len(addresses) > PROPERTY_BATCH_MAX:
+        return JSONResponse(content={"status": "error", "message": f"At most {PROPERTY_BATCH_MAX} addresses per batch"}, status_code=400)
+    
+    async def enrich_or_error(address):
+        try:
+            return await enrich_property(address, batch.include_raw)
+        except Exception as e:
+            # A bad address or malformed Smarty payload only fails its own entry
+            return {"input_address": address, "error": smarty_error_message(e)}
+    
+    results = await asyncio.gather(*(enrich_or_error(a) for a in addresses))
+    return {"status": "success", "count": len(results), "results": results}
+
 # Run FastAPI backend
 def run_backend():
     uvicorn.run(app, host="0.0.0.0", port=8000)
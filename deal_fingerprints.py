@@ -0,0 +1,205 @@
+"""
+Fingerprint index of previously analyzed deals for duplicate detection.
+
+Each saved deal is indexed by its normalized property address(es) and by a
+MinHash signature of the word shingles in its offering memo text. Signatures
+are bucketed with LSH banding, so checking a new document costs one pass over
+its text plus a few indexed lookups, and happens before any paid API call.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from address_parser import normalize_address
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_deal_fingerprints.sqlite3")
+
+SHINGLE_SIZE = 5
+NUM_HASHES = 128
+# 16 bands of 8 rows: pairs above roughly 0.7 Jaccard similarity share a bucket
+LSH_BANDS = 16
+LSH_ROWS = NUM_HASHES // LSH_BANDS
+DEFAULT_THRESHOLD = 0.8
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_EMPTY = 0xFFFFFFFFFFFFFFFF
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Set of overlapping word n-grams in lowercased text."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str, num_hashes: int = NUM_HASHES) -> List[int]:
+    """One-permutation MinHash signature of the text's shingles.
+
+    Each shingle is hashed once; the hash picks a bin and the minimum per bin
+    forms the signature. Empty bins borrow from the next non-empty bin so
+    short documents still produce comparable signatures.
+    """
+    bins = [_EMPTY] * num_hashes
+    for shingle in shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        index = h % num_hashes
+        value = h // num_hashes
+        if value < bins[index]:
+            bins[index] = value
+    if all(v == _EMPTY for v in bins):
+        return bins
+    for i in range(num_hashes):
+        j = i
+        while bins[j % num_hashes] == _EMPTY:
+            j += 1
+        bins[i] = bins[j % num_hashes] if bins[i] == _EMPTY else bins[i]
+    return bins
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not a or not b:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _band_keys(signature: Sequence[int]) -> List[str]:
+    return [
+        hashlib.blake2b(
+            struct.pack(f">{LSH_ROWS}Q", *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]),
+            digest_size=8
+        ).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class DealFingerprintIndex:
+    """SQLite-backed LSH index of deal text signatures and address keys."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                record_id TEXT PRIMARY KEY,
+                property_name TEXT NOT NULL DEFAULT '',
+                signature BLOB,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                record_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets (band, bucket);
+            CREATE TABLE IF NOT EXISTS address_keys (
+                address_key TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                PRIMARY KEY (address_key, record_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def add(
+        self,
+        record_id: str,
+        signature: Optional[Sequence[int]],
+        addresses: Iterable[str] = (),
+        property_name: str = ""
+    ) -> None:
+        """Index a saved deal under its text signature and its property's address(es), not every address in the memo."""
+        keys = {normalize_address(a) for a in addresses if a}
+        keys.discard("")
+        has_signature = signature and any(v != _EMPTY for v in signature)
+        with self._lock:
+            self._conn.execute("DELETE FROM lsh_buckets WHERE record_id = ?", (record_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (record_id, property_name, signature, created) VALUES (?, ?, ?, ?)",
+                (
+                    record_id,
+                    property_name or "",
+                    struct.pack(f">{NUM_HASHES}Q", *signature) if has_signature else None,
+                    time.time()
+                )
+            )
+            if has_signature:
+                self._conn.executemany(
+                    "INSERT INTO lsh_buckets (band, bucket, record_id) VALUES (?, ?, ?)",
+                    [(band, key, record_id) for band, key in enumerate(_band_keys(signature))]
+                )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO address_keys (address_key, record_id) VALUES (?, ?)",
+                [(key, record_id) for key in keys]
+            )
+            self._conn.commit()
+
+    def find_duplicates(
+        self,
+        signature: Optional[Sequence[int]],
+        addresses: Iterable[str] = (),
+        threshold: float = DEFAULT_THRESHOLD
+    ) -> List[Dict]:
+        """
+        Previously indexed deals with a matching property address or a near-duplicate
+        text, best match first. Each match has record_id, property_name, similarity and reason.
+        """
+        matches = {}
+        keys = {normalize_address(a) for a in addresses if a}
+        keys.discard("")
+        with self._lock:
+            for key in keys:
+                for (record_id,) in self._conn.execute(
+                    "SELECT record_id FROM address_keys WHERE address_key = ?", (key,)
+                ):
+                    matches[record_id] = {"record_id": record_id, "similarity": None, "reason": f"Same address: {key}"}
+
+            if signature and any(v != _EMPTY for v in signature):
+                candidates = set()
+                for band, bucket in enumerate(_band_keys(signature)):
+                    candidates.update(
+                        rid for (rid,) in self._conn.execute(
+                            "SELECT record_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                        )
+                    )
+                for record_id in candidates:
+                    row = self._conn.execute(
+                        "SELECT signature FROM fingerprints WHERE record_id = ?", (record_id,)
+                    ).fetchone()
+                    if not row or not row[0]:
+                        continue
+                    score = similarity(signature, struct.unpack(f">{NUM_HASHES}Q", row[0]))
+                    if score >= threshold:
+                        match = matches.setdefault(record_id, {"record_id": record_id, "reason": ""})
+                        match["similarity"] = score
+                        match["reason"] = "; ".join(filter(None, [match["reason"], f"{score:.0%} similar text"]))
+
+            for match in matches.values():
+                row = self._conn.execute(
+                    "SELECT property_name FROM fingerprints WHERE record_id = ?", (match["record_id"],)
+                ).fetchone()
+                match["property_name"] = row[0] if row else ""
+
+        return sorted(matches.values(), key=lambda m: -(m["similarity"] or 1.0))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path: str = DEFAULT_DB_PATH) -> DealFingerprintIndex:
+    """Process-wide index per database file."""
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = DealFingerprintIndex(path)
+        return _indexes[path]
@@ -0,0 +1,219 @@
+"""
+Prompts and response parsing for the deal extraction calls.
+
+Each builder fits the document text into the model's token budget and
+returns a FittedPrompt; each parser turns the model's reply into the value
+the app stores. Nothing here talks to OpenAI or Streamlit, so the same
+prompts serve the synchronous helpers in app.py and the async layer in
+llm_async.py.
+"""
+
+import json
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from local_extract import EMAIL_RE, PHONE_RE, format_hints
+from prompt_budget import FittedPrompt, PromptBudgeter
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Output tokens reserved for each reply
+NOTES_RESERVE = 400
+ADDRESS_RESERVE = 100
+CONTACT_RESERVE = 500
+SUMMARY_RESERVE = 1000
+CONTACTS_RESERVE = 1500
+
+# Default document-text budget per prompt, in tokens; close to the old character cuts
+# (address 2,000 chars, contact 3,500, summary 4,000). Override per prompt on the budgeter.
+TEXT_TOKENS = {
+    "notes": 2000,
+    "address": 500,
+    "contact": 1000,
+    "summary": 1500,
+    "contact_record": 1000,
+    "contacts": 1500
+}
+
+
+def notes_prompt(budgeter: PromptBudgeter, notes: str, model: str = DEFAULT_MODEL) -> FittedPrompt:
+    return budgeter.fit(
+        model,
+        "Summarize the following deal notes or email thread in 2-4 concise, neutral bullet points:\n\n",
+        notes,
+        reserve_output=NOTES_RESERVE,
+        max_text_tokens=budgeter.text_limit("notes", TEXT_TOKENS["notes"])
+    )
+
+
+def address_prompt(budgeter: PromptBudgeter, text: str, local_details: Dict, model: str = DEFAULT_MODEL) -> FittedPrompt:
+    return budgeter.fit(
+        model,
+        format_hints(local_details, keys=("addresses",)) +
+        "Extract the complete property address from the following text. "
+        "Look for addresses that include street number, street name, city, state, and zip code. "
+        "Common formats include:\n"
+        "- '123 Main St, City, State 12345'\n"
+        "- '15031-15139 Marlboro Pike, Upper Marlboro, MD 20772'\n"
+        "- '456 Oak Avenue, Springfield, IL 62701'\n\n"
+        "Return ONLY the complete address, or 'NOT_FOUND' if no complete address is found.\n\n"
+        "Text:\n",
+        text,
+        reserve_output=ADDRESS_RESERVE,
+        max_text_tokens=budgeter.text_limit("address", TEXT_TOKENS["address"])
+    )
+
+
+def contact_prompt(budgeter: PromptBudgeter, text: str, local_details: Dict, models: Sequence[str]) -> FittedPrompt:
+    # The same prompt may be escalated, so it has to fit every model it can be sent to
+    return budgeter.fit(
+        models,
+        format_hints(local_details, keys=("emails", "phones")) +
+        "Extract the contact information (name, company, phone, and email) of any brokers, "
+        "sponsors, or agents from the following text. Be thorough and include details even if they "
+        "are buried in an email signature or footnote. Return in plain text format.\n\nText:\n",
+        text,
+        reserve_output=CONTACT_RESERVE,
+        max_text_tokens=budgeter.text_limit("contact", TEXT_TOKENS["contact"])
+    )
+
+
+def summary_prompt(budgeter: PromptBudgeter, text: str, deal_type: str, model: str = DEFAULT_MODEL) -> FittedPrompt:
+    return budgeter.fit(
+        model,
+        f"You are an AI real estate analyst reviewing a {deal_type.lower()} opportunity.\n\n"
+        "Text:\n",
+        text,
+        "\n\n"
+        "Return JSON with:\n"
+        "- Property Name\n"
+        "- Location (extract the COMPLETE property address including street number, street name, city, state, and zip code if available. Look for addresses in formats like '123 Main St, City, State 12345' or '15031-15139 Marlboro Pike, Upper Marlboro, MD 20772')\n"
+        "- Asset Class\n"
+        "- Sponsor\n"
+        "- Broker\n"
+        "- Purchase Price\n"
+        "- Loan Amount\n"
+        "- In-Place Cap Rate\n"
+        "- Interest Rate\n"
+        "- Square Footage or Unit Count\n"
+        "- Key Highlights (bullet points)\n"
+        "- Risks or Red Flags (bullet points)\n"
+        "- Summary (2-3 sentences)\n",
+        reserve_output=SUMMARY_RESERVE,
+        max_text_tokens=budgeter.text_limit("summary", TEXT_TOKENS["summary"])
+    )
+
+
+def contact_record_prompt(budgeter: PromptBudgeter, text: str, local_details: Dict, model: str = DEFAULT_MODEL) -> FittedPrompt:
+    return budgeter.fit(
+        model,
+        format_hints(local_details) +
+        "Extract contact information from the following text block. "
+        "Return a JSON object with these fields (leave empty if not found):\n"
+        "- Name (full name)\n"
+        "- Email\n"
+        "- Phone (primary phone number)\n"
+        "- Address (full address)\n"
+        "- Website\n"
+        "- Organization (company or organization name)\n"
+        "- Notes (any additional relevant information)\n\n"
+        "Text:\n",
+        text,
+        reserve_output=CONTACT_RESERVE,
+        max_text_tokens=budgeter.text_limit("contact_record", TEXT_TOKENS["contact_record"])
+    )
+
+
+def contacts_prompt(budgeter: PromptBudgeter, text: str, local_details: Dict, model: str = DEFAULT_MODEL) -> FittedPrompt:
+    return budgeter.fit(
+        model,
+        format_hints(local_details) +
+        "Extract multiple contacts from the following text block. "
+        "The text may contain multiple people's contact information separated by sections, paragraphs, or other delimiters. "
+        "Return a JSON array where each element is a contact object with these fields (leave empty if not found):\n"
+        "- Name (full name)\n"
+        "- Email\n"
+        "- Phone (primary phone number)\n"
+        "- Address (full address)\n"
+        "- Website\n"
+        "- Organization (company or organization name)\n"
+        "- Notes (any additional relevant information)\n\n"
+        "If there's only one contact, return an array with one element. "
+        "If no contacts are found, return an empty array.\n\n"
+        "Text:\n",
+        text,
+        reserve_output=CONTACTS_RESERVE,
+        max_text_tokens=budgeter.text_limit("contacts", TEXT_TOKENS["contacts"])
+    )
+
+
+# --- Response parsing ---
+
+def parse_address(result: str) -> str:
+    result = result.strip()
+    if result and result != "NOT_FOUND" and len(result) > 10:
+        return result
+    return ""
+
+
+def clean_contact_result(result: str) -> str:
+    """Blank if the model found no meaningful contact info."""
+    result = result.strip()
+    if not result or "no contact information" in result.lower() or "no brokers" in result.lower():
+        return ""
+    return result
+
+
+def score_contact_result(result: str, source: str) -> Tuple[float, List[str]]:
+    """
+    Score how much a contact extraction can be trusted, from 0 to 1.
+    Returns the score and the reasons it was lowered.
+    """
+    score = 1.0
+    reasons = []
+    source_emails = {e.lower() for e in EMAIL_RE.findall(source)}
+    result_emails = {e.lower() for e in EMAIL_RE.findall(result)}
+    source_has_phone = bool(PHONE_RE.search(source))
+
+    if not result:
+        if source_emails or source_has_phone:
+            score -= 1.0
+            reasons.append("empty result but contact details in text")
+        return max(score, 0.0), reasons
+
+    if result_emails - source_emails:
+        score -= 0.5
+        reasons.append("email not found in text")
+    if source_emails - result_emails:
+        score -= 0.3
+        reasons.append("emails in text were missed")
+    if not PHONE_RE.search(result):
+        score -= 0.5 if source_has_phone else 0.2
+        reasons.append("no phone found")
+    return max(score, 0.0), reasons
+
+
+def parse_summary_json(raw: str) -> Dict:
+    cleaned = re.sub(r"```(?:json)?", "", raw).strip()
+    cleaned = re.sub(r"^[^\{]*", "", cleaned, flags=re.DOTALL)
+    return json.loads(cleaned)
+
+
+def parse_contact_json(content: str) -> Dict:
+    # Remove any markdown code block syntax and any text before the first {
+    content = re.sub(r"```(?:json)?", "", content).strip()
+    content = re.sub(r"^[^\{]*", "", content, flags=re.DOTALL)
+    return json.loads(content)
+
+
+def parse_contacts_json(content: str) -> List[Dict]:
+    # Remove any markdown code block syntax and any text before the first [
+    content = re.sub(r"```(?:json)?", "", content).strip()
+    content = re.sub(r"^[^\[]*", "", content, flags=re.DOTALL)
+    parsed_contacts = json.loads(content)
+    # Ensure it's a list
+    if isinstance(parsed_contacts, dict):
+        return [parsed_contacts]
+    if not isinstance(parsed_contacts, list):
+        return []
+    return parsed_contacts
@@ -0,0 +1,178 @@
+"""
+Legacy Word (.doc) to text conversion.
+
+Uses antiword when it is installed (fast, no start-up cost) and otherwise a
+headless LibreOffice. Conversions run on a fixed pool of worker slots with a
+bounded wait queue and a per-file timeout. Each LibreOffice slot keeps its own
+persistent user profile, which is created once by a warm-up run, so later
+conversions skip LibreOffice's first-start initialization. The pool reuses
+profiles only: every conversion still starts (and tears down) its own soffice
+process, so a .doc costs a LibreOffice launch each time. Output is cached by a
+hash of the file contents, which is what keeps repeat uploads cheap.
+"""
+
+import hashlib
+import os
+import queue
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Optional
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_doc_cache.sqlite3")
+PROFILE_ROOT = os.path.join(tempfile.gettempdir(), "dealflow_libreoffice")
+
+
+class ConverterUnavailable(RuntimeError):
+    """Neither antiword nor LibreOffice is installed."""
+
+
+class ConverterBusy(RuntimeError):
+    """Too many conversions are already waiting."""
+
+
+def find_backend() -> Optional[str]:
+    if shutil.which("antiword"):
+        return "antiword"
+    for binary in ("soffice", "libreoffice"):
+        if shutil.which(binary):
+            return binary
+    return None
+
+
+class DocConverter:
+    """Bounded pool of .doc converters with a content-hash cache."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 8, timeout: float = 60, cache_path: str = DEFAULT_DB_PATH):
+        self.backend = find_backend()
+        self.timeout = timeout
+        self.workers = workers
+        self._slots = queue.Queue()
+        for slot in range(workers):
+            self._slots.put(slot)
+        # Running plus waiting conversions; callers beyond this are turned away
+        self._admission = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS doc_text (sha256 TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM doc_text WHERE sha256 = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _store(self, key: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO doc_text (sha256, text, created) VALUES (?, ?, ?)", (key, text, time.time())
+            )
+            self._conn.commit()
+
+    def _run_antiword(self, path: str) -> str:
+        result = subprocess.run(["antiword", "-w", "0", path], capture_output=True, timeout=self.timeout)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode(errors="replace").strip() or "antiword failed")
+        return result.stdout.decode("utf-8", errors="replace")
+
+    def _run_libreoffice(self, path: str, slot: int) -> str:
+        # A fresh soffice per call; only the slot's profile carries over between conversions
+        profile = os.path.join(PROFILE_ROOT, f"profile_{slot}")
+        outdir = os.path.dirname(path)
+        result = subprocess.run(
+            [
+                self.backend,
+                f"-env:UserInstallation=file://{profile}",
+                "--headless", "--norestore", "--nologo", "--nolockcheck",
+                "--convert-to", "txt:Text (encoded):UTF8",
+                "--outdir", outdir,
+                path
+            ],
+            capture_output=True,
+            timeout=self.timeout
+        )
+        output = os.path.splitext(path)[0] + ".txt"
+        if result.returncode != 0 or not os.path.exists(output):
+            raise RuntimeError(result.stderr.decode(errors="replace").strip() or "LibreOffice conversion failed")
+        with open(output, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def _convert_file(self, path: str, slot: int) -> str:
+        if self.backend == "antiword":
+            return self._run_antiword(path)
+        return self._run_libreoffice(path, slot)
+
+    def convert(self, data: bytes) -> str:
+        """Text of a .doc file. Raises ConverterUnavailable, ConverterBusy or on conversion failure/timeout."""
+        if not self.available:
+            raise ConverterUnavailable("No .doc converter installed (antiword or LibreOffice)")
+        key = hashlib.sha256(data).hexdigest()
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        if not self._admission.acquire(blocking=False):
+            raise ConverterBusy("Too many .doc conversions in progress, try again shortly")
+        try:
+            slot = self._slots.get(timeout=self.timeout)
+        except queue.Empty:
+            self._admission.release()
+            raise ConverterBusy("Timed out waiting for a .doc converter")
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                path = os.path.join(workdir, "document.doc")
+                with open(path, "wb") as f:
+                    f.write(data)
+                text = self._convert_file(path, slot).strip()
+        finally:
+            self._slots.put(slot)
+            self._admission.release()
+        self._store(key, text)
+        return text
+
+    def warm_up(self) -> None:
+        """Create each LibreOffice slot's profile ahead of the first real conversion."""
+        if self.backend in (None, "antiword"):
+            return
+
+        def run():
+            # Hold the slot so a conversion cannot share the profile while it is being created
+            slot = self._slots.get()
+            try:
+                profile = os.path.join(PROFILE_ROOT, f"profile_{slot}")
+                if not os.path.isdir(profile):
+                    subprocess.run(
+                        [self.backend, f"-env:UserInstallation=file://{profile}", "--headless", "--terminate_after_init"],
+                        capture_output=True,
+                        timeout=120
+                    )
+            except Exception:
+                pass
+            finally:
+                self._slots.put(slot)
+
+        for i in range(self.workers):
+            threading.Thread(target=run, name=f"doc-warmup-{i}", daemon=True).start()
+
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def get_converter(workers: int = 2, max_queue: int = 8, timeout: float = 60, cache_path: str = DEFAULT_DB_PATH) -> DocConverter:
+    """Process-wide converter, warmed up once when first created."""
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            _converter = DocConverter(workers, max_queue, timeout, cache_path)
+            _converter.warm_up()
+        return _converter
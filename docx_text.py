@@ -0,0 +1,99 @@
+"""
+Streaming text extraction for .docx files.
+
+Reads word/document.xml and the header/footer parts straight out of the zip
+with ElementTree.iterparse, emitting paragraphs and table rows in reading
+order. Elements are cleared as soon as they are consumed, so memory stays
+flat no matter how large the document is (only the output text grows).
+"""
+
+import re
+import zipfile
+from typing import IO, Iterator, List, Union
+from xml.etree import ElementTree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_HEADER_RE = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_RE = re.compile(r"^word/footer\d*\.xml$")
+
+
+def _part_number(name: str) -> int:
+    digits = re.sub(r"\D", "", name)
+    return int(digits) if digits else 0
+
+
+def iter_part_lines(stream: IO[bytes]) -> Iterator[str]:
+    """Yield one line per paragraph and one ' | '-joined line per table row of a WordprocessingML part."""
+    depth = 0
+    container = None  # w:body in the main document, the root element in headers/footers
+    container_depth = 0
+    paragraph: List[str] = []
+    tables: List[dict] = []  # One {"row": [...], "cell": [...]} per open (possibly nested) table
+
+    for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            depth += 1
+            if container is None and (tag == W + "body" or tag in (W + "hdr", W + "ftr")):
+                container, container_depth = elem, depth
+            elif tag == W + "tbl":
+                tables.append({"row": [], "cell": []})
+            continue
+
+        # End events
+        if tag == W + "t":
+            paragraph.append(elem.text or "")
+        elif tag == W + "tab":
+            paragraph.append("\t")
+        elif tag in (W + "br", W + "cr"):
+            paragraph.append("\n")
+        elif tag == W + "p":
+            text = "".join(paragraph).strip()
+            paragraph = []
+            if tables:
+                if text:
+                    tables[-1]["cell"].append(text)
+            else:
+                yield text
+        elif tag == W + "tc" and tables:
+            tables[-1]["row"].append(" ".join(tables[-1]["cell"]))
+            tables[-1]["cell"] = []
+        elif tag == W + "tr" and tables:
+            cells = tables[-1]["row"]
+            tables[-1]["row"] = []
+            if any(cells):
+                line = " | ".join(c for c in cells)
+                if len(tables) > 1:
+                    tables[-2]["cell"].append(line)  # Nested table rows become part of the outer cell
+                else:
+                    yield line
+        elif tag == W + "tbl" and tables:
+            tables.pop()
+
+        depth -= 1
+        # Drop everything already consumed under the container
+        if container is not None and depth == container_depth:
+            container.clear()
+
+
+def extract_docx_text(source: Union[str, IO[bytes]]) -> str:
+    """Text of a .docx file: headers, then the body, then footers, skipping repeated header/footer text."""
+    lines: List[str] = []
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        headers = sorted((n for n in names if _HEADER_RE.match(n)), key=_part_number)
+        footers = sorted((n for n in names if _FOOTER_RE.match(n)), key=_part_number)
+        seen_parts = set()
+        for name in headers + ["word/document.xml"] + footers:
+            if name not in names:
+                continue
+            with archive.open(name) as part:
+                part_lines = [line for line in iter_part_lines(part) if line]
+            if name != "word/document.xml":
+                key = "\n".join(part_lines)
+                if not key or key in seen_parts:
+                    continue
+                seen_parts.add(key)
+            lines.extend(part_lines)
+    return "\n".join(lines)
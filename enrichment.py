@@ -0,0 +1,307 @@
+"""
+Background enrichment of saved Airtable records.
+
+Work that is too slow or too expensive to hold up saving a deal (contact
+extraction, public records lookups, attachment uploads) is queued as a job
+against the record it belongs to. A small pool of worker threads runs each
+job's handler, which returns the fields to PATCH onto the record. Jobs are
+kept in SQLite, so they survive a restart, and failures are retried with
+exponential backoff independent of the session that queued them.
+
+Which steps run inline during analysis and which are deferred is described
+by a PipelineProfile.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from property_lookup import redact_urls
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_enrichment.sqlite3")
+
+INLINE = "inline"
+BACKGROUND = "background"
+SKIP = "skip"
+STEP_MODES = (INLINE, BACKGROUND, SKIP)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Client errors that retrying cannot fix; everything else is retried
+RETRYABLE_CLIENT_STATUS = {408, 409, 429}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure that retrying will not fix."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_permanent(error: Exception) -> bool:
+    """4xx responses other than timeouts, conflicts and rate limits fail the job at once."""
+    if isinstance(error, PermanentJobError):
+        return True
+    status = _status_code(error)
+    return bool(status) and 400 <= status < 500 and status not in RETRYABLE_CLIENT_STATUS
+
+
+def describe_error(error: Exception) -> str:
+    """
+    A failed job's error as stored: the error class (and HTTP status), the message
+    with URL query strings removed, since request URLs can carry credentials,
+    and the last few frames.
+    """
+    status = _status_code(error)
+    summary = f"{type(error).__name__} (HTTP {status})" if status else type(error).__name__
+    frames = "".join(traceback.format_tb(error.__traceback__)[-3:])
+    return f"{summary}\n{redact_urls(str(error))}\n{frames}"
+
+
+class PipelineProfile(NamedTuple):
+    """How each enrichment step of an analysis runs: inline, background (after save) or skip."""
+    contacts: str = INLINE  # Contact extraction and linking (the notes summary runs with it)
+    public_records: str = INLINE  # Smarty lookup and public records formatting
+    attachments: str = INLINE  # S3 uploads of the source documents
+
+
+PROFILES = {
+    "full": PipelineProfile(),
+    # Summary only; everything else is filled in on the saved record later
+    "fast": PipelineProfile(contacts=BACKGROUND, public_records=BACKGROUND, attachments=BACKGROUND),
+    "summary_only": PipelineProfile(contacts=SKIP, public_records=SKIP, attachments=SKIP),
+}
+
+
+def parse_profile(spec: str) -> PipelineProfile:
+    """
+    A profile by name, optionally with per-step overrides:
+    'fast', 'full,attachments=background' or 'fast,contacts=skip'.
+    """
+    parts = [p.strip() for p in (spec or "").split(",") if p.strip()]
+    profile = PROFILES["full"]
+    if parts and "=" not in parts[0]:
+        profile = PROFILES.get(parts.pop(0).lower(), profile)
+    overrides = {}
+    for part in parts:
+        step, _, mode = part.partition("=")
+        step, mode = step.strip().lower(), mode.strip().lower()
+        if step in PipelineProfile._fields and mode in STEP_MODES:
+            overrides[step] = mode
+    return profile._replace(**overrides)
+
+
+class EnrichmentQueue:
+    """SQLite-backed job queue whose handlers compute fields that are PATCHed onto Airtable records."""
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_DB_PATH,
+        workers: int = 2,
+        max_attempts: int = 6,
+        base_delay: float = 30,
+        poll_interval: float = 5
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable[[Dict], Optional[Dict]]] = {}
+        self._cleanups: Dict[str, Callable[[Dict], None]] = {}
+        self._patch: Optional[Callable[[str, str, Dict], None]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_run REAL NOT NULL,
+                last_error TEXT NOT NULL DEFAULT '',
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS enrichment_jobs_due ON enrichment_jobs (status, next_run)")
+        # Jobs that were running when the last process stopped are picked up again
+        self._conn.execute("UPDATE enrichment_jobs SET status = ? WHERE status = ?", (PENDING, RUNNING))
+        # Errors stored before they were redacted may quote credentials in request URLs
+        self._conn.executemany(
+            "UPDATE enrichment_jobs SET last_error = ? WHERE id = ?",
+            [
+                (redact_urls(error), job_id) for job_id, error in
+                self._conn.execute("SELECT id, last_error FROM enrichment_jobs WHERE last_error LIKE '%?%'").fetchall()
+            ]
+        )
+        self._conn.commit()
+
+    def register(self, kind: str, handler: Callable[[Dict], Optional[Dict]], cleanup: Callable[[Dict], None] = None) -> None:
+        """
+        handler(payload) returns the fields to PATCH (or None for nothing) and raises to retry.
+        Changes the handler makes to payload are saved when it fails, so a retry can
+        skip work that already succeeded. cleanup(payload), if given, runs once the
+        job has finished or given up.
+        """
+        self._handlers[kind] = handler
+        if cleanup:
+            self._cleanups[kind] = cleanup
+
+    def set_patch(self, patch: Callable[[str, str, Dict], None]) -> None:
+        """patch(table, record_id, fields) writes the fields; it raises on failure so the job is retried."""
+        self._patch = patch
+
+    def enqueue(self, table: str, record_id: str, kind: str, payload: Dict, delay: float = 0) -> int:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO enrichment_jobs (table_name, record_id, kind, payload, status, next_run, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (table, record_id, kind, json.dumps(payload), PENDING, now + delay, now, now)
+            )
+            self._conn.commit()
+        self._wake.set()
+        return cur.lastrowid
+
+    def _claim(self) -> Optional[tuple]:
+        now = time.time()
+        with self._lock:
+            kinds = list(self._handlers)
+            if not kinds:
+                return None
+            row = self._conn.execute(
+                f"SELECT id, table_name, record_id, kind, payload, attempts FROM enrichment_jobs "
+                f"WHERE status = ? AND next_run <= ? AND kind IN ({','.join('?' * len(kinds))}) "
+                f"ORDER BY next_run LIMIT 1",
+                (PENDING, now, *kinds)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE enrichment_jobs SET status = ?, updated = ? WHERE id = ?", (RUNNING, now, row[0])
+                )
+                self._conn.commit()
+            return row
+
+    def _finish(
+        self, job_id: int, status: str, attempts: int, error: str = "", next_run: float = 0, payload: Dict = None
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE enrichment_jobs SET status = ?, attempts = ?, last_error = ?, next_run = ?, updated = ? WHERE id = ?",
+                (status, attempts, error[:2000], next_run, time.time(), job_id)
+            )
+            if payload is not None:
+                self._conn.execute("UPDATE enrichment_jobs SET payload = ? WHERE id = ?", (json.dumps(payload), job_id))
+            self._conn.commit()
+
+    def _run(self, job: tuple) -> None:
+        job_id, table, record_id, kind, payload_json, attempts = job
+        payload = json.loads(payload_json)
+        attempts += 1
+        try:
+            fields = self._handlers[kind](payload)
+            if fields:
+                if self._patch is None:
+                    raise RuntimeError("No Airtable PATCH function configured")
+                self._patch(table, record_id, fields)
+        except Exception as e:
+            error = describe_error(e)
+            if attempts >= self.max_attempts or is_permanent(e):
+                self._finish(job_id, FAILED, attempts, error, payload=payload)
+                self._cleanup(kind, payload)
+            else:
+                delay = self.base_delay * 2 ** (attempts - 1)
+                self._finish(job_id, PENDING, attempts, error, time.time() + delay, payload=payload)
+            return
+        self._finish(job_id, DONE, attempts)
+        self._cleanup(kind, payload)
+
+    def _cleanup(self, kind: str, payload: Dict) -> None:
+        cleanup = self._cleanups.get(kind)
+        if cleanup:
+            try:
+                cleanup(payload)
+            except Exception:
+                pass
+
+    def _worker(self) -> None:
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def start(self) -> None:
+        """Start the worker threads once; later calls do nothing."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"enrichment-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def retry(self, job_id: int) -> None:
+        """Run a failed job again from its first attempt."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE enrichment_jobs SET status = ?, attempts = 0, next_run = ?, updated = ? WHERE id = ? AND status = ?",
+                (PENDING, time.time(), time.time(), job_id, FAILED)
+            )
+            self._conn.commit()
+        self._wake.set()
+
+    def jobs(self, record_id: str = None, status: str = None, limit: int = 50) -> List[Dict]:
+        """Recent jobs, newest first, without their payloads. The first line of last_error is the error class."""
+        query = "SELECT id, table_name, record_id, kind, status, attempts, last_error, next_run, created, updated FROM enrichment_jobs"
+        clauses, params = [], []
+        if record_id:
+            clauses.append("record_id = ?")
+            params.append(record_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        columns = ("id", "table", "record_id", "kind", "status", "attempts", "last_error", "next_run", "created", "updated")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM enrichment_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(db_path: str = DEFAULT_DB_PATH, **kwargs) -> EnrichmentQueue:
+    """Process-wide enrichment queue, shared by all sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = EnrichmentQueue(db_path, **kwargs)
+        return _queue
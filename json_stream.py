@@ -0,0 +1,80 @@
+"""
+Incremental parser for a streamed JSON object.
+
+Model output arrives a few characters at a time. The parser tracks string and
+nesting state as chunks are fed in and hands back each top-level member of the
+object as soon as its value is complete, so fields can be shown before the
+whole response has arrived.
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """Yield the top-level members of a JSON object as they complete.
+
+    Anything before the opening brace (such as a markdown code fence) is
+    ignored, as is anything after the closing brace.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+        self.done = False
+        self.result: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of text and return the members it completed."""
+        completed = []
+        if self.done or not chunk:
+            return completed
+        self._buf += chunk
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._member_start = i + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._emit(buf[self._member_start:i]))
+                    self.done = True
+                    break
+            elif ch == "," and self._depth == 1:
+                completed.extend(self._emit(buf[self._member_start:i]))
+                self._member_start = i + 1
+            i += 1
+        self._pos = i
+        return completed
+
+    def _emit(self, member: str) -> List[Tuple[str, Any]]:
+        member = member.strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return []
+        self.result.update(parsed)
+        return list(parsed.items())
@@ -0,0 +1,194 @@
+"""
+Async deal extraction on AsyncOpenAI.
+
+One event loop runs on a daemon thread for the whole process. Streamlit
+scripts, the FastAPI backend and batch jobs hand it coroutines: `run` blocks
+the calling thread until the result is ready, and `wrap` returns an
+awaitable for code that already runs on another loop. Concurrent calls are
+coroutines on that one loop rather than a thread each, and they all go
+through the shared OpenAI gateway, so they are paced by its budgets.
+"""
+
+import asyncio
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from deal_prompts import (
+    DEFAULT_MODEL, address_prompt, clean_contact_result, contact_prompt, contact_record_prompt, contacts_prompt,
+    notes_prompt, parse_address, parse_contact_json, parse_contacts_json, parse_summary_json, score_contact_result,
+    summary_prompt
+)
+from local_extract import extract_local_details, has_contact_details
+from openai_gateway import INTERACTIVE, OpenAIGateway
+from prompt_budget import FittedPrompt, PromptBudgeter
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever on a daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the loop and block this thread for its result."""
+        return self.submit(coro).result(timeout)
+
+    def wrap(self, coro):
+        """Awaitable for a coroutine run on this loop, for callers on a different event loop."""
+        return asyncio.wrap_future(self.submit(coro))
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> BackgroundLoop:
+    """Process-wide background event loop."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = BackgroundLoop()
+        return _loop
+
+
+class CallContext:
+    """Who a batch of calls is for, and what they had to trim or could not parse."""
+
+    def __init__(self, run_id: str = "", user: str = "", lane: str = INTERACTIVE):
+        self.run_id = run_id
+        self.user = user
+        self.lane = lane
+        self.truncated: List[Tuple[str, FittedPrompt]] = []
+        self.errors: List[str] = []
+
+
+class AsyncExtractor:
+    """The app's GPT extraction helpers as coroutines."""
+
+    def __init__(
+        self,
+        gateway: OpenAIGateway,
+        budgeter: PromptBudgeter,
+        usage_store=None,
+        contact_models: Sequence[str] = (DEFAULT_MODEL, "gpt-4"),
+        escalation_threshold: float = 0.7
+    ):
+        self.gateway = gateway
+        self.budgeter = budgeter
+        self.usage_store = usage_store
+        self.contact_fast_model, self.contact_large_model = contact_models
+        self.escalation_threshold = escalation_threshold
+
+    async def _complete(self, caller: str, ctx: CallContext, fitted: FittedPrompt, model: str, temperature: float) -> str:
+        if fitted.truncated and not any(c == caller for c, _ in ctx.truncated):
+            ctx.truncated.append((caller, fitted))
+        res = await self.gateway.acreate(
+            ctx.lane,
+            model=model,
+            messages=[{"role": "user", "content": fitted.prompt}],
+            temperature=temperature
+        )
+        usage = getattr(res, "usage", None)
+        if usage and self.usage_store is not None:
+            try:
+                self.usage_store.record(
+                    caller, getattr(res, "model", None) or model, usage.prompt_tokens, usage.completion_tokens,
+                    run_id=ctx.run_id, user=ctx.user
+                )
+            except Exception:
+                pass  # Accounting must never break extraction
+        return res.choices[0].message.content
+
+    def _record_escalation(self, escalated: bool, confidence: float, reasons: List[str], ctx: CallContext) -> None:
+        if self.usage_store is None:
+            return
+        try:
+            self.usage_store.record_escalation("extract_contact_info", escalated, confidence, reasons, run_id=ctx.run_id)
+        except Exception:
+            pass
+
+    async def summarize_notes(self, notes: str, ctx: CallContext) -> str:
+        if not notes.strip():
+            return ""
+        fitted = notes_prompt(self.budgeter, notes)
+        return (await self._complete("summarize_notes", ctx, fitted, DEFAULT_MODEL, 0.3)).strip()
+
+    async def extract_address_fallback(self, text: str, ctx: CallContext, local_details: Dict = None) -> str:
+        if local_details is None:
+            local_details = extract_local_details(text)
+        # Addresses found locally are only hints: a lone match is often the broker's office in a signature
+        fitted = address_prompt(self.budgeter, text, local_details)
+        return parse_address(await self._complete("extract_address_fallback", ctx, fitted, DEFAULT_MODEL, 0.1))
+
+    async def extract_contact_info(self, text: str, ctx: CallContext, local_details: Dict = None) -> str:
+        """Fast model first, escalating to the large model only when the fast result looks unreliable."""
+        if local_details is None:
+            local_details = extract_local_details(text)
+        # Nothing to extract if the full text has no email or phone anywhere
+        if not has_contact_details(local_details):
+            self._record_escalation(False, 1.0, ["no contact details in text"], ctx)
+            return ""
+        fitted = contact_prompt(self.budgeter, text, local_details, (self.contact_fast_model, self.contact_large_model))
+        result = clean_contact_result(
+            await self._complete("extract_contact_info", ctx, fitted, self.contact_fast_model, 0.3)
+        )
+        # Score against everything the model saw, including the hints
+        confidence, reasons = score_contact_result(result, fitted.prompt)
+        escalated = confidence < self.escalation_threshold
+        if escalated:
+            result = clean_contact_result(
+                await self._complete("extract_contact_info", ctx, fitted, self.contact_large_model, 0.3)
+            )
+        self._record_escalation(escalated, confidence, reasons, ctx)
+        return result
+
+    async def extract_summary(self, text: str, deal_type: str, ctx: CallContext) -> Dict:
+        fitted = summary_prompt(self.budgeter, text, deal_type)
+        return parse_summary_json(await self._complete("gpt_extract_summary", ctx, fitted, DEFAULT_MODEL, 0.3))
+
+    async def parse_contact_info(self, text: str, ctx: CallContext, local_details: Dict = None) -> Dict:
+        if local_details is None:
+            local_details = extract_local_details(text)
+        fitted = contact_record_prompt(self.budgeter, text, local_details)
+        content = await self._complete("parse_contact_info", ctx, fitted, DEFAULT_MODEL, 0.3)
+        try:
+            return parse_contact_json(content)
+        except Exception as e:
+            ctx.errors.append(f"Error parsing contact info: {str(e)}")
+            return {}
+
+    async def parse_multiple_contacts(self, text: str, ctx: CallContext, local_details: Dict = None) -> List[Dict]:
+        if local_details is None:
+            local_details = extract_local_details(text)
+        fitted = contacts_prompt(self.budgeter, text, local_details)
+        content = await self._complete("parse_multiple_contacts", ctx, fitted, DEFAULT_MODEL, 0.3)
+        try:
+            return parse_contacts_json(content)
+        except Exception as e:
+            ctx.errors.append(f"Error parsing multiple contacts: {str(e)}")
+            return []
+
+    async def contact_details(self, text: str, ctx: CallContext, local_details: Dict = None):
+        """Broker contact text and parsed contacts, requested concurrently."""
+        if local_details is None:
+            local_details = extract_local_details(text)
+        return await asyncio.gather(
+            self.extract_contact_info(text, ctx, local_details),
+            self.parse_multiple_contacts(text, ctx, local_details)
+        )
+
+    async def analyze_contacts(self, text: str, notes: str, ctx: CallContext, local_details: Dict = None):
+        """Notes summary, broker contact text and parsed contacts, requested concurrently."""
+        if local_details is None:
+            local_details = extract_local_details(text)
+        return await asyncio.gather(
+            self.summarize_notes(notes, ctx),
+            self.extract_contact_info(text, ctx, local_details),
+            self.parse_multiple_contacts(text, ctx, local_details)
+        )
@@ -0,0 +1,214 @@
+"""
+Token and cost accounting for OpenAI chat completions.
+
+Every completion is recorded with the calling function, the deal being
+analyzed and the logged-in user, so usage can be rolled up along any of those
+dimensions to decide which extraction steps to cache, trim or downgrade.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+# USD per 1K tokens as (prompt, completion). Matched on the longest model prefix
+# so dated snapshots such as "gpt-4-0613" price like their family.
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_llm_usage.sqlite3")
+
+GROUP_BY_COLUMNS = ("function", "model", "user", "deal")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of a completion from its token counts."""
+    model = (model or "").lower()
+    for prefix in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_rate, completion_rate = MODEL_PRICING[prefix]
+            return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1000
+    return 0.0
+
+
+class UsageStore:
+    """SQLite-backed store of per-call token usage."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                function TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                run_id TEXT NOT NULL DEFAULT '',
+                deal TEXT NOT NULL DEFAULT '',
+                user TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_run ON llm_usage (run_id)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_escalations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                function TEXT NOT NULL,
+                escalated INTEGER NOT NULL,
+                confidence REAL NOT NULL,
+                reasons TEXT NOT NULL DEFAULT '',
+                run_id TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+        self._conn.commit()
+
+    def record(
+        self,
+        function: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        run_id: str = "",
+        user: str = ""
+    ) -> None:
+        """Record the usage of a single completion."""
+        prompt_tokens = int(prompt_tokens or 0)
+        completion_tokens = int(completion_tokens or 0)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_usage (ts, function, model, prompt_tokens, completion_tokens, "
+                "total_tokens, cost_usd, run_id, user) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), function, model or "", prompt_tokens, completion_tokens,
+                    prompt_tokens + completion_tokens,
+                    estimate_cost(model, prompt_tokens, completion_tokens),
+                    run_id or "", user or ""
+                )
+            )
+            self._conn.commit()
+
+    def assign_deal(self, run_id: str, deal: str) -> None:
+        """Attribute every call made during an analysis run to the saved deal."""
+        if not run_id or not deal:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE llm_usage SET deal = ? WHERE run_id = ?", (deal, run_id))
+            self._conn.commit()
+
+    def record_escalation(
+        self,
+        function: str,
+        escalated: bool,
+        confidence: float,
+        reasons: List[str] = None,
+        run_id: str = ""
+    ) -> None:
+        """Record whether a tiered call was escalated to the large model."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_escalations (ts, function, escalated, confidence, reasons, run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), function, int(bool(escalated)), float(confidence), "; ".join(reasons or []), run_id or "")
+            )
+            self._conn.commit()
+
+    def escalation_report(self, since: Optional[float] = None) -> List[Dict]:
+        """Escalation rate and the most common escalation reasons per tiered function."""
+        query = "SELECT function, escalated, confidence, reasons FROM llm_escalations"
+        params = []
+        if since is not None:
+            query += " WHERE ts >= ?"
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        by_function = {}
+        for function, escalated, confidence, reasons in rows:
+            stats = by_function.setdefault(function, {"calls": 0, "escalated": 0, "confidence": 0.0, "reasons": {}})
+            stats["calls"] += 1
+            stats["escalated"] += escalated
+            stats["confidence"] += confidence
+            if escalated:
+                for reason in filter(None, reasons.split("; ")):
+                    stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+        return [
+            {
+                "Function": function,
+                "Calls": stats["calls"],
+                "Escalated": stats["escalated"],
+                "Escalation Rate": f"{stats['escalated'] / stats['calls']:.0%}",
+                "Avg Confidence": round(stats["confidence"] / stats["calls"], 2),
+                "Top Reasons": ", ".join(
+                    f"{reason} ({count})"
+                    for reason, count in sorted(stats["reasons"].items(), key=lambda item: -item[1])[:3]
+                )
+            }
+            for function, stats in sorted(by_function.items())
+        ]
+
+    def report(self, group_by: str = "function", since: Optional[float] = None) -> List[Dict]:
+        """Roll usage up by function, model, user or deal, most expensive first."""
+        if group_by not in GROUP_BY_COLUMNS:
+            raise ValueError(f"group_by must be one of {GROUP_BY_COLUMNS}")
+        # Calls made before a deal is saved are grouped under their analysis run
+        key = "COALESCE(NULLIF(deal, ''), NULLIF(run_id, ''), '(none)')" if group_by == "deal" else group_by
+        query = (
+            f"SELECT {key} AS grp, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), "
+            f"SUM(total_tokens), SUM(cost_usd) FROM llm_usage"
+        )
+        params = []
+        if since is not None:
+            query += " WHERE ts >= ?"
+            params.append(since)
+        query += " GROUP BY grp ORDER BY SUM(cost_usd) DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {
+                group_by.capitalize(): grp or "(none)",
+                "Calls": calls,
+                "Prompt Tokens": prompt,
+                "Completion Tokens": completion,
+                "Total Tokens": total,
+                "Cost (USD)": round(cost or 0.0, 4)
+            }
+            for grp, calls, prompt, completion, total, cost in rows
+        ]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_usage_store(path: str = DEFAULT_DB_PATH) -> UsageStore:
+    """Process-wide usage store per database file."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = UsageStore(path)
+        return _stores[path]
+
+
+if __name__ == "__main__":
+    store = UsageStore(os.getenv("LLM_USAGE_DB", DEFAULT_DB_PATH))
+    for dimension in GROUP_BY_COLUMNS:
+        print(f"\n== Usage by {dimension} ==")
+        for row in store.report(dimension):
+            print("  " + " | ".join(f"{k}: {v}" for k, v in row.items()))
+    print("\n== Model tier escalations ==")
+    for row in store.escalation_report():
+        print("  " + " | ".join(f"{k}: {v}" for k, v in row.items()))
@@ -0,0 +1,123 @@
+"""
+Deterministic local extraction of emails, phone numbers, websites and US
+street addresses.
+
+Runs over the full document text in milliseconds with precompiled patterns.
+The results are passed to the LLM prompts as hints, or used directly when
+they are unambiguous so the LLM call can be skipped.
+"""
+
+import re
+from typing import Dict, List
+
+from address_parser import STATE_CODES, STREET_SUFFIXES
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+
+PHONE_RE = re.compile(
+    r"(?<![\d-])(?:\+?1[\s.-]?)?\(?([2-9]\d{2})\)?[\s.-]?(\d{3})[\s.-]?(\d{4})(?![\d-])"
+    r"(?:\s*(?:x|ext\.?)\s*(\d{1,5}))?",
+    re.IGNORECASE
+)
+FAX_LABEL_RE = re.compile(r"\bfax\b[\s:.]*$", re.IGNORECASE)
+
+WEBSITE_RE = re.compile(
+    r"\b(?:https?://)?(?:www\.)?[a-z0-9][a-z0-9-]*(?:\.[a-z0-9-]+)*"
+    r"\.(?:com|net|org|io|co|us|biz|info|realty|properties|re|law)\b(?:/[^\s,;)\]]*)?",
+    re.IGNORECASE
+)
+
+_SUFFIX_PATTERN = "|".join(sorted(STREET_SUFFIXES, key=len, reverse=True))
+_STATE_PATTERN = "|".join(sorted(STATE_CODES))
+
+ADDRESS_RE = re.compile(
+    # Street number, optionally a range such as 15031-15139
+    r"\b(?P<number>\d{1,6}(?:\s?-\s?\d{1,6})?[A-Z]?)[ \t]+"
+    # Street name ending in a suffix, with optional directional
+    r"(?P<street>(?:[NSEW]\.?[ \t]+)?(?:[A-Za-z0-9.'-]+[ \t]+){0,4}?(?:" + _SUFFIX_PATTERN + r")\.?"
+    r"(?:[ \t]+(?:[NSEW]{1,2})\.?)?)"
+    # Optional unit designator
+    r"(?P<unit>,?[ \t]*(?:Suite|Ste\.?|Unit|Apt\.?|#)[ \t]*[\w-]+)?"
+    # Comma or line break before the city
+    r"[ \t]*[,\n][ \t]*"
+    r"(?P<city>[A-Za-z][A-Za-z.' -]{1,40}?),?[ \t]+"
+    r"(?P<state>(?-i:" + _STATE_PATTERN + r"))\.?[ \t]+"
+    r"(?P<zip>\d{5}(?:-\d{4})?)\b",
+    re.IGNORECASE
+)
+
+
+def format_phone(area: str, exchange: str, line: str, extension: str = None) -> str:
+    phone = f"({area}) {exchange}-{line}"
+    return f"{phone} x{extension}" if extension else phone
+
+
+def _unique(values: List[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for value in values:
+        key = value.lower()
+        if key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def find_emails(text: str) -> List[str]:
+    return _unique(EMAIL_RE.findall(text))
+
+
+def find_phones(text: str, include_fax: bool = False) -> List[str]:
+    phones = []
+    for match in PHONE_RE.finditer(text):
+        if not include_fax and FAX_LABEL_RE.search(text[max(0, match.start() - 12):match.start()]):
+            continue
+        phones.append(format_phone(*match.groups()))
+    return _unique(phones)
+
+
+def find_websites(text: str) -> List[str]:
+    # Blank out emails so their domains are not reported as websites
+    text = EMAIL_RE.sub(lambda m: " " * len(m.group(0)), text)
+    return _unique(m.group(0).rstrip(".") for m in WEBSITE_RE.finditer(text))
+
+
+def find_addresses(text: str) -> List[str]:
+    addresses = []
+    for match in ADDRESS_RE.finditer(text):
+        number = re.sub(r"\s*-\s*", "-", match.group("number"))
+        street = " ".join(match.group("street").split())
+        unit = match.group("unit")
+        if unit:
+            street += " " + " ".join(unit.strip(" ,").split())
+        city = " ".join(match.group("city").split())
+        addresses.append(f"{number} {street}, {city}, {match.group('state')} {match.group('zip')}")
+    return _unique(addresses)
+
+
+def extract_local_details(text: str) -> Dict[str, List[str]]:
+    """Extract every email, phone number, website and street address in the text."""
+    if not text:
+        return {"emails": [], "phones": [], "websites": [], "addresses": []}
+    return {
+        "emails": find_emails(text),
+        "phones": find_phones(text),
+        "websites": find_websites(text),
+        "addresses": find_addresses(text)
+    }
+
+
+def has_contact_details(details: Dict[str, List[str]]) -> bool:
+    return bool(details.get("emails") or details.get("phones"))
+
+
+def format_hints(details: Dict[str, List[str]], keys=("emails", "phones", "websites", "addresses")) -> str:
+    """Format local extraction results as a hint block for an LLM prompt."""
+    labels = {"emails": "Emails", "phones": "Phones", "websites": "Websites", "addresses": "Addresses"}
+    lines = [f"- {labels[key]}: {'; '.join(details[key])}" for key in keys if details.get(key)]
+    if not lines:
+        return ""
+    return (
+        "The following details were found in the text. Prefer these exact values "
+        "and attribute them to the right people:\n" + "\n".join(lines) + "\n\n"
+    )
@@ -0,0 +1,127 @@
+"""
+One-time OAuth `state` values with expiry.
+
+The Google redirect lands in a new Streamlit session, so pending states are
+kept process-wide rather than in st.session_state. A state is issued when the
+sign-in link is built and consumed exactly once by the callback. Use the
+in-memory store for a single replica, or the SQLite store when several
+replicas share a volume.
+"""
+
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_TTL = 600  # Google sign-in rarely takes more than a few minutes
+
+
+class MemoryStateStore:
+    """In-process state store. Every state has the same TTL, so insertion order is expiry order."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> None:
+        while self._states:
+            state, expires = next(iter(self._states.items()))
+            if expires > now:
+                break
+            del self._states[state]
+
+    def issue(self) -> str:
+        state = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._states[state] = now + self.ttl
+        return state
+
+    def is_pending(self, state: Optional[str]) -> bool:
+        with self._lock:
+            expires = self._states.get(state)
+        return expires is not None and expires > time.time()
+
+    def consume(self, state: Optional[str]) -> bool:
+        """Remove the state and return True if it was issued here and has not expired."""
+        now = time.time()
+        with self._lock:
+            expires = self._states.pop(state, None)
+            self._sweep(now)
+        return expires is not None and expires > now
+
+    def discard(self, state: Optional[str]) -> None:
+        with self._lock:
+            self._states.pop(state, None)
+
+
+class SQLiteStateStore:
+    """State store in a SQLite file shared by several app replicas."""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS oauth_states (
+                state TEXT PRIMARY KEY,
+                expires REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_oauth_states_expires ON oauth_states (expires);
+            """
+        )
+        self._conn.commit()
+
+    def issue(self) -> str:
+        state = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM oauth_states WHERE expires <= ?", (now,))
+            self._conn.execute("INSERT INTO oauth_states (state, expires) VALUES (?, ?)", (state, now + self.ttl))
+            self._conn.commit()
+        return state
+
+    def is_pending(self, state: Optional[str]) -> bool:
+        if not state:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM oauth_states WHERE state = ? AND expires > ?", (state, time.time())
+            ).fetchone()
+        return row is not None
+
+    def consume(self, state: Optional[str]) -> bool:
+        if not state:
+            return False
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM oauth_states WHERE state = ? AND expires > ?", (state, time.time())
+            )
+            self._conn.commit()
+        return cur.rowcount == 1
+
+    def discard(self, state: Optional[str]) -> None:
+        if not state:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM oauth_states WHERE state = ?", (state,))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store(db_path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+    """Process-wide state store; SQLite-backed when a database path is configured."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStateStore(db_path, ttl) if db_path else MemoryStateStore(ttl)
+        return _store
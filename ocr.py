@@ -0,0 +1,173 @@
+"""
+Local OCR for scanned PDF pages and image uploads.
+
+Only pages without a usable text layer are OCR'd. Each one is rendered
+through fitz at a DPI chosen from its page size and handed to the Tesseract
+CLI; Tesseract runs as its own process, so a small thread pool keeps several
+pages from several files in flight at once. Results are cached by a hash of
+the rendered page, so re-analyzing the same documents costs nothing.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import fitz
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "dealflow_ocr_cache.sqlite3")
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "tif", "tiff"}
+# Pages with less extractable text than this are treated as scanned
+MIN_TEXT_CHARS = 25
+# Render so the longest side is about this many pixels (300 DPI on letter paper),
+# within these DPI bounds
+TARGET_PIXELS = 3300
+MIN_DPI = 150
+MAX_DPI = 400
+OCR_TIMEOUT = 120
+
+
+def tesseract_available() -> bool:
+    return shutil.which("tesseract") is not None
+
+
+def adaptive_dpi(page: "fitz.Page") -> int:
+    """Higher DPI for small pages and lower for oversized ones, so text size in pixels stays similar."""
+    longest_inches = max(page.rect.width, page.rect.height) / 72 or 11
+    return int(max(MIN_DPI, min(MAX_DPI, TARGET_PIXELS / longest_inches)))
+
+
+def _run_tesseract(image: bytes, lang: str) -> str:
+    result = subprocess.run(
+        ["tesseract", "stdin", "stdout", "-l", lang, "--psm", "3"],
+        input=image,
+        capture_output=True,
+        timeout=OCR_TIMEOUT,
+        # One thread per process; parallelism comes from running several processes
+        env={**os.environ, "OMP_THREAD_LIMIT": "1"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or "tesseract failed")
+    return result.stdout.decode("utf-8", errors="replace").strip()
+
+
+class OCRCache:
+    """SQLite cache of OCR text keyed by page hash."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    found[key] = row[0]
+        return found
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, created) VALUES (?, ?, ?)", (key, text, time.time())
+            )
+            self._conn.commit()
+
+
+class OCREngine:
+    """Text extraction for PDFs and images with OCR of pages that have no text layer."""
+
+    def __init__(self, workers: int = None, lang: str = "eng", cache_path: str = DEFAULT_DB_PATH):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.lang = lang
+        self.cache = OCRCache(cache_path)
+        self.available = tesseract_available()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+
+    def _key(self, data) -> str:
+        digest = hashlib.sha256(data)  # Hashes buffers (mmap, pixmap samples) without copying them
+        digest.update(b"|" + self.lang.encode())
+        return digest.hexdigest()
+
+    def ocr_images(self, images: Dict[str, bytes]) -> Dict[str, str]:
+        """OCR images keyed by page hash; cached keys are not re-run. Failed pages map to ''."""
+        results = self.cache.get_many(list(images))
+        pending = {key: self._pool.submit(_run_tesseract, image, self.lang) for key, image in images.items() if key not in results}
+        for key, future in pending.items():
+            try:
+                text = future.result()
+            except Exception:
+                results[key] = ""
+                continue
+            self.cache.put(key, text)
+            results[key] = text
+        return results
+
+    def extract_documents(self, documents: Sequence[Tuple[str, Union[bytes, str]]], ocr: bool = True) -> List[str]:
+        """
+        Text of each (filename, data) document, where data is a bytes-like
+        object or a path to the file. With ocr on, scanned pages of every
+        document are OCR'd together in one batch.
+        """
+        ocr = ocr and self.available
+        # Per document, a list of page texts or page-hash placeholders to fill from OCR
+        pages: List[List[Tuple[Optional[str], str]]] = []
+        images: Dict[str, bytes] = {}
+
+        for filename, data in documents:
+            ext = filename.lower().rsplit(".", 1)[-1]
+            doc_pages = []
+            if ext in IMAGE_EXTENSIONS:
+                if ocr:
+                    if isinstance(data, str):
+                        with open(data, "rb") as f:
+                            data = f.read()
+                    key = self._key(data)
+                    images[key] = data
+                    doc_pages.append((key, ""))
+            else:
+                # A path lets MuPDF read pages from disk instead of holding the whole file
+                source = fitz.open(data, filetype="pdf") if isinstance(data, str) else fitz.open(stream=data, filetype="pdf")
+                with source as doc:
+                    for page in doc:
+                        text = page.get_text()
+                        if not ocr or len(text.strip()) >= MIN_TEXT_CHARS:
+                            doc_pages.append((None, text))
+                            continue
+                        pix = page.get_pixmap(dpi=adaptive_dpi(page), colorspace=fitz.csGRAY)
+                        key = self._key(pix.samples)
+                        if key not in images:
+                            images[key] = pix.tobytes("png")
+                        doc_pages.append((key, text))
+            pages.append(doc_pages)
+
+        ocr_text = self.ocr_images(images) if images else {}
+        return [
+            "\n".join(ocr_text.get(key) or text if key else text for key, text in doc_pages)
+            for doc_pages in pages
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(workers: int = None, lang: str = "eng", cache_path: str = DEFAULT_DB_PATH) -> OCREngine:
+    """Process-wide OCR engine, so the worker pool and cache are shared by all sessions."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OCREngine(workers, lang, cache_path)
+        return _engine
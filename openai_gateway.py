@@ -0,0 +1,236 @@
+"""
+Process-wide gateway for OpenAI chat completions.
+
+Every session's calls go through one gateway that keeps a rolling one-minute
+window of requests and tokens against the account's RPM/TPM limits. Calls
+wait their turn instead of bursting into 429s. There are two lanes:
+interactive calls (someone is watching a spinner) go ahead of batch calls,
+and batch work may only use part of each budget. Rate-limit and transient
+errors are retried with backoff. A Retry-After header pauses the whole
+gateway, since the limit it reports is shared by every caller.
+
+`create` serves threads; `acreate` is the same gateway for coroutines on an
+AsyncOpenAI client, sharing one set of budgets.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+import openai
+
+from prompt_budget import count_tokens
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+WINDOW_SECONDS = 60.0
+# Completion tokens assumed for budgeting when a call sets no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 500
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(kwargs: Dict) -> int:
+    """Prompt plus expected completion tokens for a chat.completions.create call."""
+    model = kwargs.get("model", "")
+    prompt = sum(count_tokens(str(m.get("content") or ""), model) + 4 for m in kwargs.get("messages", []))
+    return prompt + (kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or DEFAULT_COMPLETION_ESTIMATE)
+
+
+def retry_after_seconds(error: Exception):
+    """Delay requested by the server through retry-after-ms or Retry-After, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form; fall back to backoff
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+class OpenAIGateway:
+    """RPM/TPM-budgeted, lane-prioritized, retrying wrapper around chat.completions.create."""
+
+    def __init__(
+        self,
+        client,
+        async_client=None,
+        rpm: int = 500,
+        tpm: int = 200000,
+        batch_share: float = 0.5,
+        max_retries: int = 5,
+        max_backoff: float = 30.0
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.rpm = rpm
+        self.tpm = tpm
+        self.batch_share = batch_share
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._window: Deque[list] = deque()  # [start time, tokens] per call in the last minute
+        self._tokens_in_window = 0
+        self._paused_until = 0.0
+        self._waiting = {INTERACTIVE: 0, BATCH: 0}
+        self._cond = threading.Condition()
+
+    def _prune(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._tokens_in_window -= self._window.popleft()[1]
+
+    def _admit_delay(self, tokens: int, lane: str, now: float) -> float:
+        """Seconds to wait before this call fits; 0 if it can go now."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if lane == BATCH and self._waiting[INTERACTIVE]:
+            return 1.0  # Re-checked as soon as an interactive call is admitted
+        share = self.batch_share if lane == BATCH else 1.0
+        rpm_limit = max(1, int(self.rpm * share))
+        tpm_limit = max(1, int(self.tpm * share))
+        # A single call larger than the whole budget still goes once the window is empty
+        tokens = min(tokens, tpm_limit)
+        if len(self._window) < rpm_limit and self._tokens_in_window + tokens <= tpm_limit:
+            return 0.0
+        return max(0.05, self._window[0][0] + WINDOW_SECONDS - now) if self._window else 0.0
+
+    def _try_admit(self, tokens: int, lane: str):
+        """(window entry, 0) if the call was admitted, else (None, seconds to wait). Caller holds the lock."""
+        now = time.monotonic()
+        self._prune(now)
+        delay = self._admit_delay(tokens, lane, now)
+        if delay > 0:
+            return None, delay
+        entry = [now, tokens]
+        self._window.append(entry)
+        self._tokens_in_window += tokens
+        return entry, 0.0
+
+    def _acquire(self, tokens: int, lane: str) -> list:
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    entry, delay = self._try_admit(tokens, lane)
+                    if entry is not None:
+                        return entry
+                    self._cond.wait(timeout=delay)
+            finally:
+                self._waiting[lane] -= 1
+                self._cond.notify_all()
+
+    async def _acquire_async(self, tokens: int, lane: str) -> list:
+        with self._cond:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                with self._cond:
+                    entry, delay = self._try_admit(tokens, lane)
+                if entry is not None:
+                    return entry
+                # Thread waiters are woken by notify; coroutines re-check at least once a second
+                await asyncio.sleep(min(delay, 1.0))
+        finally:
+            with self._cond:
+                self._waiting[lane] -= 1
+                self._cond.notify_all()
+
+    def _settle(self, entry: list, actual_tokens: int) -> None:
+        """Replace a call's estimate with the tokens it actually used."""
+        with self._cond:
+            if any(e is entry for e in self._window):
+                self._tokens_in_window += actual_tokens - entry[1]
+            entry[1] = actual_tokens
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, error: Exception, attempt: int):
+        """Seconds to sleep before retrying, or None if the error should be raised."""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return None
+        delay = retry_after_seconds(error)
+        if delay is not None:
+            # Everyone waits out the server's delay; the next admission check enforces it
+            self._pause(delay)
+            return 0.0
+        return min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def _record(self, entry: list, res) -> None:
+        usage = getattr(res, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self._settle(entry, usage.total_tokens)
+
+    def create(self, lane: str = INTERACTIVE, **kwargs):
+        """chat.completions.create with budgeting and retries. Streams are retried only until they start."""
+        estimate = estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            entry = self._acquire(estimate, lane)
+            try:
+                res = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._record(entry, res)
+            return res
+
+    async def acreate(self, lane: str = INTERACTIVE, **kwargs):
+        """Async create on the AsyncOpenAI client, under the same budgets as create."""
+        if self.async_client is None:
+            raise RuntimeError("OpenAIGateway was created without an async client")
+        estimate = estimate_tokens(kwargs)
+        attempt = 0
+        while True:
+            entry = await self._acquire_async(estimate, lane)
+            try:
+                res = await self.async_client.chat.completions.create(**kwargs)
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record(entry, res)
+            return res
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            self._prune(time.monotonic())
+            return {
+                "requests_last_minute": len(self._window),
+                "tokens_last_minute": self._tokens_in_window,
+                "waiting_interactive": self._waiting[INTERACTIVE],
+                "waiting_batch": self._waiting[BATCH],
+                "paused_seconds": max(0.0, self._paused_until - time.monotonic())
+            }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway(client, async_client=None, **kwargs) -> OpenAIGateway:
+    """Process-wide gateway; the clients and limits of the first caller are kept."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = OpenAIGateway(client, async_client, **kwargs)
+        return _gateway
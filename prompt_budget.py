@@ -0,0 +1,150 @@
+"""
+Token-aware prompt assembly.
+
+Prompts are built from fixed instructions plus one variable block of document
+text. Instead of cutting that text at an arbitrary character count, it is
+counted with the model's tokenizer (tiktoken when installed, otherwise a
+conservative characters-per-token estimate). Each prompt kind has a default
+text budget close to the old character cuts, since every extra token is paid
+for; filling the rest of the model's context window is opt-in (a limit of 0).
+Every fitted prompt reports whether, and how much, text was dropped.
+"""
+
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence, Union
+
+try:
+    import tiktoken
+except ImportError:  # Optional; fall back to the character estimate
+    tiktoken = None
+
+# Context window per model family, matched on the longest model prefix
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-3.5-turbo-instruct": 4096,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+# Role markers and reply priming added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 8
+# Without tiktoken, assume this many characters per token (low, so estimates run high)
+CHARS_PER_TOKEN = 3
+# No token is longer than this many characters in practice; used to pre-cut huge texts
+MAX_CHARS_PER_TOKEN = 10
+
+Models = Union[str, Sequence[str]]
+
+
+class FittedPrompt(NamedTuple):
+    prompt: str
+    prompt_tokens: int  # Estimated input tokens for the whole prompt
+    budget_tokens: int  # Input tokens available for this model and reserve
+    truncated: bool
+    kept_chars: int  # Characters of the variable text that made it in
+    total_chars: int
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Longest prefix of text that fits in max_tokens."""
+    if max_tokens <= 0:
+        return ""
+    # At most one character per token; short texts need no counting at all
+    if len(text) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    # Only encode as much as could possibly fit
+    head = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    tokens = encoding.encode(head, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return head
+    return encoding.decode(tokens[:max_tokens])
+
+
+class PromptBudgeter:
+    """Fits variable text into prompts by per-model token budgets."""
+
+    def __init__(
+        self,
+        max_input_tokens: Optional[int] = None,
+        context_tokens: Dict[str, int] = None,
+        text_tokens: Dict[str, int] = None
+    ):
+        self.max_input_tokens = max_input_tokens or None
+        self.context_tokens = {**MODEL_CONTEXT_TOKENS, **(context_tokens or {})}
+        # Per-prompt overrides of the text budget; 0 lets that prompt use the whole context window
+        self.text_tokens = dict(text_tokens or {})
+
+    def text_limit(self, name: str, default: int) -> Optional[int]:
+        """Text tokens allowed for the named prompt, or None for no cap beyond the context window."""
+        limit = self.text_tokens.get(name, default)
+        return limit if limit and limit > 0 else None
+
+    def context_window(self, model: str) -> int:
+        model = (model or "").lower()
+        for prefix in sorted(self.context_tokens, key=len, reverse=True):
+            if model.startswith(prefix):
+                return self.context_tokens[prefix]
+        return DEFAULT_CONTEXT_TOKENS
+
+    def input_budget(self, models: Models, reserve_output: int) -> int:
+        """Input tokens allowed for every one of the given models, after the reply reserve."""
+        if isinstance(models, str):
+            models = [models]
+        budget = min(self.context_window(m) for m in models) - reserve_output - MESSAGE_OVERHEAD_TOKENS
+        if self.max_input_tokens:
+            budget = min(budget, self.max_input_tokens)
+        return max(budget, 0)
+
+    def fit(
+        self,
+        models: Models,
+        before: str,
+        text: str,
+        after: str = "",
+        reserve_output: int = 1000,
+        max_text_tokens: Optional[int] = None
+    ) -> FittedPrompt:
+        """
+        Build before + text + after, trimming the end of text so the prompt fits
+        the tightest budget of the given models (one prompt may be sent to several).
+        """
+        model = models if isinstance(models, str) else models[0]
+        budget = self.input_budget(models, reserve_output)
+        fixed_tokens = count_tokens(before, model) + count_tokens(after, model)
+        room = budget - fixed_tokens
+        if max_text_tokens is not None and max_text_tokens < room:
+            room = max_text_tokens
+            budget = fixed_tokens + room
+        kept = truncate_to_tokens(text, room, model)
+        return FittedPrompt(
+            prompt=before + kept + after,
+            prompt_tokens=fixed_tokens + count_tokens(kept, model),
+            budget_tokens=budget,
+            truncated=len(kept) < len(text),
+            kept_chars=len(kept),
+            total_chars=len(text)
+        )
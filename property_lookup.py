@@ -0,0 +1,418 @@
+"""
+Property enrichment through the Smarty Property Data API (Principal Edition).
+
+Holds the Smarty lookup and the public-records formatters without any
+Streamlit dependency, so the same code serves the single-address UI, bulk
+lookups on worker threads and the API backend.
+"""
+
+import csv
+import io
+import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from address_parser import parse_address
+
+SMARTY_PRINCIPAL_URL = "https://us-enrichment.api.smarty.com/lookup/search/property/principal"
+_URL_QUERY_RE = re.compile(r"(https?://[^\s?#'\"]+)[?#][^\s'\"]*")
+
+# Column names recognized as the address column of an uploaded CSV
+ADDRESS_COLUMN_NAMES = ("address", "property address", "location", "full address", "street address")
+
+
+def generate_maps_link(address: str) -> str:
+    """Generate a Google Maps link from an address."""
+    if not address:
+        return ""
+    
+    # Remove extra whitespace and normalize
+    cleaned_address = ' '.join(address.split())
+    
+    # URL encode the address properly
+    encoded_address = urllib.parse.quote(cleaned_address)
+    
+    return f"https://www.google.com/maps/search/?api=1&query={encoded_address}"
+
+# --- Typed property record ---
+
+# (slot, Smarty attribute, label, section, kind) for every public-records field we render.
+# Sections and order match the text stored on deals.
+FIELD_SPECS = (
+    ("acres", "acres", "Acres", "physical", "number"),
+    ("building_sqft", "building_sqft", "Building Sqft", "physical", "number"),
+    ("stories_number", "stories_number", "Stories Number", "physical", "text"),
+    ("year_built", "year_built", "Year Built", "physical", "text"),
+
+    ("parcel_account_number", "parcel_account_number", "Parcel Account Number", "parcel_tax", "text"),
+    ("parcel_raw_number", "parcel_raw_number", "Parcel Raw Number", "parcel_tax", "text"),
+    ("parcel_number_previous", "parcel_number_previous", "Parcel Number Previous", "parcel_tax", "text"),
+    ("parcel_number_year_added", "parcel_number_year_added", "Parcel Number Year Added", "parcel_tax", "text"),
+    ("parcel_number_year_change", "parcel_number_year_change", "Parcel Number Year Change", "parcel_tax", "text"),
+    ("previous_assessed_value", "previous_assessed_value", "Previous Assessed Value", "parcel_tax", "currency"),
+    ("total_market_value", "total_market_value", "Total Market Value", "parcel_tax", "currency"),
+    ("tax_billed_amount", "tax_billed_amount", "Tax Billed Amount", "parcel_tax", "currency"),
+    ("tax_assess_year", "tax_assess_year", "Tax Assess Year", "parcel_tax", "text"),
+    ("tax_fiscal_year", "tax_fiscal_year", "Tax Fiscal Year", "parcel_tax", "text"),
+    ("tax_jurisdiction", "tax_jurisdiction", "Tax Jurisdiction", "parcel_tax", "text"),
+    ("zoning", "zoning", "Zoning", "parcel_tax", "text"),
+    ("land_use_standard", "land_use_standard", "Land Use", "parcel_tax", "text"),
+
+    ("owner_full_name", "owner_full_name", "Owner Full Name", "ownership_sale", "text"),
+    ("owner_occupancy_status", "owner_occupancy_status", "Owner Occupancy Status", "ownership_sale", "text"),
+    ("deed_owner_full_name", "deed_owner_full_name", "Deed Owner Full Name", "ownership_sale", "text"),
+    ("deed_owner_last_name", "deed_owner_last_name", "Deed Owner Last Name", "ownership_sale", "text"),
+    ("deed_sale_date", "deed_sale_date", "Deed Sale Date", "ownership_sale", "date"),
+    ("deed_sale_price", "deed_sale_price", "Deed Sale Price", "ownership_sale", "currency"),
+    ("deed_transaction_id", "deed_transaction_id", "Deed Transaction ID", "ownership_sale", "text"),
+    ("ownership_transfer_date", "ownership_transfer_date", "Ownership Transfer Date", "ownership_sale", "date"),
+    ("prior_sale_date", "prior_sale_date", "Prior Sale Date", "ownership_sale", "date"),
+    ("sale_date", "sale_date", "Sale Date", "ownership_sale", "date"),
+
+    ("mortgage_amount", "mortgage_amount", "Mortgage Amount", "mortgage_lender", "currency"),
+    ("mortgage_recording_date", "mortgage_recording_date", "Mortgage Recording Date", "mortgage_lender", "date"),
+    ("mortgage_type", "mortgage_type", "Mortgage Type", "mortgage_lender", "text"),
+    ("mortgage_interest_type", "mortgage_interest_type", "Mortgage Interest Type", "mortgage_lender", "text"),
+    ("interest_rate", "interest_rate", "Interest Rate", "mortgage_lender", "percent"),
+    ("lender_name", "lender_name", "Lender Name", "mortgage_lender", "text"),
+    ("lender_last_name", "lender_last_name", "Lender Last Name", "mortgage_lender", "text"),
+    ("lender_code_2", "lender_code_2", "Lender Code 2", "mortgage_lender", "text"),
+    ("lender_address", "lender_address", "Lender Address", "mortgage_lender", "text"),
+    ("lender_city", "lender_city", "Lender City", "mortgage_lender", "text"),
+    ("lender_state", "lender_state", "Lender State", "mortgage_lender", "text"),
+    ("lender_zip", "lender_zip", "Lender Zip", "mortgage_lender", "text"),
+)
+
+
+def _decode_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _decode_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _render_number(value):
+    return f"{value:,.2f}" if isinstance(value, float) else value
+
+
+def _render_currency(value):
+    return f"${value:,.2f}" if isinstance(value, float) else value
+
+
+def _render_percent(value):
+    return f"{value:.2f}%" if isinstance(value, float) else value
+
+
+def _render_date(value):
+    return value.strftime('%B %d, %Y') if not isinstance(value, str) else value
+
+
+_DECODERS = {"number": _decode_number, "currency": _decode_number, "percent": _decode_number, "date": _decode_date, "text": str}
+_RENDERERS = {"number": _render_number, "currency": _render_currency, "percent": _render_percent, "date": _render_date, "text": str}
+
+# Precompiled per-section render plans: (slot, label, renderer)
+_SECTIONS = {}
+for _slot, _key, _label, _section, _kind in FIELD_SPECS:
+    _SECTIONS.setdefault(_section, []).append((_slot, _label, _RENDERERS[_kind]))
+_DECODE_PLAN = tuple((slot, key, _DECODERS[kind], kind == "text") for slot, key, _, _, kind in FIELD_SPECS)
+
+
+class PropertyRecord:
+    """The public-records fields of one Smarty match, decoded once into typed values (None when absent)."""
+
+    __slots__ = tuple(spec[0] for spec in FIELD_SPECS)
+
+    @classmethod
+    def from_smarty(cls, result: Optional[Dict]) -> Optional["PropertyRecord"]:
+        if not result:
+            return None
+        attrs = result.get('attributes') or {}
+        record = cls.__new__(cls)
+        for slot, key, decode, is_text in _DECODE_PLAN:
+            value = attrs.get(key)
+            # As before: formatted fields are left out when falsy, text fields only when missing
+            absent = value is None if is_text else not value
+            setattr(record, slot, None if absent else decode(value))
+        return record
+
+    def render_section(self, section: str) -> str:
+        lines = []
+        for slot, label, render in _SECTIONS[section]:
+            value = getattr(self, slot)
+            if value is not None:
+                lines.append(f"• {label}: {render(value)}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def as_record(result) -> Optional[PropertyRecord]:
+    """Accept either a PropertyRecord or a raw Smarty result."""
+    if result is None or isinstance(result, PropertyRecord):
+        return result
+    return PropertyRecord.from_smarty(result)
+
+
+def redact_urls(text: str) -> str:
+    """Drop query strings from any URLs in text; Smarty request URLs carry the auth-id and auth-token."""
+    return _URL_QUERY_RE.sub(r"\1", text)
+
+
+def lookup_error_status(error: Exception) -> str:
+    """A failed lookup described without its message, which may quote the request URL."""
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return f"HTTP {status_code}" if status_code else type(error).__name__
+
+
+def lookup_property(
+    address: str,
+    auth_id: str,
+    auth_token: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = 15,
+    keep_raw: bool = False
+) -> Dict:
+    """
+    Look up an address with Smarty and return its formatted address and a PropertyRecord.
+    The raw Smarty JSON is only kept (as raw_data) when keep_raw is set.
+    If Smarty finds no match, the original address is returned with no property data.
+    Raises requests.exceptions.RequestException on HTTP errors.
+    """
+    street, city, state, zipcode = parse_address(address)
+    params = {
+        "auth-id": auth_id,
+        "auth-token": auth_token,
+        "street": street,
+        "city": city,
+        "state": state,
+        "zipcode": zipcode
+    }
+    response = (session or requests).get(SMARTY_PRINCIPAL_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    
+    if data and len(data) > 0:
+        result = data[0]
+        matched = result['matched_address']
+        address_data = {
+            "formatted_address": f"{matched['street']}, {matched['city']}, {matched['state']} {matched['zipcode']}",
+            "property_type": result.get('attributes', {}).get('land_use_standard', ''),
+            "record": PropertyRecord.from_smarty(result)
+        }
+        if keep_raw:
+            address_data["raw_data"] = result
+        return address_data
+    # If Smarty doesn't find a match, return the original address for Google Maps
+    return {
+        "formatted_address": address,
+        "property_type": "",
+        "record": None
+    }
+
+def format_physical_property(result):
+    """Format physical property information from a PropertyRecord (or raw Smarty result)."""
+    record = as_record(result)
+    return record.render_section("physical") if record else ""
+
+def format_parcel_tax_info(result):
+    """Format parcel and tax information from a PropertyRecord (or raw Smarty result)."""
+    record = as_record(result)
+    return record.render_section("parcel_tax") if record else ""
+
+def format_ownership_sale_info(result):
+    """Format ownership and sale information from a PropertyRecord (or raw Smarty result)."""
+    record = as_record(result)
+    return record.render_section("ownership_sale") if record else ""
+
+def format_mortgage_lender_info(result):
+    """Format mortgage and lender information from a PropertyRecord (or raw Smarty result)."""
+    record = as_record(result)
+    return record.render_section("mortgage_lender") if record else ""
+
+def format_public_records(result) -> str:
+    """Combine the four public-records sections into the text stored on a deal."""
+    record = as_record(result)
+    return (
+        f"𝗣𝗵𝘆𝘀𝗶𝗰𝗮𝗹 𝗣𝗿𝗼𝗽𝗲𝗿𝘁𝘆: \n{format_physical_property(record)}\n\n"
+        f"𝗢𝘄𝗻𝗲𝗿𝘀𝗵𝗶𝗽 & 𝗦𝗮𝗹𝗲: \n{format_ownership_sale_info(record)}\n\n"
+        f"𝗣𝗮𝗿𝗰𝗲𝗹 & 𝗧𝗮𝘅: \n{format_parcel_tax_info(record)}\n\n"
+        f"𝗠𝗼𝗿𝘁𝗴𝗮𝗴𝗲 & 𝗟𝗲𝗻𝗱𝗲𝗿: \n{format_mortgage_lender_info(record)}"
+    )
+
+def property_to_json(address: str, address_data: Dict, include_raw: bool = False) -> Dict:
+    """Shape a lookup result as a JSON-friendly dict for API clients."""
+    result = address_data.get("record")
+    formatted_address = address_data.get("formatted_address", address)
+    payload = {
+        "input_address": address,
+        "formatted_address": formatted_address,
+        "matched": bool(result),
+        "property_type": address_data.get("property_type", ""),
+        "map": generate_maps_link(formatted_address),
+        "public_records": {
+            "physical_property": format_physical_property(result),
+            "parcel_tax": format_parcel_tax_info(result),
+            "ownership_sale": format_ownership_sale_info(result),
+            "mortgage_lender": format_mortgage_lender_info(result)
+        }
+    }
+    if include_raw:
+        payload["raw_data"] = address_data.get("raw_data")
+    return payload
+
+class TTLCache:
+    """Small thread-safe in-memory cache with per-entry expiry."""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                # Drop expired entries first, then the oldest insertions
+                now = time.monotonic()
+                for k in [k for k, (expires, _) in self._data.items() if expires < now]:
+                    del self._data[k]
+                while len(self._data) >= self.max_entries:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+# --- Bulk lookups ---
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `rate` per second."""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def read_address_list(text: str) -> List[str]:
+    """One address per line; blank lines and duplicates are dropped."""
+    addresses = []
+    seen = set()
+    for line in (text or "").splitlines():
+        address = " ".join(line.split()).strip('"')
+        if address and address.lower() not in seen:
+            seen.add(address.lower())
+            addresses.append(address)
+    return addresses
+
+def read_address_csv(data: str) -> List[str]:
+    """
+    Read addresses from CSV text. Uses a column named like 'Address' if there is
+    a header, otherwise joins the cells of each row (e.g. street, city, state, zip).
+    """
+    rows = [row for row in csv.reader(io.StringIO(data)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    for name in ADDRESS_COLUMN_NAMES:
+        if name in header:
+            column = header.index(name)
+            return read_address_list("\n".join(row[column] for row in rows[1:] if len(row) > column))
+    return read_address_list("\n".join(", ".join(cell.strip() for cell in row if cell.strip()) for row in rows))
+
+def enrich_address(address: str, auth_id: str, auth_token: str, session: Optional[requests.Session] = None) -> Dict:
+    """Look up one address and return a flat row of formatted public records."""
+    row = {
+        "Input Address": address,
+        "Formatted Address": "",
+        "Property Type": "",
+        "Map": "",
+        "Physical Property": "",
+        "Parcel & Tax": "",
+        "Ownership & Sale": "",
+        "Mortgage & Lender": "",
+        "Status": ""
+    }
+    try:
+        address_data = lookup_property(address, auth_id, auth_token, session=session)
+    except Exception as e:
+        row["Status"] = f"Error: {lookup_error_status(e)}"
+        return row
+    
+    result = address_data.get("record")
+    row.update({
+        "Formatted Address": address_data.get("formatted_address", address),
+        "Property Type": address_data.get("property_type", ""),
+        "Map": generate_maps_link(address_data.get("formatted_address", address)),
+        "Physical Property": format_physical_property(result),
+        "Parcel & Tax": format_parcel_tax_info(result),
+        "Ownership & Sale": format_ownership_sale_info(result),
+        "Mortgage & Lender": format_mortgage_lender_info(result),
+        "Status": "Matched" if result else "No match"
+    })
+    return row
+
+def bulk_lookup(
+    addresses: Iterable[str],
+    auth_id: str,
+    auth_token: str,
+    max_workers: int = 8,
+    rate_per_second: float = 10
+) -> Iterator[Tuple[int, Dict]]:
+    """
+    Enrich many addresses concurrently under a shared rate limit.
+    Yields (index, row) pairs in completion order so results can be shown as they arrive.
+    """
+    addresses = list(addresses)
+    limiter = RateLimiter(rate_per_second)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    
+    def run(address):
+        limiter.wait()
+        return enrich_address(address, auth_id, auth_token, session=session)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run, address): i for i, address in enumerate(addresses)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def rows_to_csv(rows: List[Dict]) -> str:
+    """Serialize bulk lookup rows as CSV text."""
+    if not rows:
+        return ""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(rows[0].keys()))
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
@@ -0,0 +1,197 @@
+"""
+Per-session storage for large values with a memory budget.
+
+Values such as raw notes, parsed contacts and public-records text are kept
+here, keyed by Streamlit session id, instead of in st.session_state. Each
+session may hold up to `budget_bytes` in memory; anything larger than
+`spill_bytes`, and the largest values once a session goes over budget, are
+pickled, zlib-compressed and written to a local blob file, leaving only a
+small handle in memory. Sessions idle for longer than `idle_seconds` are
+evicted entirely, blobs included. A value may carry an `on_discard` callback
+that releases what it refers to (such as files on disk) when the value is
+replaced, deleted or evicted.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, Iterable, NamedTuple
+
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), "dealflow_session_blobs")
+_MISSING = object()
+
+
+class BlobHandle(NamedTuple):
+    path: str
+    size: int  # Uncompressed pickle size
+
+
+class _Session:
+    __slots__ = ("last_seen", "values", "sizes", "memory_bytes", "cleanups")
+
+    def __init__(self):
+        self.last_seen = time.monotonic()
+        self.values: Dict[str, Any] = {}  # Value, or BlobHandle when spilled
+        self.sizes: Dict[str, int] = {}  # In-memory size of values that are not spilled
+        self.memory_bytes = 0
+        self.cleanups: Dict[str, Callable[[], None]] = {}  # on_discard callbacks by key
+
+
+def _run_cleanup(cleanup) -> None:
+    if cleanup:
+        try:
+            cleanup()
+        except Exception:
+            pass
+
+
+class SessionDataStore:
+    """Process-wide store of per-session values with spill-to-disk and idle eviction."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        budget_bytes: int = 8 * 1024 * 1024,
+        spill_bytes: int = 256 * 1024,
+        idle_seconds: float = 2 * 3600,
+        sweep_interval: float = 60
+    ):
+        # One directory per process; blobs left by an earlier process are unreachable
+        self.root = os.path.join(root, str(os.getpid()))
+        self.budget_bytes = budget_bytes
+        self.spill_bytes = spill_bytes
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        session.last_seen = time.monotonic()
+        return session
+
+    def _spill(self, session_id: str, session: _Session, key: str, data: bytes = None) -> None:
+        value = session.values[key]
+        if data is None:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        directory = os.path.join(self.root, session_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4().hex}.blob")
+        with open(path, "wb") as f:
+            f.write(zlib.compress(data, 3))
+        session.values[key] = BlobHandle(path, len(data))
+        session.memory_bytes -= session.sizes.pop(key, 0)
+
+    def _discard(self, session: _Session, key: str, cleanup: bool = True) -> None:
+        callback = session.cleanups.pop(key, None)
+        if cleanup:
+            _run_cleanup(callback)
+        old = session.values.pop(key, None)
+        if isinstance(old, BlobHandle):
+            try:
+                os.remove(old.path)
+            except OSError:
+                pass
+        session.memory_bytes -= session.sizes.pop(key, 0)
+
+    def set(self, session_id: str, key: str, value: Any, on_discard: Callable[[], None] = None) -> None:
+        """Store a value; on_discard runs when it is replaced, deleted or evicted, but not when taken."""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            session = self._session(session_id)
+            self._discard(session, key)
+            session.values[key] = value
+            if on_discard:
+                session.cleanups[key] = on_discard
+            if len(data) > self.spill_bytes:
+                self._spill(session_id, session, key, data)
+            else:
+                session.sizes[key] = len(data)
+                session.memory_bytes += len(data)
+                # Over budget: spill the largest in-memory values first
+                while session.memory_bytes > self.budget_bytes and session.sizes:
+                    largest = max(session.sizes, key=session.sizes.get)
+                    self._spill(session_id, session, largest)
+        self._maybe_sweep()
+
+    def get(self, session_id: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            session = self._session(session_id)
+            value = session.values.get(key, _MISSING)
+        self._maybe_sweep()
+        if value is _MISSING:
+            return default
+        if isinstance(value, BlobHandle):
+            try:
+                with open(value.path, "rb") as f:
+                    return pickle.loads(zlib.decompress(f.read()))
+            except OSError:
+                return default
+        return value
+
+    def take(self, session_id: str, key: str, default: Any = None) -> Any:
+        """Remove and return a value without running its on_discard; the caller now owns what it refers to."""
+        value = self.get(session_id, key, _MISSING)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session:
+                self._discard(session, key, cleanup=False)
+        return default if value is _MISSING else value
+
+    def delete(self, session_id: str, keys: Iterable[str]) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session:
+                for key in keys:
+                    self._discard(session, key)
+
+    def clear_session(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session:
+            for callback in session.cleanups.values():
+                _run_cleanup(callback)
+        shutil.rmtree(os.path.join(self.root, session_id), ignore_errors=True)
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        with self._lock:
+            idle = [sid for sid, s in self._sessions.items() if now - s.last_seen > self.idle_seconds]
+        for session_id in idle:
+            self.clear_session(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": sum(s.memory_bytes for s in self._sessions.values()),
+                "spilled_values": sum(
+                    1 for s in self._sessions.values() for v in s.values.values() if isinstance(v, BlobHandle)
+                )
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(**kwargs) -> SessionDataStore:
+    """Process-wide session data store, shared by all Streamlit sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionDataStore(**kwargs)
+        return _store
@@ -0,0 +1,250 @@
+"""
+Rent roll and T-12 spreadsheet ingestion.
+
+Workbooks are streamed row by row (openpyxl read-only mode), each sheet is
+classified as a rent roll, a trailing-12 operating statement or something
+else, and the numbers are summarized locally with pandas. The LLM gets a
+short numeric digest per sheet instead of thousands of raw cells.
+"""
+
+import io
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+# Stop reading a sheet after this many rows; rent rolls beyond this are not realistic
+MAX_ROWS = 20000
+HEADER_SCAN_ROWS = 40
+PREVIEW_ROWS = 15
+
+UNIT_COL_RE = re.compile(r"^(unit|apt|suite|space)\b|unit\s*(#|no|number|id)", re.IGNORECASE)
+RENT_COL_RE = re.compile(r"rent|lease\s*amount|monthly\s*charge", re.IGNORECASE)
+ACTUAL_RENT_RE = re.compile(r"actual|current|contract|in[- ]place|lease", re.IGNORECASE)
+MARKET_RENT_RE = re.compile(r"market|asking|pro\s*forma", re.IGNORECASE)
+STATUS_COL_RE = re.compile(r"status|occup", re.IGNORECASE)
+TENANT_COL_RE = re.compile(r"tenant|resident|lessee|name", re.IGNORECASE)
+SQFT_COL_RE = re.compile(r"sq\.?\s*f|square\s*f|\bsf\b|\bnrsf\b|\brsf\b", re.IGNORECASE)
+MONTH_COL_RE = re.compile(
+    r"^(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s\-/']*(\d{2,4})?$|^\d{1,2}/\d{2,4}$|^month\s*\d+$",
+    re.IGNORECASE
+)
+TOTAL_COL_RE = re.compile(r"^(total|t-?12|ttm|annual|year)", re.IGNORECASE)
+VACANT_RE = re.compile(r"vacan|\bvac\b|\bmodel\b|\bdown\b|\bempty\b", re.IGNORECASE)
+TOTAL_ROW_RE = re.compile(r"^\s*(?:grand\s+)?totals?\b|^\s*summary\b", re.IGNORECASE)
+
+INCOME_ROW_RE = re.compile(r"total\s+(?:operating\s+)?(?:income|revenue)|effective\s+gross\s+income|^\s*egi\b", re.IGNORECASE)
+EXPENSE_ROW_RE = re.compile(r"total\s+(?:operating\s+)?expenses?", re.IGNORECASE)
+NOI_ROW_RE = re.compile(r"net\s+operating\s+income|^\s*noi\b", re.IGNORECASE)
+
+_NUMERIC_JUNK_RE = r"[$,%\s]"
+
+
+def iter_rows(data: Union[bytes, str], filename: str) -> Iterator[Tuple[str, Iterable[Sequence]]]:
+    """(sheet name, row iterator) pairs for workbook bytes or a path. .xlsx is streamed; legacy .xls goes through pandas/xlrd.
+
+    Each sheet's rows must be consumed before moving on; the workbook is closed once the pairs run out.
+    """
+    source = data if isinstance(data, str) else io.BytesIO(data)
+    if filename.lower().endswith(".xls"):
+        sheets = pd.read_excel(source, sheet_name=None, header=None, nrows=MAX_ROWS)
+        for name, df in sheets.items():
+            yield name, df.itertuples(index=False, name=None)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        # Read-only workbooks keep the file handle open until closed
+        for ws in workbook.worksheets:
+            yield ws.title, ws.iter_rows(values_only=True, max_row=MAX_ROWS)
+    finally:
+        workbook.close()
+
+
+def _header_score(row: Sequence) -> int:
+    labels = [str(c) for c in row if isinstance(c, str) and c.strip()]
+    patterns = (UNIT_COL_RE, RENT_COL_RE, STATUS_COL_RE, TENANT_COL_RE, SQFT_COL_RE, MONTH_COL_RE, TOTAL_COL_RE)
+    return sum(1 for label in labels if any(p.search(label.strip()) for p in patterns))
+
+
+def load_sheet(rows: Iterable[Sequence]) -> Optional[pd.DataFrame]:
+    """Read one sheet into a DataFrame, using the most header-like row near the top as the header."""
+    rows = [tuple(r) for r in rows if r is not None and any(c not in (None, "") for c in r)]
+    if not rows:
+        return None
+    scan = rows[:HEADER_SCAN_ROWS]
+    header_index = max(range(len(scan)), key=lambda i: (_header_score(scan[i]), -i))
+    width = max(len(r) for r in rows)
+    header = list(rows[header_index]) + [None] * (width - len(rows[header_index]))
+    columns, seen = [], {}
+    for i, name in enumerate(header):
+        name = " ".join(str(name).split()) if name not in (None, "") else f"col{i}"
+        seen[name] = seen.get(name, 0) + 1
+        columns.append(name if seen[name] == 1 else f"{name}.{seen[name] - 1}")
+    body = [list(r) + [None] * (width - len(r)) for r in rows[header_index + 1:]]
+    return pd.DataFrame(body, columns=columns)
+
+
+def to_numbers(series: pd.Series) -> pd.Series:
+    """Vectorized money/number parsing: '$1,250.00' -> 1250.0, '(300)' -> -300.0, junk -> NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    text = series.astype(str).str.strip()
+    negative = text.str.match(r"^\(.*\)$") | text.str.startswith("-")
+    cleaned = text.str.replace(_NUMERIC_JUNK_RE, "", regex=True).str.strip("()-")
+    values = pd.to_numeric(cleaned, errors="coerce")
+    return values.where(~negative, -values)
+
+
+def _find_column(columns: Sequence[str], pattern: re.Pattern, prefer: re.Pattern = None, avoid: re.Pattern = None) -> Optional[str]:
+    matches = [c for c in columns if pattern.search(c)]
+    if prefer:
+        preferred = [c for c in matches if prefer.search(c)]
+        if preferred:
+            return preferred[0]
+    if avoid:
+        matches = [c for c in matches if not avoid.search(c)] or matches
+    return matches[0] if matches else None
+
+
+def summarize_rent_roll(df: pd.DataFrame) -> Optional[Dict]:
+    columns = list(df.columns)
+    unit_col = _find_column(columns, UNIT_COL_RE)
+    rent_col = _find_column(columns, RENT_COL_RE, prefer=ACTUAL_RENT_RE, avoid=MARKET_RENT_RE)
+    if not unit_col or not rent_col:
+        return None
+
+    units = df[df[unit_col].notna() & (df[unit_col].astype(str).str.strip() != "")]
+    units = units[~units[unit_col].astype(str).str.match(TOTAL_ROW_RE)]
+    if units.empty:
+        return None
+    rent = to_numbers(units[rent_col])
+
+    status_col = _find_column(columns, STATUS_COL_RE)
+    tenant_col = _find_column(columns, TENANT_COL_RE)
+    if tenant_col == unit_col:
+        tenant_col = None
+    vacant = pd.Series(False, index=units.index)
+    if status_col:
+        vacant |= units[status_col].astype(str).str.contains(VACANT_RE)
+    if tenant_col:
+        vacant |= units[tenant_col].isna() | units[tenant_col].astype(str).str.contains(VACANT_RE)
+    if not status_col and not tenant_col:
+        vacant = rent.fillna(0) <= 0
+
+    occupied_rent = rent[~vacant & (rent > 0)]
+    summary = {
+        "type": "rent_roll",
+        "units": int(len(units)),
+        "occupied_units": int((~vacant).sum()),
+        "occupancy": float((~vacant).mean()),
+        "average_rent": float(occupied_rent.mean()) if not occupied_rent.empty else None,
+        "monthly_rent": float(occupied_rent.sum()),
+        "rent_column": rent_col
+    }
+    market_col = _find_column(columns, RENT_COL_RE, prefer=MARKET_RENT_RE)
+    if market_col and market_col != rent_col and MARKET_RENT_RE.search(market_col):
+        market = to_numbers(units[market_col])
+        summary["average_market_rent"] = float(market[market > 0].mean()) if (market > 0).any() else None
+    sqft_col = _find_column(columns, SQFT_COL_RE)
+    if sqft_col:
+        sqft = to_numbers(units[sqft_col])
+        summary["total_sf"] = float(sqft.sum())
+        summary["average_sf"] = float(sqft[sqft > 0].mean()) if (sqft > 0).any() else None
+    return summary
+
+
+def summarize_t12(df: pd.DataFrame) -> Optional[Dict]:
+    label_col = df.columns[0]
+    month_cols = [c for c in df.columns[1:] if MONTH_COL_RE.match(str(c).strip())]
+    total_col = next((c for c in df.columns[1:] if TOTAL_COL_RE.match(str(c).strip())), None)
+    if not total_col and len(month_cols) < 3:
+        return None
+
+    labels = df[label_col].astype(str)
+    if total_col:
+        annual = to_numbers(df[total_col])
+    else:
+        annual = pd.concat([to_numbers(df[c]) for c in month_cols], axis=1).sum(axis=1, min_count=1)
+
+    def line(pattern: re.Pattern) -> Optional[float]:
+        hits = annual[labels.str.contains(pattern) & annual.notna()]
+        return float(hits.iloc[-1]) if not hits.empty else None
+
+    income, expense, noi = line(INCOME_ROW_RE), line(EXPENSE_ROW_RE), line(NOI_ROW_RE)
+    if expense is not None:
+        expense = abs(expense)  # Statements often show expenses in parentheses
+    if income is None and expense is None and noi is None:
+        return None
+    if noi is None and income is not None and expense is not None:
+        noi = income - expense
+    return {
+        "type": "t12",
+        "months": len(month_cols) or 12,
+        "total_income": income,
+        "total_expense": expense,
+        "noi": noi,
+        "expense_ratio": expense / income if income and expense is not None else None
+    }
+
+
+def _money(value: Optional[float]) -> str:
+    return "n/a" if value is None or pd.isna(value) else f"${value:,.0f}"
+
+
+def format_summary(sheet: str, summary: Dict) -> str:
+    if summary["type"] == "rent_roll":
+        parts = [
+            f"{summary['units']} units",
+            f"{summary['occupancy']:.1%} occupied ({summary['occupied_units']} units)",
+            f"average in-place rent {_money(summary['average_rent'])}/mo",
+            f"total monthly rent {_money(summary['monthly_rent'])} (annualized {_money(summary['monthly_rent'] * 12)})"
+        ]
+        if summary.get("average_market_rent"):
+            parts.append(f"average market rent {_money(summary['average_market_rent'])}/mo")
+        if summary.get("total_sf"):
+            parts.append(f"{summary['total_sf']:,.0f} SF total, {summary['average_sf'] or 0:,.0f} SF average")
+        return f"Rent roll ({sheet}): " + "; ".join(parts)
+    parts = [
+        f"total income {_money(summary['total_income'])}",
+        f"total expenses {_money(summary['total_expense'])}",
+        f"NOI {_money(summary['noi'])}"
+    ]
+    if summary.get("expense_ratio") is not None:
+        parts.append(f"expense ratio {summary['expense_ratio']:.1%}")
+    return f"T-12 operating statement ({sheet}, {summary['months']} months): " + "; ".join(parts)
+
+
+def _preview(df: pd.DataFrame) -> str:
+    head = df.head(PREVIEW_ROWS).fillna("")
+    lines = [" | ".join(str(c) for c in head.columns if not str(c).startswith("col"))]
+    lines += [" | ".join(str(v) for v in row if str(v).strip()) for row in head.itertuples(index=False)]
+    return "\n".join(line for line in lines if line.strip())
+
+
+def summarize_workbook(data: Union[bytes, str], filename: str) -> List[Dict]:
+    """One summary dict per sheet: a rent_roll, t12, or other sheet with a short preview."""
+    summaries = []
+    for sheet, rows in iter_rows(data, filename):
+        df = load_sheet(rows)
+        if df is None or df.empty:
+            continue
+        summary = summarize_rent_roll(df) or summarize_t12(df)
+        if summary is None:
+            summary = {"type": "other", "rows": int(len(df)), "preview": _preview(df)}
+        summary["sheet"] = sheet
+        summaries.append(summary)
+    return summaries
+
+
+def format_digest(summaries: List[Dict]) -> str:
+    """Compact text digest of summarize_workbook() output for the LLM prompt."""
+    lines = []
+    for summary in summaries:
+        if summary["type"] == "other":
+            lines.append(f"Sheet '{summary['sheet']}' ({summary['rows']} rows), first rows:\n{summary['preview']}")
+        else:
+            lines.append(format_summary(summary["sheet"], summary))
+    return "\n".join(lines)
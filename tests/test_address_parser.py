@@ -0,0 +1,89 @@
+"""Regression corpus for address_parser.parse_address."""
+
+import pytest
+
+from address_parser import ParsedAddress, parse_address
+
+# (input, expected) pairs covering formats seen in offering memos and
+# broker emails. Add a case here for every misparse found in production.
+REGRESSION_CORPUS = [
+    ("15031-15139 Marlboro Pike, Upper Marlboro, MD 20772",
+     ParsedAddress("15031 MARLBORO PIKE", "UPPER MARLBORO", "MD", "20772")),
+    ("15031-15139 Marlboro Pike, Upper Marlboro MD 20772",
+     ParsedAddress("15031 MARLBORO PIKE", "UPPER MARLBORO", "MD", "20772")),
+    ("15031 Marlboro Pike Upper Marlboro MD 20772",
+     ParsedAddress("15031 MARLBORO PIKE", "UPPER MARLBORO", "MD", "20772")),
+    ("123 Main Street, Springfield, Illinois 62701",
+     ParsedAddress("123 MAIN ST", "SPRINGFIELD", "IL", "62701")),
+    ("456 Oak Avenue, Springfield, IL 62701",
+     ParsedAddress("456 OAK AVE", "SPRINGFIELD", "IL", "62701")),
+    ("456 Oak Avenue Suite 200, Springfield, IL 62701-1234",
+     ParsedAddress("456 OAK AVE STE 200", "SPRINGFIELD", "IL", "62701")),
+    ("456 Oak Ave, Suite 200, Springfield, IL 62701",
+     ParsedAddress("456 OAK AVE STE 200", "SPRINGFIELD", "IL", "62701")),
+    ("1600 Pennsylvania Avenue NW, Washington, DC 20500",
+     ParsedAddress("1600 PENNSYLVANIA AVE NW", "WASHINGTON", "DC", "20500")),
+    ("1600 Pennsylvania Ave. N.W. Washington D.C. 20500",
+     ParsedAddress("1600 PENNSYLVANIA AVE NW", "WASHINGTON", "DC", "20500")),
+    ("350 Fifth Avenue, New York, New York 10118",
+     ParsedAddress("350 FIFTH AVE", "NEW YORK", "NY", "10118")),
+    ("350 5th Ave New York NY 10118",
+     ParsedAddress("350 5TH AVE", "NEW YORK", "NY", "10118")),
+    ("123-45 Queens Blvd, Forest Hills, NY 11375",
+     ParsedAddress("123-45 QUEENS BLVD", "FOREST HILLS", "NY", "11375")),
+    ("100 N. Main St., Salt Lake City, UT 84101",
+     ParsedAddress("100 N MAIN ST", "SALT LAKE CITY", "UT", "84101")),
+    ("2000 Park Place Dr, Park City, Utah 84060",
+     ParsedAddress("2000 PARK PLACE DR", "PARK CITY", "UT", "84060")),
+    ("77 Harbor Point Blvd #4, Boston, MA 02110",
+     ParsedAddress("77 HARBOR POINT BLVD #4", "BOSTON", "MA", "02110")),
+    ("500 West Madison Street, Chicago, IL 60661, USA",
+     ParsedAddress("500 W MADISON ST", "CHICAGO", "IL", "60661")),
+    ("9 Industrial Parkway\nEast Rutherford, NJ 07073",
+     ParsedAddress("9 INDUSTRIAL PKWY", "EAST RUTHERFORD", "NJ", "07073")),
+    ("12 Elm Ct, West Virginia 25301",
+     ParsedAddress("12 ELM CT", "", "WV", "25301")),
+    ("4200 Wisconsin Avenue Northwest, Washington, District of Columbia 20016",
+     ParsedAddress("4200 WISCONSIN AVE NW", "WASHINGTON", "DC", "20016")),
+    ("1 Broadway, Cambridge, MA 02142",
+     ParsedAddress("1 BROADWAY", "CAMBRIDGE", "MA", "02142")),
+    ("31 Court Street Brooklyn NY 11201",
+     ParsedAddress("31 COURT ST", "BROOKLYN", "NY", "11201")),
+    ("123 Main St",
+     ParsedAddress("123 MAIN ST", "", "", "")),
+    ("789 Commerce Drive Suite 300 Fort Worth, TX 76102",
+     ParsedAddress("789 COMMERCE DR STE 300", "FORT WORTH", "TX", "76102")),
+    ("",
+     ParsedAddress("", "", "", "")),
+    # Cities containing street-suffix words, with no comma after the street
+    ("123 Main St Park City UT 84060",
+     ParsedAddress("123 MAIN ST", "PARK CITY", "UT", "84060")),
+    ("500 Oak St Lake Forest IL",
+     ParsedAddress("500 OAK ST", "LAKE FOREST", "IL", "")),
+    ("10 Elm Ave Highland Park IL",
+     ParsedAddress("10 ELM AVE", "HIGHLAND PARK", "IL", "")),
+    ("12 Main Street Spring Valley NY",
+     ParsedAddress("12 MAIN ST", "SPRING VALLEY", "NY", "")),
+    ("5 Pine Rd Mount Vernon NY",
+     ParsedAddress("5 PINE RD", "MOUNT VERNON", "NY", "")),
+    ("2000 Park Place Dr Park City UT 84060",
+     ParsedAddress("2000 PARK PLACE DR", "PARK CITY", "UT", "84060")),
+    ("100 Lake Shore Dr Lake Forest IL 60045",
+     ParsedAddress("100 LAKE SHORE DR", "LAKE FOREST", "IL", "60045")),
+    ("40 Main St Mt Vernon NY 10550",
+     ParsedAddress("40 MAIN ST", "MT VERNON", "NY", "10550")),
+    # Street names containing full suffix words, with no comma after the street
+    ("100 Old Mill Road Springfield IL 62701",
+     ParsedAddress("100 OLD MILL RD", "SPRINGFIELD", "IL", "62701")),
+    ("200 Spring Garden Street Philadelphia PA 19123",
+     ParsedAddress("200 SPRING GARDEN ST", "PHILADELPHIA", "PA", "19123")),
+    ("12 Lake View Drive Austin TX",
+     ParsedAddress("12 LAKE VIEW DR", "AUSTIN", "TX", "")),
+    ("7 Forest Hill Road Richmond VA",
+     ParsedAddress("7 FOREST HILL RD", "RICHMOND", "VA", "")),
+]
+
+
+@pytest.mark.parametrize("raw, expected", REGRESSION_CORPUS)
+def test_parse_address(raw, expected):
+    assert parse_address.__wrapped__(raw) == expected
@@ -0,0 +1,30 @@
+"""Size parsing in underwriting: labeled numbers win over earlier bare ones."""
+
+import pandas as pd
+import pytest
+
+from underwriting import parse_size, size_series
+
+SIZE_CASES = [
+    ("120 units", (120.0, "units")),
+    ("45,000 SF", (45000.0, "sf")),
+    ("3.2 acres", (3.2, "acres")),
+    ("120-unit", (120.0, "units")),
+    ("45k sf", (45000.0, "sf")),
+    ("5 stories, 45,000 SF", (45000.0, "sf")),
+    ("2 buildings totaling 120 units", (120.0, "units")),
+    ("250", (250.0, "units")),
+    ("12,500", (12500.0, "sf")),
+    ("", (None, None)),
+]
+
+
+@pytest.mark.parametrize("raw, expected", SIZE_CASES)
+def test_parse_size(raw, expected):
+    assert parse_size(raw) == expected
+
+
+def test_size_series_matches_parse_size():
+    raw = [r for r, _ in SIZE_CASES if r]
+    numbers, units = size_series(pd.Series(raw))
+    assert list(zip(numbers.tolist(), units.tolist())) == [parse_size(r) for r in raw]
@@ -0,0 +1,217 @@
+"""
+Deterministic underwriting metrics for deal fields.
+
+Parses the free-form money, percent and size strings that come back from
+the summary prompt (or are typed into the review form) into numbers and
+derives price per unit/SF, loan per unit/SF, cap rate from NOI and LTV.
+`evaluate_deals` runs the same arithmetic over every mirrored deal at once
+with pandas, for pipeline-wide screens.
+"""
+
+import re
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+_NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "mil": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+_MULTIPLIER_RE = re.compile(r"^\s*(k|thousand|mm|mil|million|m|bn|billion|b)\b", re.IGNORECASE)
+
+UNIT_WORDS = r"units?|apartments?|apts?|doors|keys|rooms|beds|pads|sites|lots|suites"
+SF_WORDS = r"sf|sq\.?\s*ft\.?|square\s+f(?:ee|oo)t|rsf|nrsf|gsf|gla"
+_SIZE_NUMBER = r"(?<![\d.,])(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<mult>k\b)?\s*-?\s*"
+_SIZE_LABEL = r"(?:(?P<units>" + UNIT_WORDS + r")|(?P<sf>" + SF_WORDS + r")|(?P<acres>acres?|ac)\b)"
+_SIZE_RE = re.compile(_SIZE_NUMBER + _SIZE_LABEL + "?", re.IGNORECASE)
+# A number with its size label; preferred over the first bare number ("5 stories, 45,000 SF")
+_LABELED_SIZE_RE = re.compile(_SIZE_NUMBER + _SIZE_LABEL, re.IGNORECASE)
+# Without a label, sizes below this are assumed to be a unit count rather than square feet
+UNIT_COUNT_CUTOFF = 1000
+
+
+def parse_number(value) -> Optional[float]:
+    """Parse '$4,500,000', '4.5M', '$12.5 million' or 12 into a float; None if there is no number."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value)
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    number = float(match.group(0).replace(",", ""))
+    multiplier = _MULTIPLIER_RE.match(text[match.end():])
+    if multiplier:
+        number *= _MULTIPLIERS[multiplier.group(1).lower()]
+    return number
+
+
+def parse_percent(value) -> Optional[float]:
+    """Parse '6.5%', '6.5' or 0.065 into a fraction (0.065)."""
+    number = parse_number(value)
+    if number is None:
+        return None
+    if (isinstance(value, str) and "%" in value) or abs(number) > 1:
+        return number / 100
+    return number
+
+
+def parse_size(value) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parse '120 units', '45,000 SF', '3.2 acres' into (number, 'units' | 'sf' | 'acres').
+    The first labeled number wins; a bare number is only used when nothing is labeled.
+    """
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), "units" if value < UNIT_COUNT_CUTOFF else "sf"
+    text = str(value)
+    match = _LABELED_SIZE_RE.search(text) or _SIZE_RE.search(text)
+    if not match:
+        return None, None
+    number = float(match.group("number").replace(",", "")) * (1e3 if match.group("mult") else 1)
+    if match.group("units"):
+        return number, "units"
+    if match.group("sf"):
+        return number, "sf"
+    if match.group("acres"):
+        return number, "acres"
+    return number, "units" if number < UNIT_COUNT_CUTOFF else "sf"
+
+
+class DealMetrics(NamedTuple):
+    purchase_price: Optional[float]
+    loan_amount: Optional[float]
+    size: Optional[float]
+    size_unit: Optional[str]
+    stated_cap_rate: Optional[float]
+    noi: Optional[float]
+    price_per_unit: Optional[float]
+    price_per_sf: Optional[float]
+    loan_per_unit: Optional[float]
+    loan_per_sf: Optional[float]
+    cap_rate: Optional[float]
+    ltv: Optional[float]
+
+
+def _per(amount: Optional[float], size: Optional[float]) -> Optional[float]:
+    return amount / size if amount and size and size > 0 else None
+
+
+def compute_metrics(purchase_price=None, loan_amount=None, size=None, cap_rate=None, noi=None) -> DealMetrics:
+    """Derive deal metrics from raw field values. Cap rate comes from NOI when one is given."""
+    price = parse_number(purchase_price)
+    loan = parse_number(loan_amount)
+    size_value, size_unit = parse_size(size)
+    stated_cap = parse_percent(cap_rate)
+    noi_value = parse_number(noi)
+    units = size_value if size_unit == "units" else None
+    sf = size_value if size_unit == "sf" else None
+    return DealMetrics(
+        purchase_price=price,
+        loan_amount=loan,
+        size=size_value,
+        size_unit=size_unit,
+        stated_cap_rate=stated_cap,
+        noi=noi_value,
+        price_per_unit=_per(price, units),
+        price_per_sf=_per(price, sf),
+        loan_per_unit=_per(loan, units),
+        loan_per_sf=_per(loan, sf),
+        cap_rate=noi_value / price if noi_value and price else stated_cap,
+        ltv=loan / price if loan and price else None
+    )
+
+
+def format_unit_pricing(metrics: DealMetrics) -> str:
+    """Unit Pricing field text: price per unit/SF, or loan basis when there is no price."""
+    if metrics.price_per_unit:
+        return f"${metrics.price_per_unit:,.0f} Per Unit"
+    if metrics.price_per_sf:
+        return f"${metrics.price_per_sf:,.2f} PSF"
+    if metrics.loan_per_unit:
+        return f"${metrics.loan_per_unit:,.0f} Per Unit Loan Basis"
+    if metrics.loan_per_sf:
+        return f"${metrics.loan_per_sf:,.2f} PSF Loan Basis"
+    return "N/A"
+
+
+def format_metrics(metrics: DealMetrics) -> str:
+    """One-line summary of the derived metrics for display."""
+    parts = []
+    if metrics.cap_rate is not None:
+        source = "from NOI" if metrics.noi and metrics.purchase_price else "stated"
+        parts.append(f"Cap rate {metrics.cap_rate:.2%} ({source})")
+    if metrics.ltv is not None:
+        parts.append(f"LTV {metrics.ltv:.1%}")
+    pricing = format_unit_pricing(metrics)
+    if pricing != "N/A":
+        parts.append(pricing)
+    return " · ".join(parts)
+
+
+# --- Vectorized evaluation over many deals ---
+
+_MONEY_EXTRACT = r"(?P<number>-?\d[\d,]*(?:\.\d+)?)\s*(?P<mult>k|thousand|mm|mil|million|m|bn|billion|b)?\b"
+
+
+def money_series(series: pd.Series) -> pd.Series:
+    parts = series.astype("string").str.extract(_MONEY_EXTRACT, flags=re.IGNORECASE)
+    numbers = pd.to_numeric(parts["number"].str.replace(",", "", regex=False), errors="coerce")
+    multipliers = parts["mult"].str.lower().map(_MULTIPLIERS).fillna(1.0)
+    return numbers * multipliers
+
+
+def percent_series(series: pd.Series) -> pd.Series:
+    text = series.astype("string")
+    numbers = money_series(series)
+    return numbers.where(~(text.str.contains("%", regex=False).fillna(False) | (numbers.abs() > 1)), numbers / 100)
+
+
+def size_series(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    text = series.astype("string")
+    parts = text.str.extract(_SIZE_RE.pattern, flags=re.IGNORECASE)
+    labeled = text.str.extract(_LABELED_SIZE_RE.pattern, flags=re.IGNORECASE)
+    has_label = labeled["number"].notna()
+    parts.loc[has_label] = labeled.loc[has_label]
+    numbers = pd.to_numeric(parts["number"].str.replace(",", "", regex=False), errors="coerce")
+    numbers = numbers.where(parts["mult"].isna(), numbers * 1e3)
+    unit = pd.Series(pd.NA, index=series.index, dtype="object")
+    unit = unit.mask(numbers.notna(), (numbers < UNIT_COUNT_CUTOFF).map({True: "units", False: "sf"}))
+    unit = unit.mask(parts["units"].notna(), "units").mask(parts["sf"].notna(), "sf").mask(parts["acres"].notna(), "acres")
+    return numbers, unit
+
+
+def evaluate_deals(records: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Metrics for a batch of Airtable deal records ({"id", "fields"}), one row per deal.
+    Columns: id, name, price, loan, size, size_unit, stated_cap_rate, price_per_unit,
+    price_per_sf, loan_per_unit, loan_per_sf, ltv, implied_noi.
+    """
+    rows = [
+        {
+            "id": r.get("id", ""),
+            "name": r.get("fields", {}).get("Property Name", ""),
+            "status": r.get("fields", {}).get("Status", ""),
+            "price_raw": r.get("fields", {}).get("Purchase Price"),
+            "loan_raw": r.get("fields", {}).get("Loan Amount"),
+            "size_raw": r.get("fields", {}).get("Size"),
+            "cap_raw": r.get("fields", {}).get("In-Place Cap Rate")
+        }
+        for r in records
+    ]
+    df = pd.DataFrame(rows, columns=["id", "name", "status", "price_raw", "loan_raw", "size_raw", "cap_raw"])
+    df["price"] = money_series(df["price_raw"])
+    df["loan"] = money_series(df["loan_raw"])
+    df["size"], df["size_unit"] = size_series(df["size_raw"])
+    df["stated_cap_rate"] = percent_series(df["cap_raw"])
+
+    positive_price = df["price"].where(df["price"] > 0)
+    units = df["size"].where((df["size_unit"] == "units") & (df["size"] > 0))
+    sf = df["size"].where((df["size_unit"] == "sf") & (df["size"] > 0))
+    df["price_per_unit"] = positive_price / units
+    df["price_per_sf"] = positive_price / sf
+    df["loan_per_unit"] = df["loan"] / units
+    df["loan_per_sf"] = df["loan"] / sf
+    df["ltv"] = df["loan"] / positive_price
+    df["implied_noi"] = positive_price * df["stated_cap_rate"]
+    return df.drop(columns=["price_raw", "loan_raw", "size_raw", "cap_raw"])
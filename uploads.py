@@ -0,0 +1,146 @@
+"""
+Spooled, memory-mapped uploads.
+
+Each uploaded file is written to a local temp file exactly once, hashing it
+on the way. Everything downstream then reads that one copy: PDFs are opened
+by path, images and .doc files get a read-only mmap of it, spreadsheets and
+.docx are streamed from the path, and S3 multipart uploads read it in parts.
+No step needs the whole file as a separate bytes object.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from typing import Dict, IO, Iterable, Optional
+
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), "dealflow_uploads")
+CHUNK_SIZE = 1024 * 1024
+
+_stale_cleared = set()
+
+
+class SpooledUpload:
+    """One upload on local disk, with its size, sha256 and a lazily created read-only mmap."""
+
+    def __init__(self, name: str, path: str, size: int, sha256: str):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self._file: Optional[IO[bytes]] = None
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def ext(self) -> str:
+        return self.name.lower().rsplit(".", 1)[-1]
+
+    @property
+    def data(self):
+        """Read-only buffer over the file contents (bytes-like, no copy)."""
+        if self.size == 0:
+            return b""
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def open(self) -> IO[bytes]:
+        return open(self.path, "rb")
+
+    def release(self) -> None:
+        """Drop the mmap and file handle, keeping the file."""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # A memoryview is still alive; the map goes with it
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self.release()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def spool(upload, root: str = DEFAULT_ROOT) -> SpooledUpload:
+    """Write a Streamlit UploadedFile (or any binary file object) to a temp file, hashing as it goes."""
+    if root not in _stale_cleared:
+        # Once per process, drop files left behind by a run that crashed before cleaning up
+        _stale_cleared.add(root)
+        clear_stale(root)
+    os.makedirs(root, exist_ok=True)
+    ext = os.path.splitext(upload.name)[1]
+    fd, path = tempfile.mkstemp(suffix=ext, dir=root)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if hasattr(upload, "getbuffer"):
+                # UploadedFile is a BytesIO; write its buffer directly instead of read()ing a copy
+                with upload.getbuffer() as buffer:
+                    digest.update(buffer)
+                    out.write(buffer)
+                    size = len(buffer)
+            else:
+                upload.seek(0)
+                for chunk in iter(lambda: upload.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return SpooledUpload(upload.name, path, size, digest.hexdigest())
+
+
+class UploadSpool:
+    """Spooled copies of a run's uploads keyed by the original file object; removes them on exit."""
+
+    def __init__(self, uploads: Iterable, root: str = DEFAULT_ROOT):
+        self._items: Dict[int, SpooledUpload] = {}
+        for upload in uploads:
+            if upload is not None and id(upload) not in self._items:
+                self._items[id(upload)] = spool(upload, root)
+
+    def __getitem__(self, upload) -> SpooledUpload:
+        return self._items[id(upload)]
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def detach(self, upload) -> SpooledUpload:
+        """Take one file out of the spool so close() leaves it on disk; the caller removes it later."""
+        item = self._items.pop(id(upload))
+        item.release()
+        return item
+
+    def close(self) -> None:
+        for item in self._items.values():
+            item.close()
+        self._items.clear()
+
+    def __enter__(self) -> "UploadSpool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def clear_stale(root: str = DEFAULT_ROOT, max_age_seconds: float = 24 * 3600) -> None:
+    """Remove spool files left behind by a crashed run."""
+    cutoff = time.time() - max_age_seconds
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass